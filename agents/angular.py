@@ -1,29 +1,32 @@
+import os
+import logging
 from pathlib import Path
-from haystack import Pipeline, tracing
-from haystack_integrations.components.connectors.langfuse import LangfuseConnector
+from haystack import AsyncPipeline, Pipeline, tracing
 from haystack.components.agents import Agent
-from agents.todo import todo_tool
-from agents.coder import coder_tool
-from agents.skills import skill_tool
-from tools.documentation import documentation_tool
-from models.ollama import thinking_generator
+from agents.todo import get_todo_tool
+from agents.coder import get_coder_tool
+from agents.skills import get_skill_tool
+from tools.documentation import get_documentation_tool
+from tools.indexing import index_version
+from tools.tool_cache import memoize_tool
+from tools.skills_index import get_skills_index
+from agents.request_cache import TODO_PATH_PATTERN
+from agents.planned import PlannedOrchestrator
+from agents.scheduler import ScheduledAgent
+from instrumentation.tracer import enable_metrics, trace_tool
+from models.ollama import create_thinking_generator
+from models.streaming import tagged_callback, async_tagged_callback
+from registry import lazy
+from constants import METRICS_ENABLED, METRICS_FILE, TOOL_CACHE_ENABLED, TOOL_CACHE_TTL
+from constants import ORCHESTRATOR_MODE, PLAN_MAX_STEPS, PLAN_MAX_TOKENS, PLAN_MAX_SECONDS, PLAN_REWRITE_QUERY
+from constants import DEFAULT_DOC_VERSION
 from dotenv import load_dotenv
 
 load_dotenv()
 
-tracing.tracer.is_content_tracing_enabled = True
+logger = logging.getLogger(__name__)
 
-
-agent = Agent(
-    chat_generator=thinking_generator,
-    tools=[
-        todo_tool,
-        coder_tool,
-        documentation_tool,
-        skill_tool
-    ],
-    max_agent_steps=12,
-    system_prompt="""
+SYSTEM_PROMPT = """
 You're an expert AI agent designed to orchestrate various agents to accomplish complex tasks. 
 You have access to a range of tools that can help you write code, review it and improve it.
 Your task is to analyze the user's request, determine which tools to use, 
@@ -35,22 +38,149 @@ and orchestrate the agents to accomplish the task effectively.
 - `todo_tool`: Generates a TODO list with the user's request broken into smaller steps.
 
 # Workflow
-1. Execute the tool `documentation_tool` with a concise query to load the relevant Angular documentation.
-2. Provide a detailed query to the tool `skill_tool` to process the required SKILLs.
-3. Later provide a detailed query to the tool `todo_tool` to generate a TODO list for the user's request.
+1. In the same turn, call both tools (they don't depend on each other and run in parallel):
+   - `documentation_tool` with a concise query to load the relevant Angular documentation
+     (and its `version` when the user asks for a specific Angular version).
+   - `skill_tool` with a detailed query to process the required SKILLs.
+2. Later provide a detailed query to the tool `todo_tool` to generate a TODO list for the user's request.
 
 Answer with the path of the TODO file generated.
-""",
-    exit_conditions=["text"],
-    state_schema={
-        "relevant_documentation": {"type": list}
-    }
-)
+"""
+
+
+def _skills_version() -> dict:
+    return {"skills": get_skills_index().version()}
+
+
+def _docs_version() -> dict:
+    return {"docs": index_version()}
+
+
+def _todo_exists(result) -> bool:
+    match = TODO_PATH_PATTERN.search(str(result))
+    return match is not None and os.path.exists(match.group(1))
+
+
+# What the memoized results of the tools with side effects depend on (see memoize_tool)
+TOOL_CACHE_CHECKS = {
+    "skill_tool": {"versions": _skills_version},
+    # A re-index changes the chunks the same query retrieves
+    "documentation_tool": {"versions": _docs_version},
+    "todo_tool": {"valid": _todo_exists}
+}
+
+
+def create_tools() -> list:
+    """
+    The tools of the orchestrator, memoized when the tool cache is enabled.
+    """
+    tools = [get_todo_tool(), get_coder_tool(), get_documentation_tool(), get_skill_tool()]
+    if TOOL_CACHE_ENABLED:
+        # Repeated calls (in the same run or across runs) reuse the previous result
+        tools = [memoize_tool(tool, ttl=TOOL_CACHE_TTL[tool.name], **TOOL_CACHE_CHECKS.get(tool.name, {}))
+                 if tool.name in TOOL_CACHE_TTL else tool
+                 for tool in tools]
+    # Every tool call gets its own span in the metrics and in Langfuse
+    return [trace_tool(tool) for tool in tools]
+
+
+def create_agent(streaming_callback=None, max_agent_steps: int = 12) -> Agent:
+    """
+    Creates the orchestrator agent. A component instance can only be added to one pipeline,
+    so the sync and the async pipelines get their own agent.
+
+    Arguments:
+    - streaming_callback: receives the tokens and tool events of the orchestrator,
+      it must be async for an AsyncPipeline
+    """
+    # The tool calls of a turn run concurrently, todo_tool waits for a documentation_tool call
+    # of the same turn (it reads the documentation from the State)
+    agent = ScheduledAgent(
+        chat_generator=create_thinking_generator(),
+        tools=create_tools(),
+        max_agent_steps=max_agent_steps,
+        system_prompt=SYSTEM_PROMPT,
+        exit_conditions=["text"],
+        streaming_callback=streaming_callback,
+        state_schema={
+            "relevant_documentation": {"type": list}
+        }
+    )
+    agent.warm_up()
+    return agent
+
+
+def create_planned_orchestrator() -> PlannedOrchestrator:
+    """
+    Creates the orchestrator of the "planned" mode, the fixed workflow of the agent's prompt
+    run without an LLM round trip per step (see agents/planned.py).
+    """
+    orchestrator = PlannedOrchestrator(
+        tools=create_tools(),
+        # The fallback runs in a worker thread, even in the AsyncPipeline
+        fallback=lambda max_agent_steps: create_agent(tagged_callback("orchestrator"), max_agent_steps),
+        max_steps=PLAN_MAX_STEPS,
+        max_tokens=PLAN_MAX_TOKENS,
+        max_seconds=PLAN_MAX_SECONDS,
+        rewrite_generator=create_thinking_generator() if PLAN_REWRITE_QUERY else None,
+        # Set by --doc-version, searched unless the request names another version
+        doc_version=DEFAULT_DOC_VERSION
+    )
+    orchestrator.warm_up()
+    return orchestrator
+
+
+def langfuse_enabled() -> bool:
+    return bool(os.getenv("LANGFUSE_SECRET_KEY") and os.getenv("LANGFUSE_PUBLIC_KEY"))
+
+
+def create_pipeline(pipeline_class=Pipeline, mode: str = ORCHESTRATOR_MODE):
+    """
+    Arguments:
+    - mode: "agent" (the LLM picks every tool call) or "planned" (PlannedOrchestrator)
+    """
+    pipeline = pipeline_class(max_runs_per_component=1)
+    # Traces go to Langfuse only when its keys are configured
+    if langfuse_enabled():
+        from haystack_integrations.components.connectors.langfuse import LangfuseConnector
+        tracing.tracer.is_content_tracing_enabled = True
+        pipeline.add_component("tracer", LangfuseConnector("Angular Haystack"))
+    else:
+        logger.info("LANGFUSE_SECRET_KEY / LANGFUSE_PUBLIC_KEY not set, tracing disabled")
+    # Local metrics, see metrics.py
+    if METRICS_ENABLED:
+        enable_metrics(METRICS_FILE)
+    if mode == "planned":
+        # Same name, inputs and outputs as the agent
+        pipeline.add_component("agent", create_planned_orchestrator())
+        return pipeline
+    if pipeline_class is AsyncPipeline:
+        streaming_callback = async_tagged_callback("orchestrator")
+    else:
+        streaming_callback = tagged_callback("orchestrator")
+    pipeline.add_component("agent", create_agent(streaming_callback))
+    return pipeline
+
+
+@lazy
+def get_angular() -> Pipeline:
+    """
+    Builds (once per process) the angular pipeline with every agent and tool warmed up.
+    """
+    return create_pipeline()
+
 
-agent.warm_up()
+@lazy
+def get_angular_async() -> AsyncPipeline:
+    """
+    Builds (once per process) the async version of `angular`, where the orchestrator
+    awaits the generator instead of blocking a thread per request.
+    """
+    return create_pipeline(AsyncPipeline)
 
-angular = Pipeline(max_runs_per_component=1)
-angular.add_component("tracer", LangfuseConnector("Angular Haystack"))
-angular.add_component("agent", agent)
 
-angular.draw(path=Path("pipeline.png"))
+def draw_pipeline(path: str = "pipeline.png"):
+    """
+    Renders the angular pipeline (uses the mermaid.ink service).
+    """
+    get_angular().draw(path=Path(path))
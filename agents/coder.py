@@ -3,11 +3,11 @@ from haystack.tools import PipelineTool
 from haystack.dataclasses import ChatMessage
 from haystack.components.agents import Agent
 from haystack.components.builders.chat_prompt_builder import ChatPromptBuilder
-from models.ollama import coder_generator
+from models.ollama import create_coder_generator
+from models.streaming import tagged_callback
+from registry import lazy
 
-agent = Agent(
-    chat_generator=coder_generator,
-    system_prompt="""
+SYSTEM_PROMPT = """
 You're an expert software engineer with extensive experience in Angular. You have a deep understanding of Angular's architecture, components, services, and best practices. 
 You excel at writing clean, efficient, and maintainable code. You are also skilled at debugging and optimizing Angular applications. 
 Your task is to assist in developing and improving an Angular application by providing code snippets, explanations, and guidance based on the user's requests. 
@@ -17,30 +17,41 @@ Your task is to assist in developing and improving an Angular application by pro
 
 # Constraints
 1. You're NOT allowed to use your internal knowledge to write code. 
-""",
-    exit_conditions=["text"]
-)
-
-agent.warm_up()
-
-pipeline = Pipeline(max_runs_per_component=1)
-pipeline.add_component("builder", ChatPromptBuilder(
-    template=[
-        ChatMessage.from_user("""
-        User request: {{ query }}
-        """)],
-    required_variables=["query"]
-))
-pipeline.add_component("agent", agent)
-
-pipeline.connect("builder.prompt", "agent.messages")
-
-coder_tool = PipelineTool(
-    pipeline=pipeline,
-    # Mapea el input "query" que recibe "coder_tool" a las variables "query" de "retriever" y "builder"
-    input_mapping={
-        "query": ["builder.query"]
-    },
-    name="coder_tool",
-    description="Writes code based on the user's request and the retrieved documents. The user request is in the 'query' variable and the retrieved documents are in the 'documents' variable.",
-)
+"""
+
+
+@lazy
+def get_coder_tool() -> PipelineTool:
+    """
+    Builds (once per process) the coder_tool, nothing is created until the first call.
+    """
+    agent = Agent(
+        chat_generator=create_coder_generator(),
+        system_prompt=SYSTEM_PROMPT,
+        exit_conditions=["text"],
+        streaming_callback=tagged_callback("coder")
+    )
+
+    agent.warm_up()
+
+    pipeline = Pipeline(max_runs_per_component=1)
+    pipeline.add_component("builder", ChatPromptBuilder(
+        template=[
+            ChatMessage.from_user("""
+            User request: {{ query }}
+            """)],
+        required_variables=["query"]
+    ))
+    pipeline.add_component("agent", agent)
+
+    pipeline.connect("builder.prompt", "agent.messages")
+
+    return PipelineTool(
+        pipeline=pipeline,
+        # Mapea el input "query" que recibe "coder_tool" a las variables "query" de "retriever" y "builder"
+        input_mapping={
+            "query": ["builder.query"]
+        },
+        name="coder_tool",
+        description="Writes code based on the user's request and the retrieved documents. The user request is in the 'query' variable and the retrieved documents are in the 'documents' variable.",
+    )
@@ -0,0 +1,279 @@
+import re
+import time
+import asyncio
+import logging
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+from haystack import component, tracing
+from haystack.components.agents import Agent
+from haystack.dataclasses import ChatMessage, ToolCall
+from haystack.tools import Tool
+from models.ollama_client import count_chat_calls, guard_chat_calls
+from instrumentation.tracer import tools_submitted
+from constants import DOC_SOURCES, DEFAULT_DOC_VERSION
+
+logger = logging.getLogger(__name__)
+
+REWRITE_PROMPT = """
+Rewrite the user's request as a concise search query for the Angular documentation.
+Answer only with the search query.
+"""
+
+
+def requested_version(query: str, versions: List[str]) -> Optional[str]:
+    """
+    Returns:
+    - The documentation version the query names ("v17" for "Angular 17", "Angular 17.2" or "v17"),
+      None when it names none
+    """
+    for version in versions:
+        number = version[1:] if version[:1].lower() == "v" else version
+        # Only numbered versions, "latest" is a word of many queries
+        if number[:1].isdigit() and re.search(rf"(?:\bangular\s+v?|(?<![\w.])v){re.escape(number)}(?:\.\d+)*(?!\w)",
+                                              query, re.IGNORECASE):
+            return version
+    return None
+
+
+class BudgetExceeded(Exception):
+    pass
+
+
+def _budget_exceeded(error: BaseException) -> Optional[BudgetExceeded]:
+    # Pipelines and agents wrap the errors of their components (PipelineRuntimeError), or raise
+    # another one while handling them (the Agent's snapshot on failure)
+    while error is not None:
+        if isinstance(error, BudgetExceeded):
+            return error
+        error = error.__cause__ or error.__context__
+    return None
+
+
+class RequestBudget:
+    """
+    Steps (tool calls and LLM round trips of the orchestrator), tokens (of every LLM call,
+    sub-agents included) and wall time a request may spend.
+    """
+
+    def __init__(self, max_steps: int, max_tokens: int, max_seconds: float):
+        self.max_steps = max_steps
+        self.max_tokens = max_tokens
+        self.max_seconds = max_seconds
+        self.steps = 0
+        self.tokens = 0
+        self.start = time.perf_counter()
+        self._lock = threading.Lock()
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+    def remaining_steps(self) -> int:
+        return max(0, self.max_steps - self.steps)
+
+    def check(self, steps: int = 1):
+        """
+        Raises:
+        - BudgetExceeded: the next `steps` don't fit in the budget
+        """
+        if self.steps + steps > self.max_steps:
+            raise BudgetExceeded(f"step budget of {self.max_steps} reached")
+        self.check_usage(self.tokens)
+
+    def check_usage(self, tokens: int):
+        """
+        Checks the tokens spent so far (e.g. a live counter of the LLM calls) and the time.
+
+        Raises:
+        - BudgetExceeded: the token or time budget is spent
+        """
+        if tokens >= self.max_tokens:
+            raise BudgetExceeded(f"token budget of {self.max_tokens} reached ({tokens} tokens)")
+        if self.elapsed >= self.max_seconds:
+            raise BudgetExceeded(f"time budget of {self.max_seconds}s reached")
+
+    def take_step(self):
+        """
+        Checks the budget and counts a step, concurrent steps can't both take the last one.
+        """
+        with self._lock:
+            self.check()
+            self.steps += 1
+
+    def charge(self, steps: int, tokens: int):
+        # The concurrent steps are charged from their own threads
+        with self._lock:
+            self.steps += steps
+            self.tokens += tokens
+
+    def usage(self) -> dict:
+        return {"steps": self.steps, "tokens": self.tokens, "seconds": round(self.elapsed, 3)}
+
+
+def _todo_path(result: Any) -> str:
+    # The path returned by write_todo inside todo_tool
+    for message in reversed((result or {}).get("messages") or []):
+        tool_result = message.tool_call_result
+        if tool_result and tool_result.origin.tool_name == "write_todo" and not tool_result.error \
+                and str(tool_result.result).strip():
+            return str(tool_result.result).strip()
+    return ""
+
+
+@component
+class PlannedOrchestrator:
+    """
+    Runs the orchestrator's fixed workflow without asking the LLM which tool to call next:
+
+    1. `documentation_tool` and `skill_tool`, concurrently
+    2. `todo_tool` with the documentation loaded in step 1
+
+    The documentation version is the one the request names (see `requested_version`), `doc_version`
+    otherwise, like the agent passes it to `documentation_tool`.
+    The LLM is only consulted to rewrite the request as a documentation query (`rewrite_generator`)
+    and when a step fails or doesn't write the TODO: the free-form agent built by
+    `fallback(max_agent_steps)` takes over with the messages and State so far, within the steps left.
+
+    Every request gets a RequestBudget, once it's spent the orchestrator stops and answers
+    with what it has. The tokens and time are also checked before every LLM call of the request
+    (the sub-agents and the fallback agent included), so a step can't run far past the budget.
+    Same inputs and outputs as the Agent it replaces.
+    """
+
+    def __init__(self, tools: List[Tool], fallback: Callable[[int], Agent], max_steps: int, max_tokens: int,
+                 max_seconds: float, rewrite_generator: Any = None, doc_version: str = DEFAULT_DOC_VERSION,
+                 doc_sources: Optional[Dict[str, str]] = None):
+        self.tools = {tool.name: tool for tool in tools}
+        self.fallback = fallback
+        self.max_steps = max_steps
+        self.max_tokens = max_tokens
+        self.max_seconds = max_seconds
+        self.rewrite_generator = rewrite_generator
+        self.doc_version = doc_version
+        self.doc_sources = doc_sources or DOC_SOURCES
+
+    def warm_up(self):
+        if self.rewrite_generator is not None and hasattr(self.rewrite_generator, "warm_up"):
+            self.rewrite_generator.warm_up()
+
+    def _call(self, budget: RequestBudget, function: Callable, *args, **kwargs) -> Any:
+        # One step, its tokens (sub-agents included) are charged once it ends
+        budget.take_step()
+        with count_chat_calls() as counter:
+            try:
+                return function(*args, **kwargs)
+            finally:
+                budget.charge(0, counter[1])
+
+    def _rewrite(self, budget: RequestBudget, query: str) -> str:
+        if self.rewrite_generator is None:
+            return query
+        messages = [ChatMessage.from_system(REWRITE_PROMPT), ChatMessage.from_user(query)]
+        replies = self._call(budget, self.rewrite_generator.run, messages=messages)["replies"]
+        rewritten = (replies[0].text or "").strip() if replies else ""
+        return rewritten or query
+
+    def _invoke(self, budget: RequestBudget, tool_call: ToolCall, **state) -> tuple:
+        """
+        Returns:
+        - The result of the tool call (None on error) and its tool message
+        """
+        tool = self.tools[tool_call.tool_name]
+        try:
+            result = self._call(budget, tool.invoke, **tool_call.arguments, **state)
+        except Exception as e:
+            exceeded = _budget_exceeded(e)
+            if exceeded:
+                raise exceeded from e
+            logger.warning("Planned step %s failed: %r", tool_call.tool_name, e)
+            return None, ChatMessage.from_tool(tool_result=repr(e), origin=tool_call, error=True)
+        # The same text the agent would read, e.g. only the summary of documentation_tool
+        source = (getattr(tool, "outputs_to_string", None) or {}).get("source")
+        text = result.get(source) if source and isinstance(result, dict) else result
+        return result, ChatMessage.from_tool(tool_result=str(text), origin=tool_call)
+
+    def _invoke_concurrently(self, budget: RequestBudget, tool_calls: List[ToolCall]) -> List[tuple]:
+        # Every call gets a copy of the context: tracing spans, streaming sinks and counters
+        # Both finish (or fail) before a spent budget is reported, the threads end with the request
+        with ThreadPoolExecutor(max_workers=len(tool_calls), thread_name_prefix="planned") as executor:
+            with tools_submitted():
+                futures = [executor.submit(contextvars.copy_context().run, self._invoke, budget, tool_call)
+                           for tool_call in tool_calls]
+        return [future.result() for future in futures]
+
+    def _run_fallback(self, budget: RequestBudget, messages: List[ChatMessage], reason: str, **state) -> dict:
+        logger.info("Planned run falling back to the agent: %s", reason)
+        budget.check()
+        # Rare enough to build an agent per fallback, sized to the steps left
+        agent = self.fallback(budget.remaining_steps())
+        with count_chat_calls() as counter:
+            try:
+                result = agent.run(messages=messages, **state)
+            except Exception as e:
+                # Its tokens are charged either way
+                budget.charge(0, counter[1])
+                exceeded = _budget_exceeded(e)
+                if exceeded:
+                    raise exceeded from e
+                raise
+        # Every round trip of the agent is a step
+        round_trips = sum(1 for message in result["messages"] if message.is_from("assistant")) - \
+            sum(1 for message in messages if message.is_from("assistant"))
+        budget.charge(round_trips, counter[1])
+        return result
+
+    def _run_plan(self, budget: RequestBudget, query: str, transcript: List[ChatMessage]) -> List[ChatMessage]:
+        # The version is read from the request itself, the rewritten query may drop it
+        version = requested_version(query, list(self.doc_sources)) or self.doc_version
+        documentation_call = ToolCall(tool_name="documentation_tool",
+                                      arguments={"query": self._rewrite(budget, query), "version": version})
+        skill_call = ToolCall(tool_name="skill_tool", arguments={"query": query})
+        transcript.append(ChatMessage.from_assistant(tool_calls=[documentation_call, skill_call]))
+        (documentation_result, documentation_message), (_, skill_message) = \
+            self._invoke_concurrently(budget, [documentation_call, skill_call])
+        transcript += [documentation_message, skill_message]
+        documentation = (documentation_result or {}).get("relevant_documentation")
+
+        todo_call = ToolCall(tool_name="todo_tool", arguments={"query": query})
+        transcript.append(ChatMessage.from_assistant(tool_calls=[todo_call]))
+        todo_result, todo_message = self._invoke(budget, todo_call, documentation=documentation)
+        transcript.append(todo_message)
+
+        todo_path = _todo_path(todo_result)
+        if todo_path:
+            transcript.append(ChatMessage.from_assistant(f"The TODO list was written to {todo_path}"))
+            return transcript
+        failed = [message.tool_call_result.origin.tool_name for message in transcript
+                  if message.tool_call_result and message.tool_call_result.error]
+        reason = f"{', '.join(failed)} failed" if failed else "todo_tool wrote no TODO"
+        return self._run_fallback(budget, transcript, reason, relevant_documentation=documentation or [])["messages"]
+
+    @component.output_types(messages=List[ChatMessage], last_message=ChatMessage)
+    def run(self, messages: List[ChatMessage]):
+        budget = RequestBudget(self.max_steps, self.max_tokens, self.max_seconds)
+        query = next((message.text for message in reversed(messages) if message.is_from("user")), "") or ""
+        # The steps append to it, it keeps what was done when the budget runs out
+        transcript = list(messages)
+        try:
+            # Every LLM call of the request (tools and fallback included) checks the tokens and time spent
+            # so far, the steps only charge their tokens once they end
+            with count_chat_calls() as spent, guard_chat_calls(lambda: budget.check_usage(spent[1])):
+                transcript = self._run_plan(budget, query, transcript)
+        except BudgetExceeded as e:
+            logger.warning("Planned run stopped: %s (%s)", e, budget.usage())
+            transcript.append(ChatMessage.from_assistant(f"The request was stopped: {e}."))
+
+        usage = budget.usage()
+        logger.info("Planned run: %d steps, %d tokens, %.1fs", usage["steps"], usage["tokens"], usage["seconds"])
+        span = tracing.tracer.current_span()
+        if span is not None:
+            span.set_tag("angular.mode", "planned")
+            span.set_tag("angular.steps", usage["steps"])
+        return {"messages": transcript, "last_message": transcript[-1]}
+
+    @component.output_types(messages=List[ChatMessage], last_message=ChatMessage)
+    async def run_async(self, messages: List[ChatMessage]):
+        # The tools are synchronous, the event loop only awaits the request (to_thread copies the context)
+        return await asyncio.to_thread(self.run, messages)
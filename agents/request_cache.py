@@ -0,0 +1,276 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import asyncio
+import hashlib
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Awaitable, Callable, List, Optional
+from haystack.dataclasses import ChatMessage
+from models.embedding_cache import normalize_text
+from tools.tool_cache import pipeline_version
+from registry import lazy
+from constants import REQUEST_CACHE_ENABLED, REQUEST_CACHE_FILE, REQUEST_CACHE_TTL, REQUEST_CACHE_MAX_ENTRIES
+from constants import ORCHESTRATOR_MODE, THINKING_MODEL, CODER_MODEL, EMBEDDER_MODEL, DOC_SOURCES, DEFAULT_DOC_VERSION
+
+logger = logging.getLogger(__name__)
+
+TODO_PATH_PATTERN = re.compile(r"(/[^\s'\"`]+/TODO\.md)")
+
+
+def find_todo_path(messages: List[ChatMessage]) -> str:
+    for message in reversed(messages):
+        texts = [message.text] if message.text else []
+        if message.tool_call_result:
+            texts.append(str(message.tool_call_result.result))
+        for text in texts:
+            match = TODO_PATH_PATTERN.search(text)
+            if match:
+                return match.group(1)
+    return ""
+
+
+def normalize_query(query: str) -> str:
+    # "Add a login form." and "add a  login form" are the same request
+    return normalize_text(query).lower().rstrip(" .!?")
+
+
+@lazy
+def get_config_version() -> str:
+    """
+    Hash of what shapes the answer besides the query: orchestrator mode and prompt, models,
+    the documentation versions searched (by default) and the pipelines of the tools (prompts,
+    generation kwargs...).
+    """
+    from agents.angular import SYSTEM_PROMPT
+    from agents.todo import get_todo_tool
+    from agents.coder import get_coder_tool
+    from agents.skills import get_skill_tool
+    from tools.documentation import get_documentation_tool
+
+    tools = [get_todo_tool(), get_coder_tool(), get_documentation_tool(), get_skill_tool()]
+    data = {
+        "mode": ORCHESTRATOR_MODE,
+        "prompt": SYSTEM_PROMPT,
+        "models": [THINKING_MODEL, CODER_MODEL, EMBEDDER_MODEL],
+        "docs": {"sources": DOC_SOURCES, "default_version": DEFAULT_DOC_VERSION},
+        "tools": {tool.name: pipeline_version(tool._pipeline) for tool in tools}
+    }
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+def index_versions() -> dict:
+    """
+    Versions of the SKILLs and the documentation index, a cached answer is only valid for the
+    versions it was produced with.
+    """
+    from tools.indexing import index_version
+    from tools.skills_index import get_skills_index
+    return {"docs": index_version(), "skills": get_skills_index().version()}
+
+
+class RequestCache:
+    """
+    Answers (TODO path and messages) of whole requests keyed by normalized query and config
+    version, stored in SQLite so identical requests are also reused across runs and processes.
+
+    An entry is dropped when it's looked up and the SKILLs or the documentation index changed
+    since it was stored, it's older than `ttl` or its TODO file no longer exists. The least
+    recently used entries over `max_entries` are dropped on every write.
+    """
+
+    def __init__(self, path: str, ttl: float, max_entries: int):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS requests (
+                key TEXT PRIMARY KEY,
+                query TEXT NOT NULL,
+                todo_path TEXT NOT NULL,
+                messages TEXT NOT NULL,
+                versions TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self._connection.commit()
+
+    @staticmethod
+    def key(query: str, config_version: str) -> str:
+        return hashlib.sha256(f"{config_version}\n{normalize_query(query)}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str, versions: dict) -> Optional[dict]:
+        """
+        Returns:
+        - The TODO path and the messages of the request, None when missing or no longer valid
+        """
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT todo_path, messages, versions, created_at FROM requests WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            todo_path, messages, stored_versions, created_at = row
+            if json.loads(stored_versions) != versions or now - created_at > self.ttl \
+                    or not os.path.exists(todo_path):
+                self._connection.execute("DELETE FROM requests WHERE key = ?", (key,))
+                self._connection.commit()
+                self.misses += 1
+                return None
+            self._connection.execute("UPDATE requests SET last_used = ? WHERE key = ?", (now, key))
+            self._connection.commit()
+            self.hits += 1
+        return {"todo_path": todo_path,
+                "messages": [ChatMessage.from_dict(message) for message in json.loads(messages)]}
+
+    def put(self, key: str, query: str, result: dict, versions: dict):
+        now = time.time()
+        messages = json.dumps([message.to_dict() for message in result["messages"]])
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO requests (key, query, todo_path, messages, versions, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, query, result["todo_path"], messages, json.dumps(versions, sort_keys=True), now, now)
+            )
+            self._connection.execute("""
+                DELETE FROM requests WHERE key NOT IN (
+                    SELECT key FROM requests ORDER BY last_used DESC LIMIT ?
+                )
+            """, (self.max_entries,))
+            self._connection.commit()
+
+    def record_coalesced(self):
+        with self._lock:
+            self.coalesced += 1
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": self.hits / total if total else 0.0
+        }
+
+
+@lazy
+def get_request_cache() -> RequestCache:
+    return RequestCache(REQUEST_CACHE_FILE, ttl=REQUEST_CACHE_TTL, max_entries=REQUEST_CACHE_MAX_ENTRIES)
+
+
+class SingleFlight:
+    """
+    Requests in flight by key: the first one runs, the identical ones arriving meanwhile
+    wait for its result. A concurrent.futures.Future can be awaited from any thread or event loop.
+    """
+
+    def __init__(self):
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def join(self, key: str) -> tuple:
+        """
+        Returns:
+        - The future of the request and whether the caller has to run it (and `finish` it)
+        """
+        with self._lock:
+            if key in self._flights:
+                return self._flights[key], False
+            future = Future()
+            self._flights[key] = future
+            return future, True
+
+    def finish(self, key: str):
+        with self._lock:
+            self._flights.pop(key, None)
+
+
+_in_flight = SingleFlight()
+
+
+def _lookup(key: str) -> Optional[dict]:
+    cache = get_request_cache()
+    cached = cache.get(key, index_versions())
+    if cached is not None:
+        logger.info("Request answered from the cache: %s (%s)", cached["todo_path"], cache.stats())
+    return cached
+
+
+def _store(key: str, query: str, messages: List[ChatMessage]) -> dict:
+    result = {"todo_path": find_todo_path(messages), "messages": messages}
+    # Only the answers that wrote a TODO, failed or stopped requests run again
+    if result["todo_path"]:
+        get_request_cache().put(key, query, result, index_versions())
+    return result
+
+
+def run_cached(query: str, run: Callable[[], List[ChatMessage]]) -> dict:
+    """
+    Runs the request (`run` returns the messages of the agent) unless an identical one was
+    answered before or is in flight.
+
+    Returns:
+    - The TODO path and the messages of the request
+    """
+    if not REQUEST_CACHE_ENABLED:
+        messages = run()
+        return {"todo_path": find_todo_path(messages), "messages": messages}
+
+    # Joined before the lookup, so a flight can't finish between a miss and the join
+    key = get_request_cache().key(query, get_config_version())
+    future, leader = _in_flight.join(key)
+    if not leader:
+        get_request_cache().record_coalesced()
+        logger.info("Identical request in flight, waiting for its result")
+        return future.result()
+    try:
+        cached = _lookup(key)
+        result = cached if cached is not None else _store(key, query, run())
+        future.set_result(result)
+        return result
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        _in_flight.finish(key)
+
+
+async def run_cached_async(query: str, run: Callable[[], Awaitable[List[ChatMessage]]]) -> dict:
+    """
+    Same as `run_cached` for a coroutine, the identical requests coalesce with the ones of any
+    event loop or thread.
+    """
+    if not REQUEST_CACHE_ENABLED:
+        messages = await run()
+        return {"todo_path": find_todo_path(messages), "messages": messages}
+
+    key = get_request_cache().key(query, await asyncio.to_thread(get_config_version))
+    future, leader = _in_flight.join(key)
+    if not leader:
+        get_request_cache().record_coalesced()
+        logger.info("Identical request in flight, waiting for its result")
+        return await asyncio.wrap_future(future)
+    try:
+        # SQLite and the SKILLs index are blocking
+        result = await asyncio.to_thread(_lookup, key)
+        if result is None:
+            messages = await run()
+            result = await asyncio.to_thread(_store, key, query, messages)
+        future.set_result(result)
+        return result
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        _in_flight.finish(key)
@@ -0,0 +1,178 @@
+import inspect
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Union
+from haystack import component
+from haystack.components.agents import Agent, State
+from haystack.components.tools import ToolInvoker
+from haystack.dataclasses import ChatMessage, ToolCall
+from haystack.dataclasses.streaming_chunk import StreamingCallbackT
+from haystack.tools import Tool, ToolsType, flatten_tools_or_toolsets
+
+logger = logging.getLogger(__name__)
+
+# The ToolInvoker runs every call of a turn in its own thread up to this many calls
+DEFAULT_MAX_WORKERS = inspect.signature(ToolInvoker.__init__).parameters["max_workers"].default
+# Argument the scheduled tools receive the messages of the State in (the current turn is the last one)
+TURN_MESSAGES_ARGUMENT = "turn_messages"
+
+
+def _reads(tool: Tool) -> Dict[str, str]:
+    return dict(getattr(tool, "inputs_from_state", None) or {})
+
+
+def _writes(tool: Tool) -> Dict[str, dict]:
+    return dict(getattr(tool, "outputs_to_state", None) or {})
+
+
+def _current_turn(messages: List[ChatMessage]) -> tuple:
+    """
+    Returns:
+    - The number of the turn (assistant messages with tool calls so far) and its tool calls
+    """
+    turns = [message for message in messages or [] if message.is_from("assistant") and message.tool_calls]
+    return len(turns), (turns[-1].tool_calls if turns else [])
+
+
+class RunSchedule:
+    """
+    Tool calls of one Agent run: the State outputs of every call, by turn and position in the turn,
+    for the calls of the same turn that read them.
+
+    A call whose inputs read a State key waits for the calls of its turn that write that key and
+    reads their outputs merged into the State value, as it would in a later turn. The other calls
+    run concurrently in the ToolInvoker's threads. A call only waits for a later call of its turn
+    when every call of the turn gets its own thread (`max_workers`), otherwise it could hold the
+    thread that call is queued for.
+    """
+
+    def __init__(self, state_schema: dict, max_workers: int):
+        self.state_schema = state_schema
+        self.max_workers = max_workers
+        self._outputs = {}
+        self._claimed = set()
+        self._lock = threading.Lock()
+
+    def _future(self, key: tuple) -> Future:
+        with self._lock:
+            return self._outputs.setdefault(key, Future())
+
+    def _claim(self, turn: int, tool_calls: List[ToolCall], tool: Tool, arguments: dict) -> Optional[int]:
+        # Position of the call in its turn, found by its arguments: the threads of the calls of the
+        # same tool start in any order. Calls with the same arguments take their positions in order
+        with self._lock:
+            unclaimed = [position for position, tool_call in enumerate(tool_calls)
+                         if tool_call.tool_name == tool.name and (turn, position) not in self._claimed]
+            matching = [position for position in unclaimed
+                        if all(arguments.get(name) == value for name, value in tool_calls[position].arguments.items())]
+            if not unclaimed:
+                return None
+            position = (matching or unclaimed)[0]
+            self._claimed.add((turn, position))
+            return position
+
+    def _wait_for_writers(self, turn: int, position: int, tool_calls: List[ToolCall], tools: Dict[str, Tool],
+                          tool: Tool, arguments: dict) -> dict:
+        reads = {state_key: parameter for state_key, parameter in _reads(tool).items()
+                 if parameter not in tool_calls[position].arguments}
+        state = None
+        for other, tool_call in enumerate(tool_calls):
+            writes = _writes(tools[tool_call.tool_name]) if tool_call.tool_name in tools else {}
+            keys = [state_key for state_key in writes if state_key in reads]
+            if other == position or not keys:
+                continue
+            if other > position and len(tool_calls) > self.max_workers:
+                logger.warning("%s can't wait for %s, called after it in a turn of %d calls",
+                               tool.name, tool_call.tool_name, len(tool_calls))
+                continue
+            try:
+                outputs = self._future((turn, other)).result()
+            except Exception:
+                # Its error is the result of its own call
+                continue
+            if state is None:
+                state = State(schema=self.state_schema, data={state_key: arguments[parameter]
+                                                              for state_key, parameter in reads.items()
+                                                              if parameter in arguments})
+            for state_key in keys:
+                if state_key in outputs:
+                    state.set(state_key, outputs[state_key], handler_override=writes[state_key].get("handler"))
+        if state is None:
+            return arguments
+        return {**arguments, **{parameter: state.get(state_key) for state_key, parameter in reads.items()
+                                if state.has(state_key)}}
+
+    def invoke(self, tools: Dict[str, Tool], tool: Tool, turn_messages: Optional[List[ChatMessage]] = None,
+               **arguments) -> Any:
+        turn, tool_calls = _current_turn(turn_messages)
+        position = self._claim(turn, tool_calls, tool, arguments)
+        if position is None:
+            return tool.invoke(**arguments)
+
+        arguments = self._wait_for_writers(turn, position, tool_calls, tools, tool, arguments)
+        writes = _writes(tool)
+        if not writes:
+            return tool.invoke(**arguments)
+        future = self._future((turn, position))
+        try:
+            result = tool.invoke(**arguments)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        # The values the ToolInvoker merges into the State once the call returns
+        future.set_result({state_key: result.get(config["source"]) if config.get("source") else result
+                           for state_key, config in writes.items()
+                           if not config.get("source") or (isinstance(result, dict) and config["source"] in result)})
+        return result
+
+    def schedule(self, tools: ToolsType) -> List[Tool]:
+        """
+        Returns:
+        - Copies of `tools` for one run, their calls go through the schedule
+        """
+        tools = flatten_tools_or_toolsets(tools)
+        tools_with_names = {tool.name: tool for tool in tools}
+        scheduled = []
+        for tool in tools:
+            copy = Tool(
+                name=tool.name,
+                description=tool.description,
+                parameters=tool.parameters,
+                function=lambda _tool=tool, **kwargs: self.invoke(tools_with_names, _tool, **kwargs),
+                outputs_to_string=tool.outputs_to_string,
+                outputs_to_state=tool.outputs_to_state
+            )
+            # Set after the constructor, which checks the parameters against the function's signature
+            copy.inputs_from_state = {**_reads(tool), "messages": TURN_MESSAGES_ARGUMENT}
+            scheduled.append(copy)
+        return scheduled
+
+
+@component
+class ScheduledAgent(Agent):
+    """
+    Agent whose tool calls of the same turn run concurrently (in the ToolInvoker's threads) except
+    for the calls reading a State key another call of the turn writes, which wait for it (see RunSchedule).
+
+    Every run gets copies of the tools through the `tools` input of Agent.run.
+    (`super()` doesn't work in classes decorated with @component, hence `Agent.run(self, ...)`)
+    """
+
+    def _scheduled_tools(self, tools: Optional[Union[ToolsType, List[str]]]) -> List[Tool]:
+        if tools and all(isinstance(tool, str) for tool in tools):
+            tools = [tool for tool in flatten_tools_or_toolsets(self.tools) if tool.name in tools]
+        max_workers = (self.tool_invoker_kwargs or {}).get("max_workers", DEFAULT_MAX_WORKERS)
+        return RunSchedule(self.state_schema, max_workers).schedule(tools or self.tools)
+
+    def run(self, messages: List[ChatMessage], streaming_callback: Optional[StreamingCallbackT] = None, *,
+            generation_kwargs: Optional[Dict[str, Any]] = None, system_prompt: Optional[str] = None,
+            tools: Optional[Union[ToolsType, List[str]]] = None, **kwargs: Any) -> Dict[str, Any]:
+        return Agent.run(self, messages, streaming_callback, generation_kwargs=generation_kwargs,
+                         system_prompt=system_prompt, tools=self._scheduled_tools(tools), **kwargs)
+
+    async def run_async(self, messages: List[ChatMessage], streaming_callback: Optional[StreamingCallbackT] = None,
+                        *, generation_kwargs: Optional[Dict[str, Any]] = None, system_prompt: Optional[str] = None,
+                        tools: Optional[Union[ToolsType, List[str]]] = None, **kwargs: Any) -> Dict[str, Any]:
+        return await Agent.run_async(self, messages, streaming_callback, generation_kwargs=generation_kwargs,
+                                     system_prompt=system_prompt, tools=self._scheduled_tools(tools), **kwargs)
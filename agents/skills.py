@@ -1,20 +1,27 @@
+import time
+import logging
+from typing import List, Optional
+import requests
 from haystack import Pipeline, component
+from haystack.components.joiners import BranchJoiner
 from haystack.components.agents import Agent
-from haystack.tools import ComponentTool, PipelineTool
+from haystack.tools import PipelineTool
 from haystack.dataclasses import ChatMessage
-from haystack.core.super_component import SuperComponent
-from haystack.components.fetchers.link_content import LinkContentFetcher
 from haystack.components.converters import HTMLToDocument
 from haystack.components.builders.chat_prompt_builder import ChatPromptBuilder
 from haystack.dataclasses.byte_stream import ByteStream
 from tools.read_example_skills import read_example_skills
-from tools.read_skills import read_skills_descriptions
+from tools.read_skills import search_skills
 from tools.write_skill import write_skill
-from models.ollama import thinking_generator
+from tools.skill_definition_cache import SkillDefinitionStore, SkillDefinitionCacheChecker, SkillDefinitionCacheWriter
+from models.ollama import create_thinking_generator
+from models.streaming import tagged_callback
+from registry import lazy
+from constants import THINKING_MODEL, SKILLS_DEFINITION_CACHE_DIR, SKILLS_DEFINITION_OFFLINE, SKILLS_DEFINITION_TTL
 
-agent = Agent(
-    chat_generator=thinking_generator,
-    system_prompt="""You're a helpful AI agent expert on Skills designed by Anthropic. 
+logger = logging.getLogger(__name__)
+
+SYSTEM_PROMPT = """You're a helpful AI agent expert on Skills designed by Anthropic. 
     Your job is to analyze the user query and identify the SKILLs within it, 
     then create a SKILL.md file for each one.
     
@@ -30,132 +37,211 @@ agent = Agent(
     1. Read the SKILLs definition and the example SKILL ONCE to understand the format with the tool `read_example_skill`.
     2. STRICTLY FOLLOW the syntax and examples provided by the tool `read_example_skills` (frontmatter markdown style).
     3. Analyze the user query and identify the SKILLs
-    4. Search for existing SKILLs that match the identified ones with the tool `read_skills_descriptions`, if they exist, return 'skill already exists' and do not create a new one.
+    4. Search for existing SKILLs that match each identified one with the tool `search_skills`, if they exist, return 'skill already exists' and do not create a new one.
     5. If the SKILL doesn't exist, create a new SKILL.md file for each identified SKILL with the tool `write_skill`, providing a concise and clear description and instructions in markdown format.
     5.1 The SKILL has to be generic enough to be reusable for other similar requests.
     6. If the SKILL is correctly created (`write_skill` returns True) then return the text 'skill created', do not add anything else.
 
     # Tools available
     1. `read_example_skills`: Tool to read the example SKILL.md file
-    2. `write_skill`: Tool to write a SKILL.md file
+    2. `search_skills`: Tool to search the existing SKILLs most similar to an identified one
+        - Parameters
+            - `query`: the name and a short description of the identified SKILL
+    3. `write_skill`: Tool to write a SKILL.md file
         - Parameters
             - `dir_name`: a one-word lowercase appropriate name for the directory (e.g., 'unix', 'windows', 'python', 'pdf', etc)
             - `file_content`: the content to be written
 
     # Constraints
     1. The parameter `dir_name` and the 'name' property in the frontmatter must match.
-    """,
-    tools=[read_example_skills, read_skills_descriptions, write_skill],
-    exit_conditions=["text"]
-)
+    """
 
 
 @component
 class FixedLinkContentFetcher:
-    def __init__(self):
-        self.fetcher = LinkContentFetcher(
-            timeout=3,
-            raise_on_failure=False,
-            retry_attempts=2
-        )
+    """
+    Fetches the pages of the SKILLs definition (agentskills.io).
+
+    Nothing is fetched while the summarized snapshot is younger than `ttl` seconds, the cache
+    checker uses it. Older pages are requested conditionally (ETag / Last-Modified), an
+    unchanged page (304) is the snapshot's copy, fetched again.
+    """
+
+    URLS = ["https://agentskills.io/what-are-skills",
+            "https://agentskills.io/specification"]
+
+    def __init__(self, store: SkillDefinitionStore, ttl: float = SKILLS_DEFINITION_TTL, timeout: int = 3,
+                 retry_attempts: int = 2):
+        self.store = store
+        self.ttl = ttl
+        self.timeout = timeout
+        self.retry_attempts = retry_attempts
+
+    def _get(self, url: str, headers: dict) -> Optional[requests.Response]:
+        for attempt in range(self.retry_attempts + 1):
+            try:
+                return requests.get(url, headers=headers, timeout=self.timeout)
+            except requests.RequestException as e:
+                if attempt == self.retry_attempts:
+                    logger.warning("Could not fetch %s: %s", url, e)
+        return None
+
+    def _fetch(self, url: str, previous: Optional[ByteStream], now: float) -> Optional[ByteStream]:
+        headers = {}
+        if previous is not None and previous.meta.get("etag"):
+            headers["If-None-Match"] = previous.meta["etag"]
+        if previous is not None and previous.meta.get("last_modified"):
+            headers["If-Modified-Since"] = previous.meta["last_modified"]
+        response = self._get(url, headers)
+        if response is None:
+            return None
+        if response.status_code == 304 and previous is not None:
+            return ByteStream(data=previous.data, meta={**previous.meta, "fetched_at": now},
+                              mime_type=previous.mime_type)
+        if response.status_code != 200:
+            logger.warning("Could not fetch %s: HTTP %d", url, response.status_code)
+            return None
+        mime_type = response.headers.get("Content-Type", "text/html").split(";")[0]
+        return ByteStream(data=response.content, mime_type=mime_type,
+                          meta={"url": url, "fetched_at": now, "etag": response.headers.get("ETag"),
+                                "last_modified": response.headers.get("Last-Modified")})
 
     @component.output_types(streams=list[ByteStream])
     def run(self):
-        urls = ["https://agentskills.io/what-are-skills",
-                "https://agentskills.io/specification"]
-        return {"streams": self.fetcher.run(urls)["streams"]}
-
-
-pipeline = Pipeline(max_runs_per_component=1)
-pipeline.add_component("fetcher", FixedLinkContentFetcher())
-pipeline.add_component("html", HTMLToDocument())
-pipeline.add_component("summarizer", ChatPromptBuilder(
-    template=[
-        ChatMessage.from_user("""
-        Consider the following definition about SKILLs (developed by Anthropic [Claude]).
-        You have to summarize it and return it in clear Markdown format.
-        <skill_definition>
-        {% for doc in docs %}
-            {{ doc.content }}
-        {% endfor %}                  
-        </skill_definition>
-        """)],
-    required_variables=["docs"]
-))
-"""
-        Consider the following summarized definition of SKILLs:
-        <skill_definition>
-        {{replies[0].text}}
-        </skill_definition>
+        if SKILLS_DEFINITION_OFFLINE:
+            return {"streams": []}
+        # Only a snapshot with its summary is worth revalidating
+        snapshot = {stream.meta["url"]: stream for stream in self.store.summarized_snapshot()}
+        now = time.time()
+        if snapshot and now - min(stream.meta.get("fetched_at") or 0 for stream in snapshot.values()) < self.ttl:
+            return {"streams": []}
+        streams = [self._fetch(url, snapshot.get(url), now) for url in self.URLS]
+        # A partial definition would change the cache key, the snapshot is used instead
+        if any(stream is None for stream in streams):
+            return {"streams": []}
+        return {"streams": streams}
+
+
+@lazy
+def get_skill_tool() -> PipelineTool:
+    """
+    Builds (once per process) the skill_tool, nothing is created until the first call.
+    """
+    # The summarized definition only changes when the pages (or the model) change
+    definition_store = SkillDefinitionStore(
+        SKILLS_DEFINITION_CACHE_DIR, model=THINKING_MODEL)
+
+    agent = Agent(
+        chat_generator=create_thinking_generator(),
+        system_prompt=SYSTEM_PROMPT,
+        tools=[read_example_skills, search_skills, write_skill],
+        exit_conditions=["text"],
+        streaming_callback=tagged_callback("skills")
+    )
+
+    pipeline = Pipeline(max_runs_per_component=1)
+    pipeline.add_component("fetcher", FixedLinkContentFetcher(definition_store))
+    pipeline.add_component(
+        "definition_cache", SkillDefinitionCacheChecker(definition_store))
+    pipeline.add_component("html", HTMLToDocument())
+    pipeline.add_component("summarizer", ChatPromptBuilder(
+        template=[
+            ChatMessage.from_user("""
+            Consider the following definition about SKILLs (developed by Anthropic [Claude]).
+            You have to summarize it and return it in clear Markdown format.
+            <skill_definition>
+            {% for doc in docs %}
+                {{ doc.content }}
+            {% endfor %}                  
+            </skill_definition>
+            """)],
+        required_variables=["docs"]
+    ))
+    """
+            Consider the following summarized definition of SKILLs:
+            <skill_definition>
+            {{replies[0].text}}
+            </skill_definition>
                               
-        For the code to build the SKILLs, you MUST strictly follow the syntax and examples in the following documents:
-        <angular_documentation>
-        {% for doc in documentation %}
-            {{ doc.content }}
-        {% endfor %}
-        </angular_documentation>
+            For the code to build the SKILLs, you MUST strictly follow the syntax and examples in the following documents:
+            <angular_documentation>
+            {% for doc in documentation %}
+                {{ doc.content }}
+            {% endfor %}
+            </angular_documentation>
                               
-        User request:
-        <user_request>
-        {{query}}
-        </user_request>
-"""
-pipeline.add_component("builder", ChatPromptBuilder(
-    template=[
-        ChatMessage.from_user("""
-        Consider the following summarized definition of SKILLs:
-        <skill_definition>
-        {{replies[0].text}}
-        </skill_definition>
+            User request:
+            <user_request>
+            {{query}}
+            </user_request>
+    """
+    pipeline.add_component("builder", ChatPromptBuilder(
+        template=[
+            ChatMessage.from_user("""
+            Consider the following summarized definition of SKILLs:
+            <skill_definition>
+            {{replies[0].text}}
+            </skill_definition>
                               
-        For the code to build the SKILLs, you MUST strictly follow the syntax and examples
-        from documentation_tool.
+            For the code to build the SKILLs, you MUST strictly follow the syntax and examples
+            from documentation_tool.
                               
-        User request:
-        <user_request>
-        {{query}}
-        </user_request>
-        """)
-    ],
-    required_variables=["replies", "query"]
-))
-pipeline.add_component("chat_summarizer", thinking_generator)
-pipeline.add_component("agent", agent)
-
-pipeline.connect("fetcher.streams", "html.sources")
-pipeline.connect("html.documents", "summarizer.docs")
-pipeline.connect("summarizer.prompt", "chat_summarizer.messages")
-pipeline.connect("chat_summarizer.replies", "builder.replies")
-pipeline.connect("builder.prompt", "agent.messages")
-
-skill_tool = PipelineTool(
-    pipeline=pipeline,
-    parameters={
-        "type": "object",
-        "properties": {
-            "query": {
-                "type": "string",
-                "description": "The user request to identify the SKILLs"
+            User request:
+            <user_request>
+            {{query}}
+            </user_request>
+            """)
+        ],
+        required_variables=["replies", "query"]
+    ))
+    pipeline.add_component("chat_summarizer", create_thinking_generator(
+        streaming_callback=tagged_callback("skills.definition")))
+    pipeline.add_component(
+        "definition_writer", SkillDefinitionCacheWriter(definition_store))
+    # Receives the definition either from the cache or from the summarizer
+    pipeline.add_component("definition", BranchJoiner(List[ChatMessage]))
+    pipeline.add_component("agent", agent)
+
+    pipeline.connect("fetcher.streams", "definition_cache.streams")
+    pipeline.connect("definition_cache.streams", "html.sources")
+    pipeline.connect("definition_cache.streams", "definition_writer.streams")
+    pipeline.connect("definition_cache.key", "definition_writer.key")
+    pipeline.connect("html.documents", "summarizer.docs")
+    pipeline.connect("summarizer.prompt", "chat_summarizer.messages")
+    pipeline.connect("chat_summarizer.replies", "definition_writer.replies")
+    pipeline.connect("definition_cache.replies", "definition")
+    pipeline.connect("definition_writer.replies", "definition")
+    pipeline.connect("definition.value", "builder.replies")
+    pipeline.connect("builder.prompt", "agent.messages")
+
+    return PipelineTool(
+        pipeline=pipeline,
+        parameters={
+            "type": "object",
+            "properties": {
+                "query": {
+                    "type": "string",
+                    "description": "The user request to identify the SKILLs"
+                }
             }
-        }
-    },
-    input_mapping={
-        # Mapea la variable "query" del componente "builder" a la variable "query"
-        # Tambien mapea la variable "documentation" que viene del State "relevant_documentation" de "inputs_from_state"
-        "query": ["builder.query"],
-        # "documentation": ["builder.documentation"]
-    },
-    # TODO: Keeping it just in case
-    # Mapea la variable del State "relevant_documentation" a la variable "documentation" (parametro del tool)
-    # Se crea en documentation.py
-    # inputs_from_state={
-    #    "relevant_documentation": "documentation"
-    # },
-    # TODO: Cambiar a outputs_to_state? Es una tool y no se está conectando a nada directamente
-    output_mapping={
-        # Mapea el output "messages" del componente "agent" a "messages"
-        "agent.messages": "messages"
-    },
-    name="skill_tool",
-    description="Generates SKILLs based on the user request"
-)
+        },
+        input_mapping={
+            # Mapea la variable "query" del componente "builder" a la variable "query"
+            # Tambien mapea la variable "documentation" que viene del State "relevant_documentation" de "inputs_from_state"
+            "query": ["builder.query"],
+            # "documentation": ["builder.documentation"]
+        },
+        # TODO: Keeping it just in case
+        # Mapea la variable del State "relevant_documentation" a la variable "documentation" (parametro del tool)
+        # Se crea en documentation.py
+        # inputs_from_state={
+        #    "relevant_documentation": "documentation"
+        # },
+        # TODO: Cambiar a outputs_to_state? Es una tool y no se está conectando a nada directamente
+        output_mapping={
+            # Mapea el output "messages" del componente "agent" a "messages"
+            "agent.messages": "messages"
+        },
+        name="skill_tool",
+        description="Generates SKILLs based on the user request"
+    )
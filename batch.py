@@ -0,0 +1,146 @@
+import os
+import json
+import time
+import asyncio
+import argparse
+import traceback
+from typing import TYPE_CHECKING
+from dotenv import load_dotenv
+
+if TYPE_CHECKING:
+    from haystack.dataclasses import ChatMessage
+
+load_dotenv()
+
+
+def read_queries(path: str) -> list[dict]:
+    """
+    Reads the queries from a JSONL file, one `{"id": ..., "query": ...}` per line.
+    Without an id the line number is used.
+    """
+    queries = []
+    with open(path, "r") as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            queries.append({"id": str(entry.get("id", line_number)), "query": entry["query"]})
+    return queries
+
+
+def completed_ids(path: str) -> set:
+    """
+    Returns:
+    - The ids of the queries answered without error, the failed ones are run again on resume
+    """
+    if not os.path.exists(path):
+        return set()
+    done = set()
+    with open(path, "r") as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:
+                # A line cut by a crash is run again
+                continue
+            if "id" in result and not result.get("error"):
+                done.add(result["id"])
+    return done
+
+
+def message_text(message: "ChatMessage") -> str:
+    if message.text:
+        return message.text
+    if message.tool_call_result:
+        return str(message.tool_call_result.result)
+    return json.dumps([{"tool": call.tool_name, "arguments": call.arguments} for call in message.tool_calls])
+
+
+async def run_query(entry: dict) -> dict:
+    # Imported here so `--help` doesn't pay for haystack
+    from haystack.dataclasses import ChatMessage
+    from agents.angular import get_angular_async
+    from agents.request_cache import run_cached_async
+    from instrumentation.tracer import collect_spans, stage_timings
+
+    async def run():
+        response = await get_angular_async().run_async(data={
+            "agent": {
+                "messages": [ChatMessage.from_user(entry["query"])]
+            }
+        })
+        return response["agent"]["messages"]
+
+    start = time.perf_counter()
+    result = {"id": entry["id"], "query": entry["query"], "todo_path": "", "messages": [], "error": None}
+    # The components and tools of this query, none when its answer came from the request cache
+    with collect_spans() as spans:
+        try:
+            # Repeated (template) queries are answered once, also when they run at the same time
+            cached = await run_cached_async(entry["query"], run)
+            messages = cached["messages"]
+            result["todo_path"] = cached["todo_path"]
+            result["messages"] = [
+                {"role": message.role.value, "text": message_text(message)} for message in messages
+            ]
+        except Exception as e:
+            result["error"] = "".join(traceback.format_exception_only(e)).strip()
+    result["timings"] = {"total_s": time.perf_counter() - start, "stages": stage_timings(spans)}
+    return result
+
+
+async def run_batch(input_path: str, output_path: str, concurrency: int):
+    queries = read_queries(input_path)
+    done = completed_ids(output_path)
+    pending = [entry for entry in queries if entry["id"] not in done]
+    print(f"{len(queries)} queries, {len(done)} already completed, {len(pending)} to run")
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def bounded(entry: dict) -> dict:
+        async with semaphore:
+            return await run_query(entry)
+
+    start = time.perf_counter()
+    with open(output_path, "a+") as output:
+        # A crash may have left the last line without its newline
+        if output.tell() > 0:
+            output.seek(output.tell() - 1)
+            if output.read(1) != "\n":
+                output.write("\n")
+        tasks = [asyncio.create_task(bounded(entry)) for entry in pending]
+        for finished, task in enumerate(asyncio.as_completed(tasks), start=1):
+            result = await task
+            # One line per query, written as soon as it finishes so a crash can be resumed
+            output.write(json.dumps(result) + "\n")
+            output.flush()
+            status = "error" if result["error"] else result["todo_path"] or "no TODO path"
+            print(f"[{finished}/{len(pending)}] {result['id']} "
+                  f"({result['timings']['total_s']:.1f}s): {status}")
+
+    from tools.output_store import flush_outputs
+    flush_outputs()
+    elapsed = time.perf_counter() - start
+    print(f"Finished {len(pending)} queries in {elapsed:.1f}s")
+
+    from models.ollama_client import get_residency
+    for model, stats in get_residency().stats().items():
+        print(f"{model}: {stats['calls']} calls, {stats['loads']} loads ({stats['load_ms'] / 1000:.1f}s), "
+              f"{stats['switch_wait_ms'] / 1000:.1f}s waiting for a model switch")
+
+    from agents.request_cache import get_request_cache
+    if get_request_cache.is_built():
+        stats = get_request_cache().stats()
+        print(f"Request cache: {stats['hits']} hits, {stats['misses']} misses, "
+              f"{stats['coalesced']} identical queries run once")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Runs many queries through the angular pipeline sharing the warmed components.")
+    parser.add_argument("input", help="JSONL file with one {\"id\", \"query\"} per line")
+    parser.add_argument("output", help="JSONL file with one result per line, completed ids are skipped")
+    parser.add_argument("--concurrency", type=int, default=2,
+                        help="Queries running at the same time")
+    args = parser.parse_args()
+    asyncio.run(run_batch(args.input, args.output, args.concurrency))
@@ -0,0 +1,223 @@
+import os
+import sys
+import glob
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import subprocess
+import statistics
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCHMARKS_DIR)
+RESULTS_DIR = os.path.join(BENCHMARKS_DIR, "results")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCHMARKS_DIR)
+
+from fake_ollama import start_fake_ollama  # noqa: E402
+
+
+def git_revision() -> tuple[str, bool]:
+    def git(*args):
+        return subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    return git("rev-parse", "--short", "HEAD") or "unknown", bool(git("status", "--porcelain", "--untracked-files=no"))
+
+
+def timing_stats(timings: list[float]) -> dict:
+    from instrumentation.summary import percentile
+    milliseconds = [timing * 1000 for timing in timings]
+    return {
+        "n": len(milliseconds),
+        "mean_ms": statistics.mean(milliseconds),
+        "p50_ms": percentile(milliseconds, 50),
+        "p95_ms": percentile(milliseconds, 95)
+    }
+
+
+def timed(function, *args, **kwargs) -> float:
+    start = time.perf_counter()
+    function(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def read_queries(count: int) -> list[str]:
+    with open(os.path.join(BENCHMARKS_DIR, "fixtures", "queries.txt"), "r") as f:
+        queries = [line.strip() for line in f if line.strip()]
+    return [queries[i % len(queries)] for i in range(count)]
+
+
+def run_stages(queries: list[str]) -> dict:
+    """
+    Runs every tool on its own and then the whole angular pipeline, one query at a time.
+    """
+    from haystack.dataclasses import ChatMessage
+    from tools.indexing import run_indexing
+    from tools.documentation import get_documentation_tool, DocumentationPipeline
+    from agents.skills import get_skill_tool
+    from agents.todo import get_todo_tool
+    from agents.coder import get_coder_tool
+    from agents.angular import get_angular, create_pipeline
+
+    stages = {}
+    start = time.perf_counter()
+    index_stats = run_indexing(force=True)
+    stages["index"] = {**timing_stats([time.perf_counter() - start]),
+                       "chunks": index_stats["added"], "docs_per_second": index_stats["docs_per_second"]}
+
+    documentation = DocumentationPipeline().run(query=queries[0])["relevant_documentation"]
+    tools = {
+        "documentation_tool": lambda query: get_documentation_tool().invoke(query=query),
+        "skill_tool": lambda query: get_skill_tool().invoke(query=query),
+        "todo_tool": lambda query: get_todo_tool().invoke(query=query, documentation=documentation),
+        "coder_tool": lambda query: get_coder_tool().invoke(query=query),
+    }
+    for name, invoke in tools.items():
+        # The first call builds and warms up the tool
+        stages[f"{name}.cold"] = timing_stats([timed(invoke, queries[0])])
+        stages[name] = timing_stats([timed(invoke, query) for query in queries])
+
+    angular = get_angular()
+    run = lambda query: angular.run(data={"agent": {"messages": [ChatMessage.from_user(query)]}})  # noqa: E731
+    stages["angular.cold"] = timing_stats([timed(run, queries[0])])
+    stages["angular"] = timing_stats([timed(run, query) for query in queries])
+
+    planned = create_pipeline(mode="planned")
+    run = lambda query: planned.run(data={"agent": {"messages": [ChatMessage.from_user(query)]}})  # noqa: E731
+    stages["angular.planned"] = timing_stats([timed(run, query) for query in queries])
+    return stages
+
+
+async def run_concurrent(queries: list[str], concurrency: int, mode: str = "agent") -> dict:
+    """
+    Runs the queries through the async pipeline with `concurrency` of them in flight.
+    """
+    from haystack import AsyncPipeline
+    from haystack.dataclasses import ChatMessage
+    from agents.angular import get_angular_async, create_pipeline
+
+    pipeline = get_angular_async() if mode == "agent" else create_pipeline(AsyncPipeline, mode=mode)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def run(query: str):
+        async with semaphore:
+            start = time.perf_counter()
+            await pipeline.run_async(data={"agent": {"messages": [ChatMessage.from_user(query)]}})
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(run(query) for query in queries))
+    elapsed = time.perf_counter() - start
+    return {**timing_stats(latencies), "concurrency": concurrency, "queries_per_second": len(queries) / elapsed}
+
+
+def previous_result(commit: str) -> dict:
+    paths = sorted(glob.glob(os.path.join(RESULTS_DIR, "*.json")), key=os.path.getmtime, reverse=True)
+    for path in paths:
+        with open(path, "r") as f:
+            result = json.load(f)
+        if result["commit"] != commit:
+            return result
+    return None
+
+
+def print_report(result: dict, previous: dict):
+    print(f"\nCommit {result['commit']}{' (dirty)' if result['dirty'] else ''}"
+          + (f", compared with {previous['commit']}" if previous else ""))
+    print(f"{'stage':<26} {'n':>4} {'p50 ms':>9} {'p95 ms':>9} {'delta p50':>10}")
+    for name, stats in result["stages"].items():
+        delta = ""
+        if previous and name in previous["stages"]:
+            before = previous["stages"][name]["p50_ms"]
+            delta = f"{(stats['p50_ms'] - before) / before * 100:+.1f}%" if before else ""
+        print(f"{name:<26} {stats['n']:>4} {stats['p50_ms']:>9.1f} {stats['p95_ms']:>9.1f} {delta:>10}")
+
+    concurrent = result["concurrent"]
+    previous_qps = previous["concurrent"]["queries_per_second"] if previous else None
+    delta = f" ({(concurrent['queries_per_second'] - previous_qps) / previous_qps * 100:+.1f}%)" if previous_qps else ""
+    print(f"\nThroughput with {concurrent['concurrency']} concurrent queries: "
+          f"{concurrent['queries_per_second']:.2f} queries/s{delta}, p50 {concurrent['p50_ms']:.1f}ms")
+    planned = result.get("concurrent_planned")
+    if planned:
+        saved = result["stages"]["angular"]["p50_ms"] - result["stages"]["angular.planned"]["p50_ms"]
+        print(f"Planned mode: {planned['queries_per_second']:.2f} queries/s, p50 {planned['p50_ms']:.1f}ms, "
+              f"{saved:.1f}ms saved per query (p50, one at a time)")
+
+    print(f"\n{'model':<20} {'calls':>6} {'loads':>6} {'load s':>8} {'switch wait s':>14}")
+    for model, stats in result["models"].items():
+        print(f"{model:<20} {stats['calls']:>6} {stats['loads']:>6} {stats['load_ms'] / 1000:>8.1f} "
+              f"{stats['switch_wait_ms'] / 1000:>14.1f}")
+
+    print(f"\n{'slowest components (angular)':<60} {'n':>5} {'p50 ms':>9} {'p95 ms':>9}")
+    for row in result["components"][:10]:
+        print(f"{row['path'][-60:]:<60} {row['count']:>5} {row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f}")
+
+
+def main(args):
+    commit, dirty = git_revision()
+    server = start_fake_ollama(first_token_ms=args.first_token_ms, token_ms=args.token_ms,
+                               embed_ms=args.embed_ms, reply_tokens=args.reply_tokens,
+                               load_ms=args.load_ms, resident_models=args.resident_models)
+    workdir = tempfile.mkdtemp(prefix="angular-benchmark-")
+    # Read by constants.py, so before importing anything from the project
+    os.environ.update({
+        "OLLAMA_URL": server.url,
+        "ANGULAR_LLM_URL": f"{server.url}/llms-full.txt",
+        "DOCUMENT_STORE": "memmap",
+        "ANGULAR_CACHE_DIR": os.path.join(workdir, ".cache"),
+        "ANGULAR_RESULT_DIR": os.path.join(workdir, "result"),
+        "ANGULAR_SKILLS_DIR": os.path.join(workdir, "skills"),
+        "SKILLS_DEFINITION_OFFLINE": "true",
+        "OLLAMA_RESIDENT_MODELS": str(args.resident_models),
+    })
+    for key in ("LANGFUSE_SECRET_KEY", "LANGFUSE_PUBLIC_KEY"):
+        os.environ.pop(key, None)
+
+    from constants import METRICS_FILE
+    from instrumentation.summary import load_records, summarize
+    from models.ollama_client import get_residency
+
+    queries = read_queries(args.iterations)
+    stages = run_stages(queries)
+    concurrent = asyncio.run(run_concurrent(read_queries(args.concurrent_queries), args.concurrency))
+    concurrent_planned = asyncio.run(
+        run_concurrent(read_queries(args.concurrent_queries), args.concurrency, mode="planned"))
+    components = summarize([record for record in load_records(METRICS_FILE)
+                            if record["path"].startswith("pipeline")])
+
+    result = {
+        "commit": commit,
+        "dirty": dirty,
+        "timestamp": time.time(),
+        "config": vars(args),
+        "stages": stages,
+        "concurrent": concurrent,
+        "concurrent_planned": concurrent_planned,
+        "components": components,
+        "models": get_residency().stats(),
+        "requests": server.counts
+    }
+    previous = previous_result(commit)
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    with open(os.path.join(RESULTS_DIR, f"{commit}.json"), "w") as f:
+        json.dump(result, f, indent=2)
+    print_report(result, previous)
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="End-to-end benchmark against a fake Ollama server and a fixture llms-full.txt "
+                    "(no Ollama, Postgres or internet needed). Results are stored per commit in benchmarks/results.")
+    parser.add_argument("--iterations", type=int, default=8, help="Queries per stage")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--concurrent-queries", type=int, default=16)
+    parser.add_argument("--first-token-ms", type=float, default=50, help="Fake model latency before the first token")
+    parser.add_argument("--token-ms", type=float, default=2, help="Fake model latency per token")
+    parser.add_argument("--embed-ms", type=float, default=1, help="Fake embedding latency per text")
+    parser.add_argument("--reply-tokens", type=int, default=50, help="Tokens of every fake text reply")
+    parser.add_argument("--load-ms", type=float, default=1000, help="Fake latency of loading a model")
+    parser.add_argument("--resident-models", type=int, default=2,
+                        help="Models the fake server keeps loaded (also OLLAMA_RESIDENT_MODELS)")
+    main(parser.parse_args())
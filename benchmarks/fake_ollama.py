@@ -0,0 +1,281 @@
+import os
+import re
+import json
+import time
+import hashlib
+import argparse
+import threading
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+EMBEDDING_DIMENSION = 768
+TOKEN_PATTERN = re.compile(r"[A-Za-z0-9@_]+")
+TODO_PATH_PATTERN = re.compile(r"(/[^\s'\"`\\]+/TODO\.md)")
+
+
+def fake_embedding(text: str) -> list[float]:
+    """
+    Deterministic bag-of-words embedding: texts sharing words are close, so retrieval still ranks.
+    """
+    vector = np.zeros(EMBEDDING_DIMENSION)
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        digest = hashlib.sha1(token.encode("utf-8")).digest()
+        index = int.from_bytes(digest[:4], "little") % EMBEDDING_DIMENSION
+        vector[index] += 1.0 if digest[4] & 1 else -1.0
+    norm = np.linalg.norm(vector)
+    return (vector / norm if norm else vector).tolist()
+
+
+def _called_tools(messages: list[dict]) -> list[str]:
+    return [call["function"]["name"]
+            for message in messages if message.get("role") == "assistant"
+            for call in message.get("tool_calls") or []]
+
+
+def _tool_results(messages: list[dict]) -> list[str]:
+    return [message.get("content") or "" for message in messages if message.get("role") == "tool"]
+
+
+def _tool_call(name: str, **arguments) -> dict:
+    return {"function": {"name": name, "arguments": arguments}}
+
+
+def script_reply(messages: list[dict], reply_tokens: int) -> tuple[str, list[dict]]:
+    """
+    Scripted behaviour of every agent, recognized by its system prompt.
+
+    Returns:
+    - The text and the tool calls of the reply
+    """
+    system = next((message.get("content") or "" for message in messages if message.get("role") == "system"), "")
+    query = next((message.get("content") or "" for message in messages if message.get("role") == "user"), "")
+    called = _called_tools(messages)
+    results = _tool_results(messages)
+    filler = " ".join(f"token{i}" for i in range(reply_tokens))
+
+    if "orchestrate various agents" in system:
+        if "documentation_tool" not in called:
+            return "", [_tool_call("documentation_tool", query=query), _tool_call("skill_tool", query=query)]
+        if "todo_tool" not in called:
+            return "", [_tool_call("todo_tool", query=query)]
+        match = TODO_PATH_PATTERN.search("\n".join(results))
+        return f"The TODO list was written to {match.group(1) if match else 'an unknown path'}", []
+    if "expert on Skills" in system:
+        if "search_skills" not in called:
+            return "", [_tool_call("search_skills", query="angular: components, signals and templates")]
+        if "write_skill" not in called and results and results[-1].strip() in ("", "[]"):
+            return "", [_tool_call("write_skill", dir_name="angular",
+                                   file_content=f"---\nname: angular\ndescription: Angular apps\n---\n{filler}")]
+        return "skill already exists", []
+    if "generate a TODO list" in system:
+        if "write_todo" not in called:
+            return "", [_tool_call("write_todo", file_content=f"- Step one\n- Step two\n- {filler}")]
+        return results[-1] if results else "", []
+    if "search query" in system:
+        # Query rewriting of the planned orchestrator
+        return query, []
+    if "expert software engineer" in system:
+        return f"```ts\n@Component({{selector: 'app-list'}})\nexport class List {{ }}\n```\n{filler}", []
+    # Summarizers (documentation_tool and the SKILLs definition)
+    return f"# Summary\n\n{filler}", []
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload: dict, status: int = 200):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self):
+        server = self.server
+        if self.path.endswith("/llms-full.txt"):
+            etag = f'"{hashlib.sha256(server.docs).hexdigest()[:16]}"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; charset=utf-8")
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", str(len(server.docs)))
+            self.end_headers()
+            self.wfile.write(server.docs)
+        elif self.path == "/api/tags":
+            self._send_json({"models": []})
+        elif self.path == "/api/ps":
+            self._send_json({"models": []})
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def do_POST(self):
+        request = self._read_json()
+        if self.path == "/api/embed":
+            self._embed(request)
+        elif self.path == "/api/embeddings":
+            # Legacy endpoint, used by OllamaTextEmbedder
+            self.server.load(request.get("model"))
+            time.sleep(self.server.embed_ms / 1000)
+            self.server.count("embed")
+            self._send_json({"embedding": fake_embedding(request.get("prompt") or "")})
+        elif self.path == "/api/chat":
+            self._chat(request)
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def _embed(self, request: dict):
+        texts = request.get("input")
+        texts = [texts] if isinstance(texts, str) else texts
+        load_duration = self.server.load(request.get("model"))
+        time.sleep(self.server.embed_ms / 1000 * len(texts))
+        self.server.count("embed", len(texts))
+        self._send_json({"model": request.get("model"), "embeddings": [fake_embedding(text) for text in texts],
+                         "load_duration": load_duration})
+
+    def _chat(self, request: dict):
+        server = self.server
+        messages = request.get("messages") or []
+        text, tool_calls = script_reply(messages, server.reply_tokens)
+        server.count("chat")
+        load_duration = server.load(request.get("model"))
+        words = re.findall(r"\S+\s*", text)
+        prompt_tokens = sum(len(TOKEN_PATTERN.findall(message.get("content") or "")) for message in messages)
+        final = {
+            "model": request.get("model"),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "done": True,
+            "done_reason": "stop",
+            "total_duration": 0,
+            "load_duration": load_duration,
+            "prompt_eval_count": prompt_tokens,
+            "eval_count": len(words) + len(tool_calls),
+        }
+
+        time.sleep(server.first_token_ms / 1000)
+        if not request.get("stream", True):
+            time.sleep(server.token_ms / 1000 * len(words))
+            message = {"role": "assistant", "content": text}
+            if tool_calls:
+                message["tool_calls"] = tool_calls
+            self._send_json({**final, "message": message})
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        chunks = [{"role": "assistant", "content": word} for word in words]
+        chunks += [{"role": "assistant", "content": "", "tool_calls": [call]} for call in tool_calls]
+        for index, message in enumerate(chunks):
+            if index:
+                time.sleep(server.token_ms / 1000)
+            self._write_chunk({"model": request.get("model"), "created_at": final["created_at"],
+                               "message": message, "done": False})
+        self._write_chunk({**final, "message": {"role": "assistant", "content": ""}})
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _write_chunk(self, payload: dict):
+        data = (json.dumps(payload) + "\n").encode("utf-8")
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+
+class FakeOllamaServer(ThreadingHTTPServer):
+    """
+    Stand-in for Ollama (/api/chat, /api/embed) and angular.dev (/llms-full.txt).
+
+    Arguments:
+    - first_token_ms: latency before the first chunk of every chat reply
+    - token_ms: latency between chunks
+    - embed_ms: latency per embedded text
+    - reply_tokens: filler tokens of every text reply
+    - load_ms: latency of a call to a model that isn't loaded
+    - resident_models: models loaded at once, the least recently used one is evicted
+    """
+    daemon_threads = True
+
+    def __init__(self, address: tuple, first_token_ms: float = 50, token_ms: float = 2,
+                 embed_ms: float = 1, reply_tokens: int = 50, load_ms: float = 0, resident_models: int = 2,
+                 docs_path: str = None):
+        super().__init__(address, FakeOllamaHandler)
+        self.first_token_ms = first_token_ms
+        self.token_ms = token_ms
+        self.embed_ms = embed_ms
+        self.reply_tokens = reply_tokens
+        self.load_ms = load_ms
+        self.resident_models = resident_models
+        self.resident = []
+        with open(docs_path or os.path.join(FIXTURES_DIR, "llms-full.txt"), "rb") as f:
+            self.docs = f.read()
+        self.counts = {}
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, name: str, amount: int = 1):
+        with self._lock:
+            self.counts[name] = self.counts.get(name, 0) + amount
+
+    def load(self, model: str) -> int:
+        """
+        Loads `model` if it isn't resident, like Ollama evicting the least recently used model.
+
+        Returns:
+        - The load duration in nanoseconds
+        """
+        with self._lock:
+            loaded = model in self.resident
+            if loaded:
+                self.resident.remove(model)
+            self.resident.append(model)
+            del self.resident[:-self.resident_models]
+            if not loaded:
+                # Calls to the model being loaded wait for it too
+                time.sleep(self.load_ms / 1000)
+                self.counts["loads"] = self.counts.get("loads", 0) + 1
+        return 0 if loaded else int(self.load_ms * 1e6)
+
+
+def start_fake_ollama(port: int = 0, **config) -> FakeOllamaServer:
+    """
+    Starts the fake server in a daemon thread, `port=0` picks a free port (see `server.url`).
+    """
+    server = FakeOllamaServer(("127.0.0.1", port), **config)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Fake Ollama server, run the app against it with OLLAMA_URL / ANGULAR_LLM_URL.")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--first-token-ms", type=float, default=50)
+    parser.add_argument("--token-ms", type=float, default=2)
+    parser.add_argument("--embed-ms", type=float, default=1)
+    parser.add_argument("--reply-tokens", type=int, default=50)
+    parser.add_argument("--load-ms", type=float, default=0)
+    parser.add_argument("--resident-models", type=int, default=2)
+    args = parser.parse_args()
+    server = FakeOllamaServer(("127.0.0.1", args.port), first_token_ms=args.first_token_ms,
+                              token_ms=args.token_ms, embed_ms=args.embed_ms, reply_tokens=args.reply_tokens,
+                              load_ms=args.load_ms, resident_models=args.resident_models)
+    print(f"OLLAMA_URL={server.url} ANGULAR_LLM_URL={server.url}/llms-full.txt")
+    server.serve_forever()
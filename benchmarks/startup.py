@@ -0,0 +1,54 @@
+import os
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Imports must build nothing, the getters are only called by the last case
+CHECK_NOTHING_BUILT = "import registry; assert not registry.built(), registry.built()"
+
+CASES = {
+    "main.py --help": ["main.py", "--help"],
+    "index.py --help": ["index.py", "--help"],
+    "batch.py --help": ["batch.py", "--help"],
+    "import tools.documentation": ["-c", f"import tools.documentation; {CHECK_NOTHING_BUILT}"],
+    "import agents.angular": ["-c", f"import agents.angular; {CHECK_NOTHING_BUILT}"],
+    "build angular pipeline": ["-c", "from agents.angular import get_angular; get_angular()"],
+}
+
+
+def measure(args: list[str], repeat: int) -> list[float]:
+    """
+    Runs `python <args>` `repeat` times in a fresh process.
+
+    Returns:
+    - The wall time of every run in seconds
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        process = subprocess.run([sys.executable, *args], cwd=ROOT,
+                                 stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        timings.append(time.perf_counter() - start)
+        if process.returncode != 0:
+            raise RuntimeError(f"python {' '.join(args)} failed:\n{process.stderr}")
+    return timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Measures the startup time of the CLIs and of importing / building the pipelines.")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--skip-build", action="store_true",
+                        help="Don't measure building the angular pipeline")
+    args = parser.parse_args()
+
+    print(f"{'case':<28} {'min s':>8} {'median s':>9} {'max s':>8}")
+    for name, case_args in CASES.items():
+        if args.skip_build and name == "build angular pipeline":
+            continue
+        timings = measure(case_args, args.repeat)
+        print(f"{name:<28} {min(timings):>8.3f} {statistics.median(timings):>9.3f} {max(timings):>8.3f}")
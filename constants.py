@@ -1,6 +1,144 @@
+import os
+
+# The paths and urls can be overridden with environment variables (e.g. by benchmarks/e2e.py)
+OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434")
 CODER_MODEL = "qwen3-coder:30b"  # qwen3-coder-next:cloud
 THINKING_MODEL = "gpt-oss:20b"  # "kimi-k2.5:cloud"
 EMBEDDER_MODEL = "nomic-embed-text"  # "qwen3-embedding"
-RESULT_DIR = "/home/eric/haystack-angular/result"
+
+# Shared Ollama client (see models/ollama_client.py)
+OLLAMA_TIMEOUT = 3600
+OLLAMA_MAX_CONNECTIONS = 16
+# How long Ollama keeps every model loaded after its last call
+OLLAMA_KEEP_ALIVE = {
+    THINKING_MODEL: "30m",
+    CODER_MODEL: "10m",
+    EMBEDDER_MODEL: "30m"
+}
+# Models the inference box fits at once, calls to other models wait for one of them to be idle
+OLLAMA_RESIDENT_MODELS = int(os.getenv("OLLAMA_RESIDENT_MODELS", "2"))
+# Seconds a call waits for a model switch before the calls to the loaded models stop going first
+OLLAMA_MAX_SWITCH_WAIT = 30
+# Loads reported by Ollama (load_duration) shorter than this are not counted as reloads
+OLLAMA_RELOAD_THRESHOLD_MS = 500
+RESULT_DIR = os.getenv("ANGULAR_RESULT_DIR", "/home/eric/haystack-angular/result")
 EXAMPLE_SKILLS_DIR = "/home/eric/haystack-angular/example_skills"
-SKILLS_DIR = "/home/eric/haystack-angular/skills"
+SKILLS_DIR = os.getenv("ANGULAR_SKILLS_DIR", "/home/eric/haystack-angular/skills")
+CACHE_DIR = os.getenv("ANGULAR_CACHE_DIR", "/home/eric/haystack-angular/.cache")
+
+# https://angular.dev/llms-full.txt
+# https://angular.dev/assets/context/llms-full.txt
+LLM_URL = os.getenv("ANGULAR_LLM_URL", "https://angular.dev/assets/context/llms-full.txt")
+# Versioned documentation sources (urls or local files) indexed into the same store with `meta.version`,
+# e.g. ANGULAR_DOC_SOURCES="v20=https://angular.dev/assets/context/llms-full.txt,v17=/docs/v17/llms-full.txt"
+DOC_SOURCES = dict(
+    source.strip().split("=", 1) for source in os.getenv("ANGULAR_DOC_SOURCES", "").split(",") if source.strip()
+) or {"latest": LLM_URL}
+# Version searched when the request doesn't select one
+DEFAULT_DOC_VERSION = os.getenv("ANGULAR_DOC_VERSION", next(iter(DOC_SOURCES)))
+
+# Freshness of the documentation index (ETag, Last-Modified and content hash)
+INDEX_STATE_FILE = f"{CACHE_DIR}/index_state.json"
+# Seconds before a query triggers a new freshness check of the DOC_SOURCES
+INDEX_MAX_AGE = 3600
+
+# On-disk cache of the Ollama embeddings
+EMBEDDING_CACHE_FILE = f"{CACHE_DIR}/embeddings.sqlite"
+EMBEDDING_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+# Concurrent embedding of the documentation while indexing
+EMBED_BATCH_SIZE = 32
+EMBED_WORKERS = 4
+
+# Vector store: "pgvector" or "memmap" (in-process, no Postgres needed)
+DOCUMENT_STORE = os.getenv("DOCUMENT_STORE", "pgvector")
+MEMMAP_STORE_DIR = f"{CACHE_DIR}/memmap_store"
+# "float32", "float16" or "int8"
+MEMMAP_DTYPE = "float32"
+
+# pgvector search strategy: "exact_nearest_neighbor" or "hnsw" (see hnsw.py to build and tune the index)
+PGVECTOR_SEARCH_STRATEGY = "exact_nearest_neighbor"
+HNSW_M = 16
+HNSW_EF_CONSTRUCTION = 64
+HNSW_EF_SEARCH = 40
+# Filtered HNSW searches (e.g. by version) keep scanning the graph until top_k rows match,
+# "relaxed_order" needs pgvector >= 0.8, "off" for older versions
+HNSW_ITERATIVE_SCAN = "relaxed_order"
+# Metadata fields with a btree index in pgvector, so the filtered searches only read the matching rows
+PGVECTOR_INDEXED_META_FIELDS = ["version"]
+
+# Chunks of the documentation, split by headings and never inside a code fence
+SPLIT_MAX_WORDS = 250
+# Sections of the documentation (see stores/sections.py), retrieved chunks are expanded
+# to the biggest (parent) section within SECTION_EXPAND_MAX_WORDS
+SECTION_INDEX_FILE = f"{CACHE_DIR}/sections.json"
+SECTION_EXPAND_MAX_WORDS = 600
+
+# Documents returned by documentation_tool after fusing the embedding and keyword rankings
+RETRIEVER_TOP_K = 2
+HYBRID_BRANCH_TOP_K = 5
+
+# Estimated tokens of documentation pasted in the documentation_tool and todo_tool prompts
+# (best scored chunks first), see tools/prompt_packer.py
+DOCUMENTATION_TOKEN_BUDGET = 1500
+TODO_DOCUMENTATION_TOKEN_BUDGET = 2500
+
+# Semantic cache of the documentation_tool summaries
+RESPONSE_CACHE_FILE = f"{CACHE_DIR}/responses.sqlite"
+# Minimum cosine similarity between two queries that retrieved the same chunks
+RESPONSE_CACHE_THRESHOLD = 0.92
+RESPONSE_CACHE_TTL = 7 * 24 * 3600
+RESPONSE_CACHE_MAX_ENTRIES = 5000
+
+# Summarized SKILLs definition (agentskills.io) keyed by the fetched pages and the model
+SKILLS_DEFINITION_CACHE_DIR = f"{CACHE_DIR}/skill_definition"
+# Uses the stored snapshot without fetching agentskills.io
+SKILLS_DEFINITION_OFFLINE = os.getenv("SKILLS_DEFINITION_OFFLINE", "false").lower() == "true"
+# Seconds the fetched pages are used before asking agentskills.io again (conditionally)
+SKILLS_DEFINITION_TTL = 24 * 3600
+
+# Manifest of the SKILLs (name, description and their embedding), checked against the files' mtime
+SKILLS_INDEX_FILE = f"{CACHE_DIR}/skills_index.json"
+# SKILLs returned by search_skills
+SKILLS_SEARCH_TOP_K = 5
+
+# Locks and content hashes of the written SKILL.md / TODO.md files (see tools/output_store.py)
+OUTPUT_STORE_DIR = f"{CACHE_DIR}/output_store"
+# Fsyncs the written files together at the end of a batch instead of one by one
+OUTPUT_BATCHED_FLUSH = False
+
+# Memoized tool results (see tools/tool_cache.py), opt-in
+TOOL_CACHE_ENABLED = os.getenv("TOOL_CACHE_ENABLED", "false").lower() == "true"
+TOOL_CACHE_FILE = f"{CACHE_DIR}/tool_results.sqlite"
+TOOL_CACHE_MEMORY_ENTRIES = 256
+TOOL_CACHE_MAX_ENTRIES = 5000
+# Seconds a result is reused, per tool (tools missing here are never memoized). The results of
+# skill_tool are keyed by the SKILLs on disk and the ones of todo_tool need their TODO.md to exist
+TOOL_CACHE_TTL = {
+    "documentation_tool": 24 * 3600,
+    "skill_tool": 3600,
+    "todo_tool": 7 * 24 * 3600,
+    "coder_tool": 7 * 24 * 3600
+}
+
+# Whole requests answered before (TODO path and messages) keyed by normalized query and config,
+# identical requests in flight share one run (see agents/request_cache.py), opt-in
+REQUEST_CACHE_ENABLED = os.getenv("REQUEST_CACHE_ENABLED", "false").lower() == "true"
+REQUEST_CACHE_FILE = f"{CACHE_DIR}/requests.sqlite"
+REQUEST_CACHE_TTL = 7 * 24 * 3600
+REQUEST_CACHE_MAX_ENTRIES = 2000
+
+# Orchestrator: "agent" (the LLM decides every tool call) or "planned" (documentation and skills,
+# then todo, run directly, see agents/planned.py)
+ORCHESTRATOR_MODE = os.getenv("ORCHESTRATOR_MODE", "agent")
+# Per request budget of the planned mode: steps (tool calls and LLM round trips of the orchestrator),
+# tokens of every LLM call (sub-agents included) and seconds
+PLAN_MAX_STEPS = 12
+PLAN_MAX_TOKENS = 200_000
+PLAN_MAX_SECONDS = 900
+# One LLM call to turn the request into a concise documentation query
+PLAN_REWRITE_QUERY = True
+
+# Local metrics of every component / tool call (wall time, queue wait, tokens, retries), see metrics.py
+METRICS_ENABLED = True
+METRICS_FILE = f"{CACHE_DIR}/metrics.jsonl"
@@ -0,0 +1,62 @@
+import argparse
+from constants import DOCUMENT_STORE, HNSW_M, HNSW_EF_CONSTRUCTION, HNSW_EF_SEARCH
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def build(m: int, ef_construction: int):
+    from stores.documents import get_document_store
+    from stores.hnsw import build_hnsw_index
+
+    document_store = get_document_store()
+
+    print(f"Building HNSW index (m={m}, ef_construction={ef_construction}) "
+          f"over {document_store.count_documents()} documents...")
+    seconds = build_hnsw_index(document_store, m=m, ef_construction=ef_construction)
+    print(f"Index built in {seconds:.1f}s")
+
+
+def report(queries_path: str, ef_search_values: list[int], top_k: int):
+    from stores.documents import get_document_store
+    from stores.hnsw import recall_report
+    from models.ollama import get_text_embedder
+
+    document_store = get_document_store()
+    text_embedder = get_text_embedder()
+
+    with open(queries_path, "r") as f:
+        queries = [line.strip() for line in f if line.strip()]
+    text_embedder.warm_up()
+    embeddings = [text_embedder.run(text=query)["embedding"] for query in queries]
+
+    print(f"Recall@{top_k} against exact search over {len(queries)} queries\n")
+    print(f"{'ef_search':>10} {'recall':>8} {'p50 ms':>8} {'p95 ms':>8}")
+    for row in recall_report(document_store, embeddings, ef_search_values, top_k=top_k):
+        print(f"{row['ef_search']:>10} {row['recall']:>8.3f} {row['p50_ms']:>8.2f} {row['p95_ms']:>8.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Builds and tunes the HNSW index of the pgvector store.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="(Re)creates the HNSW index")
+    build_parser.add_argument("--m", type=int, default=HNSW_M)
+    build_parser.add_argument("--ef-construction", type=int, default=HNSW_EF_CONSTRUCTION)
+
+    report_parser = subparsers.add_parser(
+        "report", help="Recall vs latency of HNSW compared with exact search")
+    report_parser.add_argument("--queries", required=True,
+                               help="Text file with one real query per line")
+    report_parser.add_argument("--ef-search", type=int, nargs="+",
+                               default=[10, HNSW_EF_SEARCH, 100, 200])
+    report_parser.add_argument("--top-k", type=int, default=10)
+
+    args = parser.parse_args()
+    if DOCUMENT_STORE != "pgvector":
+        parser.error("HNSW indexes are only available with DOCUMENT_STORE = 'pgvector'")
+    if args.command == "build":
+        build(args.m, args.ef_construction)
+    else:
+        report(args.queries, args.ef_search, args.top_k)
@@ -0,0 +1,33 @@
+import argparse
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def run_index(force: bool = False):
+    # Imported here so `--help` doesn't pay for haystack
+    from tools.indexing import run_indexing
+    from instrumentation.tracer import enable_metrics
+    from constants import METRICS_ENABLED, METRICS_FILE
+
+    if METRICS_ENABLED:
+        enable_metrics(METRICS_FILE)
+
+    print("Indexing Angular documentation...")
+    stats = run_indexing(force=force)
+    print(f"Status: {stats['status']}")
+    if stats["status"] == "indexed":
+        print(f"Chunks added: {stats['added']}")
+        print(f"Chunks removed: {stats['removed']}")
+        print(f"Chunks unchanged: {stats['unchanged']}")
+        print(f"Embedding throughput: {stats['docs_per_second']:.1f} docs/sec")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Builds the Angular documentation index used by documentation_tool.")
+    parser.add_argument("--reindex", action="store_true",
+                        help="Fetch every source of ANGULAR_DOC_SOURCES again ignoring its ETag / Last-Modified / mtime, "
+                             "only changed chunks are embedded")
+    args = parser.parse_args()
+    run_index(force=args.reindex)
@@ -0,0 +1,98 @@
+import json
+import math
+from typing import Optional
+
+
+def load_records(path: str, since: Optional[float] = None, last_runs: Optional[int] = None) -> list[dict]:
+    """
+    Reads the records written by the MetricsTracer.
+
+    Arguments:
+    - since: only records newer than this unix timestamp
+    - last_runs: only the records of the last N root runs (e.g. the last N queries)
+    """
+    records = []
+    try:
+        with open(path, "r") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if since is None or record["ts"] >= since:
+                    records.append(record)
+    except FileNotFoundError:
+        return []
+
+    if last_runs is not None:
+        run_ids = list(dict.fromkeys(record["run_id"] for record in records))[-last_runs:]
+        keep = set(run_ids)
+        records = [record for record in records if record["run_id"] in keep]
+    return records
+
+
+def percentile(values: list[float], q: float) -> float:
+    """
+    Nearest-rank percentile, `q` between 0 and 100.
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+def compare_modes(records: list[dict], path: str = "pipeline/agent") -> dict:
+    """
+    Compares the orchestrator runs (`path`) of the agent and the planned modes.
+
+    Returns:
+    - Per mode: runs and p50 / p95 wall time, plus the p50 time saved by the planned mode
+      when both modes have runs
+    """
+    modes = {}
+    for record in records:
+        if record["path"] == path:
+            modes.setdefault(record.get("mode") or "agent", []).append(record["wall_ms"])
+
+    comparison = {mode: {"count": len(wall), "p50_ms": percentile(wall, 50), "p95_ms": percentile(wall, 95)}
+                  for mode, wall in modes.items()}
+    if "agent" in comparison and "planned" in comparison:
+        saved = comparison["agent"]["p50_ms"] - comparison["planned"]["p50_ms"]
+        comparison["saved_p50_ms"] = saved
+        comparison["saved_ratio"] = saved / comparison["agent"]["p50_ms"] if comparison["agent"]["p50_ms"] else 0.0
+    return comparison
+
+
+def summarize(records: list[dict]) -> list[dict]:
+    """
+    Aggregates the records by component / tool path.
+
+    Returns:
+    - One row per path with count, p50 / p95 wall time and queue wait, tokens, retries, LLM calls
+      avoided by the tool cache and errors,
+      sorted by total wall time
+    """
+    groups = {}
+    for record in records:
+        groups.setdefault(record["path"], []).append(record)
+
+    rows = []
+    for path, group in groups.items():
+        wall = [record["wall_ms"] for record in group]
+        wait = [record["queue_wait_ms"] for record in group]
+        rows.append({
+            "path": path,
+            "type": group[0]["type"],
+            "count": len(group),
+            "total_ms": sum(wall),
+            "p50_ms": percentile(wall, 50),
+            "p95_ms": percentile(wall, 95),
+            "wait_p50_ms": percentile(wait, 50),
+            "wait_p95_ms": percentile(wait, 95),
+            "prompt_tokens": sum(record["prompt_tokens"] for record in group),
+            "completion_tokens": sum(record["completion_tokens"] for record in group),
+            "retries": sum(record["retries"] for record in group),
+            "llm_calls_avoided": sum(record.get("llm_calls_avoided", 0) for record in group),
+            "errors": sum(1 for record in group if record["error"])
+        })
+    return sorted(rows, key=lambda row: row["total_ms"], reverse=True)
@@ -0,0 +1,256 @@
+import os
+import json
+import time
+import uuid
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator, Optional
+from haystack import tracing
+from haystack.tools import Tool
+from haystack.tracing import Span, Tracer
+
+COMPONENT_RUN = "haystack.component.run"
+TOOL_INVOKE = "angular.tool.invoke"
+# Spans covered by the component / tool span that contains them
+TRANSPARENT = {"haystack.pipeline.run", "haystack.async_pipeline.run", "haystack.agent.run"}
+
+_current_span: ContextVar[Optional["MetricsSpan"]] = ContextVar("metrics_span", default=None)
+# When the current tool calls were handed to a thread pool outside a ToolInvoker (e.g. the planned
+# orchestrator), the copied context reaches the worker threads so the tool span knows how long it waited
+_tools_submitted: ContextVar[Optional[float]] = ContextVar("tools_submitted", default=None)
+# Records of the spans finished inside `collect_spans`, the copied contexts share the list
+_collected: ContextVar[Optional[list]] = ContextVar("collected_spans", default=None)
+
+
+class JsonlMetricsSink:
+    """
+    Appends one JSON line per finished span.
+    """
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+
+    def write(self, record: dict):
+        line = json.dumps(record) + "\n"
+        with self._lock:
+            with open(self.path, "a") as f:
+                f.write(line)
+
+
+class MetricsSpan(Span):
+    """
+    Wraps the span of the actual tracer (Langfuse or the no-op one) and keeps the timings
+    and token usage of the operation.
+    """
+
+    def __init__(self, inner: Span, operation: str, tags: Optional[dict], parent: Optional["MetricsSpan"]):
+        self.inner = inner
+        self.operation = operation
+        self.tags = dict(tags or {})
+        self.parent = parent
+        self.run_id = parent.run_id if parent else uuid.uuid4().hex
+        self.start = time.perf_counter()
+        self.last_child_end = None
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.error = None
+
+        if operation == COMPONENT_RUN:
+            self.name = self.tags.get("haystack.component.name")
+        elif operation == TOOL_INVOKE:
+            self.name = self.tags.get("angular.tool.name")
+        elif operation in TRANSPARENT:
+            self.name = None if parent else "pipeline"
+        else:
+            self.name = operation
+
+    @property
+    def path(self) -> str:
+        names = []
+        span = self
+        while span is not None:
+            if span.name:
+                names.append(span.name)
+            span = span.parent
+        return "/".join(reversed(names))
+
+    def set_tag(self, key: str, value: Any) -> None:
+        self.tags[key] = value
+        self.inner.set_tag(key, value)
+
+    def set_content_tag(self, key: str, value: Any) -> None:
+        # Only the usage is read, the content reaches the inner tracer when content tracing is enabled
+        if key == "haystack.component.output" and isinstance(value, dict):
+            for reply in value.get("replies") or []:
+                usage = (getattr(reply, "meta", None) or {}).get("usage") or {}
+                self.prompt_tokens += usage.get("prompt_tokens") or 0
+                self.completion_tokens += usage.get("completion_tokens") or 0
+        self.inner.set_content_tag(key, value)
+
+    def raw_span(self) -> Any:
+        return self.inner.raw_span()
+
+    def get_correlation_data_for_logs(self) -> dict[str, Any]:
+        return self.inner.get_correlation_data_for_logs()
+
+    def queue_wait_ms(self) -> float:
+        """
+        Tool calls: time between their submission and a worker picking them up, a ToolInvoker
+        submits every call of the turn when it starts.
+        Components: time since the parent started or its previous child finished, i.e. the
+        time spent by the pipeline scheduling the component.
+        """
+        if "angular.queue_wait_ms" in self.tags:
+            return self.tags["angular.queue_wait_ms"]
+        if self.parent is None:
+            return 0.0
+        if self.operation == TOOL_INVOKE and self.parent.operation == COMPONENT_RUN:
+            return max(0.0, (self.start - self.parent.start) * 1000)
+        ready = max(self.parent.start, self.parent.last_child_end or self.parent.start)
+        return max(0.0, (self.start - ready) * 1000)
+
+    def record(self, end: float) -> dict:
+        visits = self.tags.get("haystack.component.visits") or 1
+        # In an Agent the visits are its steps, in a pipeline they are re-runs of the component
+        in_agent_loop = self.parent is not None and self.parent.operation == "haystack.agent.run"
+        return {
+            "ts": time.time(),
+            "run_id": self.run_id,
+            "path": self.path,
+            "name": self.name,
+            "type": self.tags.get("haystack.component.type") or self.operation,
+            "wall_ms": (end - self.start) * 1000,
+            "queue_wait_ms": self.queue_wait_ms(),
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "visits": visits,
+            "retries": 0 if in_agent_loop else max(0, visits - 1),
+            # Tool results reused from the tool cache (see tools/tool_cache.py)
+            "llm_calls_avoided": self.tags.get("angular.llm_calls_avoided") or 0,
+            # Orchestrator run in the planned mode (see agents/planned.py)
+            "mode": self.tags.get("angular.mode"),
+            "error": self.error
+        }
+
+
+class MetricsTracer(Tracer):
+    """
+    Tracer recording the metrics of every component, tool call and custom span to `sink`,
+    everything is also forwarded to `inner` (e.g. the Langfuse tracer).
+    """
+
+    def __init__(self, inner: Tracer, sink: JsonlMetricsSink):
+        self.inner = inner
+        self.sink = sink
+
+    @contextmanager
+    def trace(self, operation_name: str, tags: Optional[dict[str, Any]] = None,
+              parent_span: Optional[Span] = None) -> Iterator[Span]:
+        if isinstance(parent_span, MetricsSpan):
+            parent, inner_parent = parent_span, parent_span.inner
+        else:
+            parent, inner_parent = _current_span.get(), parent_span
+
+        with self.inner.trace(operation_name, tags=tags, parent_span=inner_parent) as inner:
+            span = MetricsSpan(inner, operation_name, tags, parent)
+            token = _current_span.set(span)
+            try:
+                yield span
+            except BaseException as e:
+                span.error = type(e).__name__
+                raise
+            finally:
+                _current_span.reset(token)
+                end = time.perf_counter()
+                if parent is not None:
+                    parent.last_child_end = max(parent.last_child_end or end, end)
+                if span.name:
+                    record = span.record(end)
+                    self.sink.write(record)
+                    collected = _collected.get()
+                    if collected is not None:
+                        collected.append(record)
+
+    def current_span(self) -> Optional[Span]:
+        return _current_span.get() or self.inner.current_span()
+
+
+_lock = threading.Lock()
+
+
+def enable_metrics(path: str) -> MetricsTracer:
+    """
+    Wraps the active tracer with a MetricsTracer writing to `path`.
+    Call it after creating a LangfuseConnector, which replaces the active tracer.
+    """
+    with _lock:
+        active = tracing.tracer.actual_tracer
+        if isinstance(active, MetricsTracer):
+            return active
+        metrics_tracer = MetricsTracer(active, JsonlMetricsSink(path))
+        tracing.enable_tracing(metrics_tracer)
+        return metrics_tracer
+
+
+@contextmanager
+def tools_submitted():
+    """
+    Marks the tool calls started inside the block as submitted now.
+    """
+    token = _tools_submitted.set(time.perf_counter())
+    try:
+        yield
+    finally:
+        _tools_submitted.reset(token)
+
+
+@contextmanager
+def collect_spans() -> Iterator[list]:
+    """
+    Collects the records of the spans finished inside the block (e.g. one request), also
+    from the threads its tool calls run in. Empty when the metrics aren't enabled.
+    """
+    collected = []
+    token = _collected.set(collected)
+    try:
+        yield collected
+    finally:
+        _collected.reset(token)
+
+
+def stage_timings(records: list, depth: int = 4) -> dict:
+    """
+    Returns:
+    - The seconds spent in every component and tool up to `depth` levels of the pipeline
+      (e.g. "pipeline/agent/tool_invoker/documentation_tool"), summed over their runs
+    """
+    stages = {}
+    for record in records:
+        if record["path"].count("/") < depth:
+            stages[record["path"]] = stages.get(record["path"], 0.0) + record["wall_ms"] / 1000
+    return {path: round(seconds, 3) for path, seconds in sorted(stages.items())}
+
+
+def trace_tool(tool: Tool) -> Tool:
+    """
+    Wraps the invocation of `tool` in a span named after the tool, so PipelineTools get their
+    own wall time and queue wait and their components are grouped under the tool name.
+    """
+    if getattr(tool, "_traced", False):
+        return tool
+    invoke = tool.invoke
+
+    def traced_invoke(**kwargs):
+        tags = {"angular.tool.name": tool.name}
+        submitted = _tools_submitted.get()
+        if submitted is not None:
+            tags["angular.queue_wait_ms"] = (time.perf_counter() - submitted) * 1000
+        with tracing.tracer.trace(TOOL_INVOKE, tags=tags):
+            return invoke(**kwargs)
+
+    tool.invoke = traced_invoke
+    tool._traced = True
+    return tool
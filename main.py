@@ -1,26 +1,142 @@
-from haystack.dataclasses import ChatMessage
-from agents.angular import angular
+import os
+import asyncio
+import argparse
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# The pipelines are imported inside the functions so `--help` doesn't pay for haystack
+
+DEFAULT_QUERY = """
+Generate a simple Angular component that displays a list of items and allows the 
+user to add new items to the list.
+    """
+
+
+def run_agent(query: str, stream: bool = False):
+    from contextlib import nullcontext
+    from haystack.dataclasses import ChatMessage
+    from agents.angular import get_angular
+    from agents.request_cache import run_cached
+    from models.streaming import PrintSink, stream_to
 
-def run_agent(query: str):
     print(f"Agent running with query: {query}")
-    response = angular.run(data={
-        "agent": {
-            "messages": [ChatMessage.from_user(query)]
-        }
-    })
 
-    last_message = response["agent"]["messages"][-1]
+    def run():
+        # Tokens and tool events are printed as they are produced, tagged with the (sub-)agent
+        with stream_to(PrintSink()) if stream else nullcontext():
+            return get_angular().run(data={
+                "agent": {
+                    "messages": [ChatMessage.from_user(query)]
+                }
+            })["agent"]["messages"]
+
+    # The same request answered before (or running) isn't run again
+    last_message = run_cached(query, run)["messages"][-1]
     print("\nAgent Response:\n")
     print(last_message.text)
 
 
-if __name__ == "__main__":
-    user_query = """
-Generate a simple Angular component that displays a list of items and allows the 
-user to add new items to the list.
+async def run_agent_async(query: str) -> str:
+    """
+    Async version of `run_agent`, many requests can be awaited concurrently from the same process.
+
+    Returns:
+    - The text of the last message of the agent
+    """
+    from haystack.dataclasses import ChatMessage
+    from agents.angular import get_angular_async
+    from agents.request_cache import run_cached_async
+
+    print(f"Agent running with query: {query}")
+
+    async def run():
+        response = await get_angular_async().run_async(data={
+            "agent": {
+                "messages": [ChatMessage.from_user(query)]
+            }
+        })
+        return response["agent"]["messages"]
+
+    last_message = (await run_cached_async(query, run))["messages"][-1]
+    print("\nAgent Response:\n")
+    print(last_message.text)
+    return last_message.text
+
+
+async def stream_agent(query: str):
+    """
+    Runs the async pipeline yielding the StreamEvents (tokens and tool events tagged with the
+    (sub-)agent that emitted them) as they are produced.
+    The last event has the type "response" and the text of the last message of the agent.
     """
-    run_agent(user_query)
+    from haystack.dataclasses import ChatMessage
+    from agents.angular import get_angular_async
+    from models.streaming import QueueSink, StreamEvent, stream_to
+
+    queue = asyncio.Queue()
+    pipeline = get_angular_async()
+    # The task copies the context, so the sink only receives the events of this request
+    with stream_to(QueueSink(queue, asyncio.get_running_loop())):
+        task = asyncio.create_task(pipeline.run_async(data={
+            "agent": {
+                "messages": [ChatMessage.from_user(query)]
+            }
+        }))
+    task.add_done_callback(lambda _: queue.put_nowait(None))
+
+    try:
+        while (event := await queue.get()) is not None:
+            yield event
+        response = task.result()
+    finally:
+        task.cancel()
+    yield StreamEvent("orchestrator", "response", response["agent"]["messages"][-1].text)
+
+
+async def print_stream(query: str):
+    from models.streaming import PrintSink
+
+    print(f"Agent running with query: {query}")
+    sink = PrintSink()
+    async for event in stream_agent(query):
+        if event.type == "response":
+            print("\n\nAgent Response:\n")
+            print(event.text)
+        else:
+            sink(event)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Runs the angular agent, it writes a TODO list (and the SKILLs) for the request.")
+    parser.add_argument("query", nargs="?", default=DEFAULT_QUERY,
+                        help="The request for the agent (defaults to a sample request)")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="Run the async pipeline")
+    parser.add_argument("--stream", action="store_true",
+                        help="Print the tokens and tool calls of every agent as they are produced")
+    parser.add_argument("--mode", choices=["agent", "planned"],
+                        help="Orchestrator: the agent decides every tool call, or the fixed plan "
+                             "(documentation and skills, then todo) runs directly (defaults to ORCHESTRATOR_MODE)")
+    parser.add_argument("--doc-version",
+                        help="Version of the documentation searched when the request doesn't select one "
+                             "(a key of ANGULAR_DOC_SOURCES, defaults to ANGULAR_DOC_VERSION)")
+    parser.add_argument("--draw", metavar="PATH",
+                        help="Render the pipeline to PATH (e.g. pipeline.png) and exit")
+    args = parser.parse_args()
+    if args.mode:
+        # Read by constants.py when the pipeline is imported
+        os.environ["ORCHESTRATOR_MODE"] = args.mode
+    if args.doc_version:
+        os.environ["ANGULAR_DOC_VERSION"] = args.doc_version
+
+    if args.draw:
+        from agents.angular import draw_pipeline
+        draw_pipeline(args.draw)
+    elif args.use_async and args.stream:
+        asyncio.run(print_stream(args.query))
+    elif args.use_async:
+        asyncio.run(run_agent_async(args.query))
+    else:
+        run_agent(args.query, stream=args.stream)
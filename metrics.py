@@ -0,0 +1,42 @@
+import time
+import argparse
+from instrumentation.summary import load_records, summarize, compare_modes
+from constants import METRICS_FILE
+
+
+def print_summary(path: str, since_hours: float = None, last_runs: int = None, contains: str = None):
+    since = time.time() - since_hours * 3600 if since_hours else None
+    records = load_records(path, since=since, last_runs=last_runs)
+    if contains:
+        records = [record for record in records if contains in record["path"]]
+    if not records:
+        print(f"No metrics in {path}")
+        return
+
+    runs = len({record["run_id"] for record in records})
+    avoided = sum(record.get("llm_calls_avoided", 0) for record in records)
+    print(f"{len(records)} spans from {runs} runs, {avoided} LLM calls avoided by the tool cache "
+          f"({avoided / runs:.1f} per run)\n")
+    print(f"{'component / tool':<60} {'n':>5} {'p50 ms':>9} {'p95 ms':>9} {'wait p50':>9} {'wait p95':>9} "
+          f"{'tok in':>8} {'tok out':>8} {'retries':>7} {'avoided':>7} {'errors':>6}")
+    for row in summarize(records):
+        print(f"{row['path'][-60:]:<60} {row['count']:>5} {row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} "
+              f"{row['wait_p50_ms']:>9.1f} {row['wait_p95_ms']:>9.1f} {row['prompt_tokens']:>8} "
+              f"{row['completion_tokens']:>8} {row['retries']:>7} {row['llm_calls_avoided']:>7} {row['errors']:>6}")
+
+    modes = compare_modes(records)
+    if "saved_p50_ms" in modes:
+        print(f"\nOrchestrator p50: agent {modes['agent']['p50_ms']:.1f}ms ({modes['agent']['count']} runs), "
+              f"planned {modes['planned']['p50_ms']:.1f}ms ({modes['planned']['count']} runs), "
+              f"{modes['saved_p50_ms']:.1f}ms ({modes['saved_ratio']:.0%}) saved by the planned mode")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Latency (p50 / p95), queue wait, tokens, retries and LLM calls avoided per component and tool call.")
+    parser.add_argument("--file", default=METRICS_FILE, help="JSONL written by the metrics tracer")
+    parser.add_argument("--since-hours", type=float, help="Only the spans of the last N hours")
+    parser.add_argument("--last-runs", type=int, help="Only the last N runs (queries / indexings)")
+    parser.add_argument("--path", dest="contains", help="Only the components whose path contains this text")
+    args = parser.parse_args()
+    print_summary(args.file, args.since_hours, args.last_runs, args.contains)
@@ -0,0 +1,98 @@
+import time
+import logging
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Dict, Iterable, List, Optional
+from haystack import component
+from haystack.dataclasses import Document
+
+logger = logging.getLogger(__name__)
+
+
+@component
+class ConcurrentDocumentEmbedder:
+    """
+    Embeds documents in batches from a bounded thread pool.
+
+    At most `max_pending` batches are in flight or waiting for an earlier one (backpressure),
+    and finished batches are handed to `writer` in their original order as soon as they are
+    available, instead of waiting for the whole corpus to be embedded.
+
+    `documents` can be any iterable (e.g. a generator of chunks), it is only read as fast as the
+    batches are embedded. With `keep_documents=False` the written batches aren't returned either,
+    so the memory holds at most `max_pending` batches.
+    """
+
+    def __init__(
+        self,
+        embedder: Any,
+        writer: Optional[Any] = None,
+        batch_size: int = 32,
+        max_workers: int = 4,
+        max_pending: Optional[int] = None,
+        keep_documents: bool = True
+    ):
+        self.embedder = embedder
+        self.writer = writer
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.max_pending = max_pending or max_workers * 2
+        self.keep_documents = keep_documents
+
+    def warm_up(self):
+        if hasattr(self.embedder, "warm_up"):
+            self.embedder.warm_up()
+
+    def _flush(self, ready: Dict[int, List[Document]], next_batch: int, embedded: List[Document]) -> tuple:
+        written = 0
+        while next_batch in ready:
+            batch = ready.pop(next_batch)
+            if self.keep_documents:
+                embedded.extend(batch)
+            if self.writer is not None:
+                written += self.writer.run(documents=batch)["documents_written"]
+            next_batch += 1
+        return next_batch, written
+
+    @component.output_types(documents=List[Document], documents_written=int, meta=Dict[str, Any])
+    def run(self, documents: Iterable[Document]):
+        start = time.perf_counter()
+        documents = iter(documents)
+        batches = iter(lambda: list(islice(documents, self.batch_size)), [])
+
+        embedded = []
+        ready = {}
+        next_batch = 0
+        written = 0
+        count = 0
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            pending = {}
+            for index, batch in enumerate(batches):
+                count += len(batch)
+                # Batches finished out of order wait for the earlier ones, they count as pending
+                while len(pending) + len(ready) >= self.max_pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        ready[pending.pop(future)] = future.result()["documents"]
+                    next_batch, batch_written = self._flush(ready, next_batch, embedded)
+                    written += batch_written
+                future = executor.submit(self.embedder.run, documents=batch)
+                pending[future] = index
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    ready[pending.pop(future)] = future.result()["documents"]
+                next_batch, batch_written = self._flush(ready, next_batch, embedded)
+                written += batch_written
+
+        elapsed = time.perf_counter() - start
+        docs_per_second = count / elapsed if elapsed > 0 else 0.0
+        if count:
+            logger.info("Embedded %d documents in %.2fs (%.1f docs/sec)",
+                        count, elapsed, docs_per_second)
+        return {
+            "documents": embedded,
+            "documents_written": written,
+            "meta": {"elapsed": elapsed, "docs_per_second": docs_per_second}
+        }
@@ -0,0 +1,174 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+from array import array
+from dataclasses import replace
+from typing import Any, Dict, List, Optional
+from haystack import component
+from haystack.dataclasses import Document
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+class EmbeddingCache:
+    """
+    On-disk embedding cache (SQLite) keyed by model and normalized text hash,
+    with least recently used eviction once the cache grows over `max_bytes`.
+    """
+
+    def __init__(self, path: str, max_bytes: int):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                embedding BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+        self._connection.commit()
+
+    @staticmethod
+    def key(model: str, text: str) -> str:
+        return hashlib.sha256(f"{model}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        found = {}
+        with self._lock:
+            # SQLite limits the number of host parameters per statement
+            for i in range(0, len(keys), 500):
+                batch = keys[i:i + 500]
+                rows = self._connection.execute(
+                    f"SELECT key, embedding FROM embeddings WHERE key IN ({','.join('?' * len(batch))})",
+                    batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array("d", blob).tolist()
+            if found:
+                now = time.time()
+                self._connection.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in found]
+                )
+                self._connection.commit()
+        return found
+
+    def put_many(self, items: Dict[str, List[float]]):
+        now = time.time()
+        rows = []
+        for key, embedding in items.items():
+            blob = array("d", embedding).tobytes()
+            rows.append((key, blob, len(blob), now))
+        with self._lock:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, embedding, size, last_used) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            self._evict()
+            self._connection.commit()
+
+    def _evict(self):
+        total = self._connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM embeddings").fetchone()[0]
+        while total > self.max_bytes:
+            rows = self._connection.execute(
+                "SELECT key, size FROM embeddings ORDER BY last_used LIMIT 256").fetchall()
+            if not rows:
+                break
+            # Only the least recently used rows over the limit, not the whole page
+            evicted = []
+            for key, size in rows:
+                if total <= self.max_bytes:
+                    break
+                evicted.append((key,))
+                total -= size
+            self._connection.executemany("DELETE FROM embeddings WHERE key = ?", evicted)
+
+
+def _model_key(embedder: Any) -> str:
+    # Prefix and suffix change the embedded text, so they are part of the key
+    return "|".join([
+        embedder.model,
+        getattr(embedder, "prefix", ""),
+        getattr(embedder, "suffix", "")
+    ])
+
+
+@component
+class CachedDocumentEmbedder:
+    """
+    Wraps a document embedder and only sends the documents missing from the cache.
+    """
+
+    def __init__(self, embedder: Any, cache: EmbeddingCache):
+        self.embedder = embedder
+        self.cache = cache
+
+    def warm_up(self):
+        if hasattr(self.embedder, "warm_up"):
+            self.embedder.warm_up()
+
+    @component.output_types(documents=List[Document], meta=Dict[str, Any])
+    def run(self, documents: List[Document], generation_kwargs: Optional[Dict[str, Any]] = None):
+        model = _model_key(self.embedder)
+        keys = [self.cache.key(model, doc.content or "") for doc in documents]
+        cached = self.cache.get_many(list(set(keys)))
+
+        misses = [doc for doc, key in zip(documents, keys) if key not in cached]
+        meta = {}
+        if misses:
+            kwargs = {"generation_kwargs": generation_kwargs} if generation_kwargs else {}
+            result = self.embedder.run(documents=misses, **kwargs)
+            meta = result.get("meta", {})
+            embedded = {
+                self.cache.key(model, doc.content or ""): doc.embedding
+                for doc in result["documents"]
+            }
+            self.cache.put_many(embedded)
+            cached.update(embedded)
+
+        return {
+            "documents": [replace(doc, embedding=cached[key]) for doc, key in zip(documents, keys)],
+            "meta": {**meta, "cache_hits": len(documents) - len(misses), "cache_misses": len(misses)}
+        }
+
+
+@component
+class CachedTextEmbedder:
+    """
+    Wraps a text embedder and returns the cached embedding of repeated queries.
+    """
+
+    def __init__(self, embedder: Any, cache: EmbeddingCache):
+        self.embedder = embedder
+        self.cache = cache
+
+    def warm_up(self):
+        if hasattr(self.embedder, "warm_up"):
+            self.embedder.warm_up()
+
+    @component.output_types(embedding=List[float], meta=Dict[str, Any])
+    def run(self, text: str, generation_kwargs: Optional[Dict[str, Any]] = None):
+        key = self.cache.key(_model_key(self.embedder), text)
+        cached = self.cache.get_many([key])
+        if key in cached:
+            return {"embedding": cached[key], "meta": {"cache_hits": 1, "cache_misses": 0}}
+
+        kwargs = {"generation_kwargs": generation_kwargs} if generation_kwargs else {}
+        result = self.embedder.run(text=text, **kwargs)
+        self.cache.put_many({key: result["embedding"]})
+        return {
+            "embedding": result["embedding"],
+            "meta": {**result.get("meta", {}), "cache_hits": 0, "cache_misses": 1}
+        }
@@ -1,39 +1,146 @@
+from typing import Optional
+from ollama import ChatResponse
+from haystack import component
+from haystack.dataclasses.streaming_chunk import StreamingCallbackT
 from haystack_integrations.components.generators.ollama import OllamaChatGenerator
 from haystack_integrations.components.embedders.ollama import OllamaDocumentEmbedder
 from haystack_integrations.components.embedders.ollama import OllamaTextEmbedder
-from constants import CODER_MODEL, THINKING_MODEL, EMBEDDER_MODEL
-
-thinking_generator = OllamaChatGenerator(
-    model=THINKING_MODEL,
-    timeout=3600,
-    generation_kwargs={
-        "temperature": 0.1
-    }
-)
-
-
-coder_generator = OllamaChatGenerator(
-    model=CODER_MODEL,
-    timeout=3600,
-    generation_kwargs={
-        "temperature": 0.5
-    }
-)
-
-
-doc_embedder = OllamaDocumentEmbedder(
-    model=EMBEDDER_MODEL,
-    url="http://localhost:11434",
-    progress_bar=True,
-    generation_kwargs={
-        "temperature": 0.1
-    }
-)
-
-text_embedder = OllamaTextEmbedder(
-    model=EMBEDDER_MODEL,
-    url="http://localhost:11434",
-    generation_kwargs={
-        "temperature": 0.1
-    }
-)
+from models.embedding_cache import EmbeddingCache, CachedDocumentEmbedder, CachedTextEmbedder
+from models.ollama_client import share_client
+from registry import lazy
+from constants import OLLAMA_URL, OLLAMA_TIMEOUT, OLLAMA_KEEP_ALIVE, CODER_MODEL, THINKING_MODEL, EMBEDDER_MODEL
+from constants import EMBEDDING_CACHE_FILE, EMBEDDING_CACHE_MAX_BYTES
+
+
+class _NoArguments(dict):
+    # Empty, but truthy: ollama-haystack serializes falsy tool arguments as "" and fails to parse them
+    def __bool__(self):
+        return True
+
+
+class _ToolCallsResponse(ChatResponse):
+
+    def model_dump(self, *args, **kwargs):
+        data = super().model_dump(*args, **kwargs)
+        for tool_call in data["message"].get("tool_calls") or []:
+            if not tool_call["function"]["arguments"]:
+                tool_call["function"]["arguments"] = _NoArguments()
+        return data
+
+
+def _with_tool_arguments(response: ChatResponse) -> ChatResponse:
+    if any(not tool_call.function.arguments for tool_call in response.message.tool_calls or []):
+        return _ToolCallsResponse.model_construct(**dict(response))
+    return response
+
+
+if not hasattr(OllamaChatGenerator, "_handle_streaming_response") \
+        or not hasattr(OllamaChatGenerator, "_handle_streaming_response_async"):
+    raise ImportError("Unsupported ollama-haystack version: StreamingChatGenerator can't wrap its streaming")
+
+
+@component
+class StreamingChatGenerator(OllamaChatGenerator):
+    """
+    OllamaChatGenerator on the shared Ollama client that also streams the calls of tools without
+    arguments (e.g. read_example_skills), which ollama-haystack fails to parse when streamed.
+    """
+
+    def __init__(self, **kwargs):
+        OllamaChatGenerator.__init__(self, **kwargs)
+        share_client(self)
+
+    def _handle_streaming_response(self, response_iter, callback):
+        return OllamaChatGenerator._handle_streaming_response(self, map(_with_tool_arguments, response_iter), callback)
+
+    async def _handle_streaming_response_async(self, response_iter, callback):
+        async def responses():
+            async for response in response_iter:
+                yield _with_tool_arguments(response)
+        return await OllamaChatGenerator._handle_streaming_response_async(self, responses(), callback)
+
+
+@component
+class SharedDocumentEmbedder(OllamaDocumentEmbedder):
+    """
+    OllamaDocumentEmbedder on the shared Ollama client.
+    """
+
+    def __init__(self, **kwargs):
+        OllamaDocumentEmbedder.__init__(self, **kwargs)
+        share_client(self)
+
+
+@component
+class SharedTextEmbedder(OllamaTextEmbedder):
+    """
+    OllamaTextEmbedder on the shared Ollama client.
+    """
+
+    def __init__(self, **kwargs):
+        OllamaTextEmbedder.__init__(self, **kwargs)
+        share_client(self)
+
+
+# A component instance can only be added to one pipeline,
+# so every pipeline / agent gets its own generator, all of them share the Ollama client
+def create_thinking_generator(streaming_callback: Optional[StreamingCallbackT] = None) -> OllamaChatGenerator:
+    return StreamingChatGenerator(
+        model=THINKING_MODEL,
+        url=OLLAMA_URL,
+        timeout=OLLAMA_TIMEOUT,
+        keep_alive=OLLAMA_KEEP_ALIVE.get(THINKING_MODEL),
+        streaming_callback=streaming_callback,
+        generation_kwargs={
+            "temperature": 0.1
+        }
+    )
+
+
+def create_coder_generator(streaming_callback: Optional[StreamingCallbackT] = None) -> OllamaChatGenerator:
+    return StreamingChatGenerator(
+        model=CODER_MODEL,
+        url=OLLAMA_URL,
+        timeout=OLLAMA_TIMEOUT,
+        keep_alive=OLLAMA_KEEP_ALIVE.get(CODER_MODEL),
+        streaming_callback=streaming_callback,
+        generation_kwargs={
+            "temperature": 0.5
+        }
+    )
+
+
+@lazy
+def get_embedding_cache() -> EmbeddingCache:
+    return EmbeddingCache(
+        EMBEDDING_CACHE_FILE,
+        max_bytes=EMBEDDING_CACHE_MAX_BYTES
+    )
+
+
+# Embedders used by the pipelines, only the texts missing from the cache reach Ollama
+@lazy
+def get_doc_embedder() -> CachedDocumentEmbedder:
+    ollama_doc_embedder = SharedDocumentEmbedder(
+        model=EMBEDDER_MODEL,
+        url=OLLAMA_URL,
+        keep_alive=OLLAMA_KEEP_ALIVE.get(EMBEDDER_MODEL),
+        progress_bar=False,
+        generation_kwargs={
+            "temperature": 0.1
+        }
+    )
+    return CachedDocumentEmbedder(ollama_doc_embedder, cache=get_embedding_cache())
+
+
+@lazy
+def get_text_embedder() -> CachedTextEmbedder:
+    ollama_text_embedder = SharedTextEmbedder(
+        model=EMBEDDER_MODEL,
+        url=OLLAMA_URL,
+        keep_alive=OLLAMA_KEEP_ALIVE.get(EMBEDDER_MODEL),
+        generation_kwargs={
+            "temperature": 0.1
+        }
+    )
+    return CachedTextEmbedder(ollama_text_embedder, cache=get_embedding_cache())
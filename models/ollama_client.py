@@ -0,0 +1,333 @@
+import time
+import asyncio
+import logging
+import threading
+import weakref
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Optional
+import httpx
+from ollama import AsyncClient, Client
+from registry import lazy
+from constants import OLLAMA_URL, OLLAMA_TIMEOUT, OLLAMA_MAX_CONNECTIONS
+from constants import OLLAMA_RESIDENT_MODELS, OLLAMA_MAX_SWITCH_WAIT, OLLAMA_RELOAD_THRESHOLD_MS
+
+logger = logging.getLogger(__name__)
+
+# Counters of the chat calls (and their tokens) made inside `count_chat_calls` blocks,
+# the context reaches the tool threads
+_chat_counters: ContextVar[tuple] = ContextVar("chat_counters", default=())
+# Checks run before every chat call made inside `guard_chat_calls` blocks
+_chat_guards: ContextVar[tuple] = ContextVar("chat_guards", default=())
+
+
+@contextmanager
+def count_chat_calls():
+    """
+    Counts the chat calls (LLM calls) made inside the block, `counter[0]` once it ends,
+    and their prompt and completion tokens, `counter[1]`.
+    """
+    counter = [0, 0]
+    token = _chat_counters.set(_chat_counters.get() + (counter,))
+    try:
+        yield counter
+    finally:
+        _chat_counters.reset(token)
+
+
+@contextmanager
+def guard_chat_calls(check: Callable[[], None]):
+    """
+    Runs `check` before every chat call made inside the block (sub-agents and tool threads
+    included), an exception it raises stops the call before it reaches Ollama.
+    """
+    token = _chat_guards.set(_chat_guards.get() + (check,))
+    try:
+        yield
+    finally:
+        _chat_guards.reset(token)
+
+
+_counters_lock = threading.Lock()
+
+
+def _count_chat_call() -> tuple:
+    for check in _chat_guards.get():
+        check()
+    counters = _chat_counters.get()
+    with _counters_lock:
+        for counter in counters:
+            counter[0] += 1
+    return counters
+
+
+def _count_tokens(counters: tuple, response: Any):
+    # Streamed replies report the tokens in their last chunk
+    tokens = (getattr(response, "prompt_eval_count", None) or 0) + (getattr(response, "eval_count", None) or 0)
+    if not tokens:
+        return
+    with _counters_lock:
+        for counter in counters:
+            counter[1] += tokens
+
+
+class ModelResidency:
+    """
+    Schedules the calls to Ollama by model, so a box that only fits `resident_models` models
+    doesn't evict and reload them back and forth.
+
+    A call to a model that is already running goes ahead, a call to another model waits until
+    one of the running models has no calls left. The calls to the running models keep going
+    ahead (grouped) unless a call to another model has been waiting for `max_switch_wait` seconds.
+
+    It also counts the loads Ollama reports (`load_duration` over `reload_threshold_ms`).
+    """
+
+    def __init__(self, resident_models: int, max_switch_wait: float, reload_threshold_ms: float):
+        self.resident_models = resident_models
+        self.max_switch_wait = max_switch_wait
+        self.reload_threshold_ms = reload_threshold_ms
+        self._condition = threading.Condition()
+        self._running = {}
+        # Arrival time of the calls waiting for a model switch
+        self._waiting = {}
+        self._stats = {}
+
+    def _model_stats(self, model: str) -> dict:
+        return self._stats.setdefault(model, {"calls": 0, "loads": 0, "load_ms": 0.0, "switch_wait_ms": 0.0})
+
+    def _can_start(self, model: str, arrival: float) -> bool:
+        # A call that has been waiting too long goes before every call that arrived after it
+        deadline = time.monotonic() - self.max_switch_wait
+        if any(waiting < arrival and waiting < deadline for waiting in self._waiting.values()):
+            return False
+        return model in self._running or len(self._running) < self.resident_models
+
+    def acquire(self, model: str, blocking: bool = True) -> bool:
+        arrival = time.monotonic()
+        with self._condition:
+            if not self._can_start(model, arrival):
+                if not blocking:
+                    return False
+                key = object()
+                self._waiting[key] = arrival
+                try:
+                    while not self._can_start(model, arrival):
+                        self._condition.wait(timeout=1)
+                finally:
+                    del self._waiting[key]
+            self._running[model] = self._running.get(model, 0) + 1
+            stats = self._model_stats(model)
+            stats["calls"] += 1
+            stats["switch_wait_ms"] += (time.monotonic() - arrival) * 1000
+            return True
+
+    def release(self, model: str):
+        with self._condition:
+            self._running[model] -= 1
+            if not self._running[model]:
+                del self._running[model]
+            self._condition.notify_all()
+
+    @contextmanager
+    def running(self, model: str):
+        self.acquire(model)
+        try:
+            yield
+        finally:
+            self.release(model)
+
+    def record_load(self, model: str, load_duration: Optional[int]):
+        """
+        Arguments:
+        - load_duration: nanoseconds, as reported by Ollama
+        """
+        load_ms = (load_duration or 0) / 1e6
+        if load_ms < self.reload_threshold_ms:
+            return
+        with self._condition:
+            stats = self._model_stats(model)
+            stats["loads"] += 1
+            stats["load_ms"] += load_ms
+            loads = stats["loads"]
+        logger.info("Ollama loaded %s in %.1fs (load #%d)", model, load_ms / 1000, loads)
+
+    def stats(self) -> dict:
+        """
+        Returns:
+        - Per model: calls, loads, time lost loading the model and waiting for a model switch
+        """
+        with self._condition:
+            return {model: dict(stats) for model, stats in self._stats.items()}
+
+
+def _load_duration(response: Any) -> Optional[int]:
+    return getattr(response, "load_duration", None)
+
+
+class ResidentClient:
+    """
+    Ollama client shared by every generator and embedder, its calls go through the ModelResidency.
+    """
+
+    def __init__(self, client: Client, residency: ModelResidency):
+        self.client = client
+        self.residency = residency
+
+    def _stream(self, model: str, response_iter, counters: tuple):
+        # The call runs until the stream is consumed
+        try:
+            for chunk in response_iter:
+                if getattr(chunk, "done", False):
+                    self.residency.record_load(model, _load_duration(chunk))
+                    _count_tokens(counters, chunk)
+                yield chunk
+        finally:
+            self.residency.release(model)
+
+    def chat(self, model: str = "", **kwargs):
+        counters = _count_chat_call()
+        self.residency.acquire(model)
+        try:
+            response = self.client.chat(model=model, **kwargs)
+        except BaseException:
+            self.residency.release(model)
+            raise
+        if kwargs.get("stream"):
+            return self._stream(model, response, counters)
+        self.residency.release(model)
+        self.residency.record_load(model, _load_duration(response))
+        _count_tokens(counters, response)
+        return response
+
+    def embed(self, model: str = "", **kwargs):
+        with self.residency.running(model):
+            response = self.client.embed(model=model, **kwargs)
+        self.residency.record_load(model, _load_duration(response))
+        return response
+
+    def embeddings(self, model: str = "", **kwargs):
+        with self.residency.running(model):
+            return self.client.embeddings(model=model, **kwargs)
+
+    def __getattr__(self, name: str):
+        return getattr(self.client, name)
+
+
+class ResidentAsyncClient:
+    """
+    Same as ResidentClient for the async calls. An httpx.AsyncClient is bound to the event loop
+    that opened its connections, so every event loop gets its own pool.
+    """
+
+    def __init__(self, residency: ModelResidency):
+        self.residency = residency
+        self._clients = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def _client(self) -> AsyncClient:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if loop not in self._clients:
+                self._clients[loop] = create_async_client()
+            return self._clients[loop]
+
+    async def _acquire(self, model: str):
+        # Waiting for a model switch must not block the event loop
+        if self.residency.acquire(model, blocking=False):
+            return
+        waiter = asyncio.ensure_future(asyncio.to_thread(self.residency.acquire, model))
+        try:
+            await asyncio.shield(waiter)
+        except asyncio.CancelledError:
+            # The thread still gets the model, it's released as soon as it does
+            waiter.add_done_callback(lambda _: self.residency.release(model))
+            raise
+
+    async def _stream(self, model: str, response_iter, counters: tuple):
+        try:
+            async for chunk in response_iter:
+                if getattr(chunk, "done", False):
+                    self.residency.record_load(model, _load_duration(chunk))
+                    _count_tokens(counters, chunk)
+                yield chunk
+        finally:
+            self.residency.release(model)
+
+    async def chat(self, model: str = "", **kwargs):
+        counters = _count_chat_call()
+        await self._acquire(model)
+        try:
+            response = await self._client().chat(model=model, **kwargs)
+        except BaseException:
+            self.residency.release(model)
+            raise
+        if kwargs.get("stream"):
+            return self._stream(model, response, counters)
+        self.residency.release(model)
+        self.residency.record_load(model, _load_duration(response))
+        _count_tokens(counters, response)
+        return response
+
+    async def embed(self, model: str = "", **kwargs):
+        await self._acquire(model)
+        try:
+            response = await self._client().embed(model=model, **kwargs)
+        finally:
+            self.residency.release(model)
+        self.residency.record_load(model, _load_duration(response))
+        return response
+
+    async def embeddings(self, model: str = "", **kwargs):
+        await self._acquire(model)
+        try:
+            return await self._client().embeddings(model=model, **kwargs)
+        finally:
+            self.residency.release(model)
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(max_connections=OLLAMA_MAX_CONNECTIONS, max_keepalive_connections=OLLAMA_MAX_CONNECTIONS)
+
+
+def create_async_client() -> AsyncClient:
+    return AsyncClient(host=OLLAMA_URL, timeout=OLLAMA_TIMEOUT, limits=_limits())
+
+
+@lazy
+def get_residency() -> ModelResidency:
+    return ModelResidency(
+        resident_models=OLLAMA_RESIDENT_MODELS,
+        max_switch_wait=OLLAMA_MAX_SWITCH_WAIT,
+        reload_threshold_ms=OLLAMA_RELOAD_THRESHOLD_MS
+    )
+
+
+# One pool of keep-alive connections for every generator and embedder
+@lazy
+def get_client() -> ResidentClient:
+    return ResidentClient(Client(host=OLLAMA_URL, timeout=OLLAMA_TIMEOUT, limits=_limits()), get_residency())
+
+
+@lazy
+def get_async_client() -> ResidentAsyncClient:
+    return ResidentAsyncClient(get_residency())
+
+
+def share_client(component):
+    """
+    Replaces the clients the Ollama generator / embedder `component` created for itself with the shared
+    ones, called by the subclasses of models/ollama.py once the integration's __init__ created them.
+
+    Raises:
+    - RuntimeError: when the integration no longer has those clients, instead of silently
+      bypassing the residency scheduling
+    """
+    missing = [name for name in ("_client", "_async_client") if not isinstance(getattr(component, name, None),
+                                                                             (Client, AsyncClient))]
+    if missing:
+        raise RuntimeError(f"Unsupported ollama-haystack version: {type(component).__name__} has no "
+                           f"{', '.join(missing)}, the shared Ollama client can't be used")
+    component._client = get_client()
+    component._async_client = get_async_client()
+
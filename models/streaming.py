@@ -0,0 +1,164 @@
+import sys
+import asyncio
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Callable, Optional
+from haystack.dataclasses import StreamingChunk
+
+# Receivers of the streamed events of the current request. A ContextVar keeps concurrent
+# requests apart, ToolInvoker and AsyncPipeline copy the context into their worker threads
+_sinks: ContextVar[tuple] = ContextVar("stream_sinks", default=())
+
+
+@dataclass
+class StreamEvent:
+    """
+    A streamed piece of output.
+
+    - `tag`: the (sub-)agent that emitted it, e.g. "orchestrator" or "todo"
+    - `type`: "token", "reasoning", "tool_call" or "tool_result"
+    - `text`: the token, or a description of the tool call / result
+    """
+    tag: str
+    type: str
+    text: str
+
+
+def to_event(tag: str, chunk: StreamingChunk) -> Optional[StreamEvent]:
+    if chunk.content:
+        return StreamEvent(tag, "token", chunk.content)
+    if chunk.reasoning and chunk.reasoning.reasoning_text:
+        return StreamEvent(tag, "reasoning", chunk.reasoning.reasoning_text)
+    if chunk.tool_calls:
+        text = "".join(
+            f"{delta.tool_name}({delta.arguments or ''})" if delta.tool_name else delta.arguments or ""
+            for delta in chunk.tool_calls)
+        return StreamEvent(tag, "tool_call", text)
+    if chunk.tool_call_result:
+        result = chunk.tool_call_result
+        status = "error" if result.error else "done"
+        return StreamEvent(tag, "tool_result", f"{result.origin.tool_name}: {status}")
+    return None
+
+
+def _emit(tag: str, chunk: StreamingChunk):
+    sinks = _sinks.get()
+    if not sinks:
+        return
+    event = to_event(tag, chunk)
+    if event is not None:
+        for sink in sinks:
+            sink(event)
+
+
+# The callbacks are module-level functions: Haystack serializes them by import path
+# (agent snapshots, to_dict) and `Agent.from_dict` imports them back in a fresh process
+def stream_orchestrator(chunk: StreamingChunk):
+    _emit("orchestrator", chunk)
+
+
+async def stream_orchestrator_async(chunk: StreamingChunk):
+    _emit("orchestrator", chunk)
+
+
+def stream_documentation(chunk: StreamingChunk):
+    _emit("documentation", chunk)
+
+
+def stream_skills(chunk: StreamingChunk):
+    _emit("skills", chunk)
+
+
+def stream_skills_definition(chunk: StreamingChunk):
+    _emit("skills.definition", chunk)
+
+
+def stream_todo(chunk: StreamingChunk):
+    _emit("todo", chunk)
+
+
+def stream_coder(chunk: StreamingChunk):
+    _emit("coder", chunk)
+
+
+_CALLBACKS = {
+    "orchestrator": stream_orchestrator,
+    "documentation": stream_documentation,
+    "skills": stream_skills,
+    "skills.definition": stream_skills_definition,
+    "todo": stream_todo,
+    "coder": stream_coder
+}
+_ASYNC_CALLBACKS = {
+    "orchestrator": stream_orchestrator_async
+}
+
+
+def tagged_callback(tag: str) -> Callable[[StreamingChunk], None]:
+    """
+    Streaming callback for generators and agents run synchronously,
+    the chunks reach the sinks of the current request tagged with `tag`.
+    """
+    return _CALLBACKS[tag]
+
+
+def async_tagged_callback(tag: str):
+    """
+    Same as `tagged_callback` for components awaited by an AsyncPipeline.
+    """
+    return _ASYNC_CALLBACKS[tag]
+
+
+@contextmanager
+def stream_to(sink: Callable[[StreamEvent], None]):
+    """
+    Sends the events streamed inside the block (and the tasks / threads started from it) to `sink`.
+    `sink` may be called from worker threads.
+    """
+    token = _sinks.set(_sinks.get() + (sink,))
+    try:
+        yield
+    finally:
+        _sinks.reset(token)
+
+
+class PrintSink:
+    """
+    Writes the events to stdout, starting a new `[tag]` line whenever the emitter changes
+    (sub-agents running in parallel interleave).
+    """
+
+    def __init__(self, show_reasoning: bool = False):
+        self.show_reasoning = show_reasoning
+        self._last = None
+        self._lock = threading.Lock()
+
+    def __call__(self, event: StreamEvent):
+        if event.type == "reasoning" and not self.show_reasoning:
+            return
+        with self._lock:
+            if event.type in ("tool_call", "tool_result"):
+                sys.stdout.write(f"\n[{event.tag}] {event.type}: {event.text}\n")
+                self._last = None
+            else:
+                if (event.tag, event.type) != self._last:
+                    suffix = " (thinking)" if event.type == "reasoning" else ""
+                    sys.stdout.write(f"\n[{event.tag}]{suffix} ")
+                    self._last = (event.tag, event.type)
+                sys.stdout.write(event.text)
+            sys.stdout.flush()
+
+
+class QueueSink:
+    """
+    Puts the events in an asyncio.Queue from any thread, to consume them as an async iterator.
+    """
+
+    def __init__(self, queue: asyncio.Queue, loop: asyncio.AbstractEventLoop):
+        self.queue = queue
+        self.loop = loop
+
+    def __call__(self, event: StreamEvent):
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, event)
@@ -0,0 +1,35 @@
+import threading
+from functools import wraps
+
+# Getters created with `lazy`, by name, to know what has been built
+_getters = {}
+
+
+def lazy(factory):
+    """
+    Turns `factory` into a getter that builds its value on the first call
+    (once per process, thread-safe) and returns the same instance afterwards.
+    Importing a module that declares getters builds nothing.
+    """
+    lock = threading.Lock()
+    instance = []
+
+    @wraps(factory)
+    def get():
+        if not instance:
+            with lock:
+                if not instance:
+                    instance.append(factory())
+        return instance[0]
+
+    get.is_built = lambda: bool(instance)
+    _getters[f"{factory.__module__}.{factory.__name__}"] = get
+    return get
+
+
+def built() -> list[str]:
+    """
+    Returns:
+    - The names of the getters whose value has already been built
+    """
+    return [name for name, get in _getters.items() if get.is_built()]
@@ -0,0 +1,83 @@
+from constants import DOCUMENT_STORE, MEMMAP_STORE_DIR, MEMMAP_DTYPE
+from constants import PGVECTOR_SEARCH_STRATEGY, HNSW_M, HNSW_EF_CONSTRUCTION, HNSW_EF_SEARCH
+from constants import HNSW_ITERATIVE_SCAN, PGVECTOR_INDEXED_META_FIELDS
+from registry import lazy
+from dotenv import load_dotenv
+
+load_dotenv()
+
+EMBEDDING_DIMENSION = 768  # Because of nomic embed text
+
+
+def create_document_store():
+    if DOCUMENT_STORE == "memmap":
+        from stores.memmap import MemmapDocumentStore
+        return MemmapDocumentStore(
+            MEMMAP_STORE_DIR,
+            embedding_dimension=EMBEDDING_DIMENSION,
+            dtype=MEMMAP_DTYPE
+        )
+    if DOCUMENT_STORE == "pgvector":
+        from haystack_integrations.document_stores.pgvector import PgvectorDocumentStore
+        from stores.hnsw import create_meta_indexes
+        store = PgvectorDocumentStore(
+            embedding_dimension=EMBEDDING_DIMENSION,
+            vector_function="cosine_similarity",
+            # recreate_table=True,
+            search_strategy=PGVECTOR_SEARCH_STRATEGY,
+            hnsw_index_creation_kwargs={
+                "m": HNSW_M,
+                "ef_construction": HNSW_EF_CONSTRUCTION
+            },
+            hnsw_ef_search=HNSW_EF_SEARCH
+        )
+        # The searches filter by version inside the vector query
+        create_meta_indexes(store, PGVECTOR_INDEXED_META_FIELDS)
+        return store
+    raise ValueError(
+        f"Unknown DOCUMENT_STORE '{DOCUMENT_STORE}', use 'pgvector' or 'memmap'")
+
+
+def create_embedding_retriever(top_k: int):
+    """
+    Creates the embedding retriever matching the configured document store.
+    """
+    if DOCUMENT_STORE == "memmap":
+        from stores.memmap import MemmapEmbeddingRetriever
+        return MemmapEmbeddingRetriever(
+            document_store=get_document_store(),
+            vector_function="cosine_similarity",
+            top_k=top_k
+        )
+    if PGVECTOR_SEARCH_STRATEGY == "hnsw":
+        from stores.hnsw import PgvectorHnswRetriever
+        return PgvectorHnswRetriever(
+            document_store=get_document_store(),
+            vector_function="cosine_similarity",
+            top_k=top_k,
+            ef_search=HNSW_EF_SEARCH,
+            iterative_scan=HNSW_ITERATIVE_SCAN
+        )
+    from haystack_integrations.components.retrievers.pgvector import PgvectorEmbeddingRetriever
+    return PgvectorEmbeddingRetriever(
+        document_store=get_document_store(),
+        vector_function="cosine_similarity",
+        top_k=top_k
+    )
+
+
+def create_keyword_retriever(top_k: int):
+    """
+    Creates the keyword (full-text / BM25) retriever matching the configured document store.
+    """
+    if DOCUMENT_STORE == "memmap":
+        from stores.memmap import MemmapKeywordRetriever
+        return MemmapKeywordRetriever(document_store=get_document_store(), top_k=top_k)
+    from haystack_integrations.components.retrievers.pgvector import PgvectorKeywordRetriever
+    return PgvectorKeywordRetriever(document_store=get_document_store(), top_k=top_k)
+
+
+# Vector store shared by the indexing and the searching pipelines
+@lazy
+def get_document_store():
+    return create_document_store()
@@ -0,0 +1,228 @@
+import time
+import statistics
+from typing import Any, Dict, List, Optional
+from psycopg.sql import SQL, Identifier, Literal as SQLLiteral
+from haystack import component, default_from_dict, default_to_dict
+from haystack.dataclasses import Document
+from haystack_integrations.document_stores.pgvector import PgvectorDocumentStore
+from haystack_integrations.document_stores.pgvector.converters import _from_pg_to_haystack_documents
+from haystack_integrations.document_stores.pgvector.filters import _convert_filters_to_where_clause_and_params
+
+
+def build_hnsw_index(
+    store: PgvectorDocumentStore,
+    m: int,
+    ef_construction: int,
+    index_name: Optional[str] = None
+) -> float:
+    """
+    (Re)creates the HNSW index of the store with the chosen `m` and `ef_construction`.
+
+    Returns:
+    - The seconds it took to build the index
+    """
+    store._ensure_db_setup()
+    index_name = index_name or store.hnsw_index_name
+    start = time.perf_counter()
+    store._connection.execute(SQL("DROP INDEX IF EXISTS {schema}.{index}").format(
+        schema=Identifier(store.schema_name), index=Identifier(index_name)))
+    store._connection.execute(SQL(
+        "CREATE INDEX {index} ON {schema}.{table} USING hnsw (embedding vector_cosine_ops) "
+        "WITH (m = {m}, ef_construction = {ef_construction})"
+    ).format(
+        index=Identifier(index_name),
+        schema=Identifier(store.schema_name),
+        table=Identifier(store.table_name),
+        m=SQLLiteral(m),
+        ef_construction=SQLLiteral(ef_construction)
+    ))
+    return time.perf_counter() - start
+
+
+def drop_hnsw_index(store: PgvectorDocumentStore, index_name: Optional[str] = None):
+    store._ensure_db_setup()
+    store._connection.execute(SQL("DROP INDEX IF EXISTS {schema}.{index}").format(
+        schema=Identifier(store.schema_name), index=Identifier(index_name or store.hnsw_index_name)))
+
+
+def create_meta_indexes(store: PgvectorDocumentStore, fields: List[str]):
+    """
+    Creates (if missing) a btree index on `meta->>field` for every field, the expression the
+    filters of PgvectorDocumentStore compare, so a filtered search only reads the matching rows.
+    """
+    store._ensure_db_setup()
+    for field in fields:
+        store._connection.execute(SQL(
+            "CREATE INDEX IF NOT EXISTS {index} ON {schema}.{table} ((meta->>{field}))"
+        ).format(
+            index=Identifier(f"{store.table_name}_meta_{field}_idx"),
+            schema=Identifier(store.schema_name),
+            table=Identifier(store.table_name),
+            field=SQLLiteral(field)
+        ))
+
+
+def hnsw_embedding_retrieval(
+    store: PgvectorDocumentStore,
+    query_embedding: List[float],
+    top_k: int = 10,
+    filters: Optional[Dict[str, Any]] = None,
+    ef_search: Optional[int] = None,
+    exact: bool = False,
+    iterative_scan: Optional[str] = None
+) -> List[Document]:
+    """
+    Cosine retrieval that can use the HNSW index.
+
+    PgvectorDocumentStore orders by the computed score, which Postgres can't answer
+    from the index, so here the query orders by the distance operator itself.
+    `ef_search` is set for this query only and `exact` disables the index to get
+    the exact nearest neighbors.
+
+    With `filters` the index only returns the candidates of `ef_search` that match, unless
+    `iterative_scan` ("relaxed_order", pgvector >= 0.8) keeps scanning until `top_k` do.
+    """
+    store._ensure_db_setup()
+    vector = f"[{','.join(str(value) for value in query_embedding)}]"
+
+    where_clause, where_params = SQL(""), ()
+    if filters:
+        where_clause, where_params = _convert_filters_to_where_clause_and_params(filters)
+
+    sql_query = SQL(
+        "SELECT *, 1 - (embedding <=> %s::vector) AS score FROM {schema}.{table}"
+    ).format(schema=Identifier(store.schema_name), table=Identifier(store.table_name))
+    sql_query += where_clause
+    sql_query += SQL(" ORDER BY embedding <=> %s::vector LIMIT {top_k}").format(
+        top_k=SQLLiteral(top_k))
+
+    with store._connection.transaction():
+        if exact:
+            store._connection.execute("SET LOCAL enable_indexscan = off")
+        elif ef_search or store.hnsw_ef_search:
+            store._connection.execute(SQL("SET LOCAL hnsw.ef_search = {}").format(
+                SQLLiteral(ef_search or store.hnsw_ef_search)))
+        relaxed = bool(filters) and not exact and iterative_scan not in (None, "off")
+        if relaxed:
+            store._connection.execute(SQL("SET LOCAL hnsw.iterative_scan = {}").format(
+                SQLLiteral(iterative_scan)))
+        records = store._dict_cursor.execute(
+            sql_query, (vector, *where_params, vector)).fetchall()
+    documents = _from_pg_to_haystack_documents(records)
+    if relaxed:
+        # "relaxed_order" may return the rows slightly out of order
+        documents.sort(key=lambda doc: doc.score, reverse=True)
+    return documents
+
+
+@component
+class PgvectorHnswRetriever:
+    """
+    Same sockets as PgvectorEmbeddingRetriever plus `ef_search`, tunable per query,
+    and the `iterative_scan` of the filtered queries.
+    """
+
+    def __init__(
+        self,
+        document_store: PgvectorDocumentStore,
+        filters: Optional[Dict[str, Any]] = None,
+        top_k: int = 10,
+        ef_search: Optional[int] = None,
+        vector_function: str = "cosine_similarity",
+        iterative_scan: Optional[str] = None
+    ):
+        if vector_function != "cosine_similarity":
+            raise ValueError("PgvectorHnswRetriever only supports 'cosine_similarity'")
+        self.document_store = document_store
+        self.filters = filters or {}
+        self.top_k = top_k
+        self.ef_search = ef_search
+        self.vector_function = vector_function
+        self.iterative_scan = iterative_scan
+
+    def to_dict(self) -> Dict[str, Any]:
+        return default_to_dict(
+            self,
+            document_store=self.document_store.to_dict(),
+            filters=self.filters,
+            top_k=self.top_k,
+            ef_search=self.ef_search,
+            vector_function=self.vector_function,
+            iterative_scan=self.iterative_scan
+        )
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "PgvectorHnswRetriever":
+        data["init_parameters"]["document_store"] = PgvectorDocumentStore.from_dict(
+            data["init_parameters"]["document_store"])
+        return default_from_dict(cls, data)
+
+    @component.output_types(documents=List[Document])
+    def run(
+        self,
+        query_embedding: List[float],
+        filters: Optional[Dict[str, Any]] = None,
+        top_k: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        vector_function: Optional[str] = None
+    ):
+        documents = hnsw_embedding_retrieval(
+            self.document_store,
+            query_embedding,
+            top_k=top_k or self.top_k,
+            filters=filters or self.filters,
+            ef_search=ef_search or self.ef_search,
+            iterative_scan=self.iterative_scan
+        )
+        return {"documents": documents}
+
+
+def _percentile(values: List[float], percentile: int) -> float:
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100, method="inclusive")[percentile - 1]
+
+
+def recall_report(
+    store: PgvectorDocumentStore,
+    query_embeddings: List[List[float]],
+    ef_search_values: List[int],
+    top_k: int = 10
+) -> List[dict]:
+    """
+    Compares the HNSW results against the exact search for every `ef_search`.
+
+    Returns:
+    - One row per `ef_search` (the first one is the exact search) with the mean recall@k
+      and the p50 / p95 latency in milliseconds
+    """
+    exact_ids, exact_latencies = [], []
+    for embedding in query_embeddings:
+        start = time.perf_counter()
+        documents = hnsw_embedding_retrieval(
+            store, embedding, top_k=top_k, exact=True)
+        exact_latencies.append((time.perf_counter() - start) * 1000)
+        exact_ids.append({doc.id for doc in documents})
+
+    report = [{
+        "ef_search": "exact",
+        "recall": 1.0,
+        "p50_ms": _percentile(exact_latencies, 50),
+        "p95_ms": _percentile(exact_latencies, 95)
+    }]
+    for ef_search in ef_search_values:
+        recalls, latencies = [], []
+        for embedding, expected in zip(query_embeddings, exact_ids):
+            start = time.perf_counter()
+            documents = hnsw_embedding_retrieval(
+                store, embedding, top_k=top_k, ef_search=ef_search)
+            latencies.append((time.perf_counter() - start) * 1000)
+            found = {doc.id for doc in documents}
+            recalls.append(len(found & expected) / len(expected) if expected else 1.0)
+        report.append({
+            "ef_search": ef_search,
+            "recall": statistics.fmean(recalls) if recalls else 0.0,
+            "p50_ms": _percentile(latencies, 50),
+            "p95_ms": _percentile(latencies, 95)
+        })
+    return report
@@ -0,0 +1,518 @@
+import os
+import re
+import json
+import math
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional
+import numpy as np
+from haystack import component, default_from_dict, default_to_dict
+from haystack.dataclasses import Document
+from haystack.document_stores.errors import DuplicateDocumentError
+from haystack.document_stores.types import DuplicatePolicy
+from haystack.utils.filters import document_matches_filter
+
+DTYPES = {"float32": np.float32, "float16": np.float16, "int8": np.int8}
+
+# Keeps Angular API names such as `@defer` or `provideRouter` as single tokens
+TOKEN_PATTERN = re.compile(r"@?\w+")
+
+
+def equality_conditions(filters: Dict[str, Any]) -> Optional[List[tuple]]:
+    """
+    Reads filters made of `==` / `in` conditions on metadata fields (alone or joined by AND).
+
+    Returns:
+    - (metadata field, accepted values) per condition, None for any other filter
+    """
+    if filters.get("operator") == "AND" and "conditions" in filters:
+        conditions = [equality_conditions(condition) for condition in filters["conditions"]]
+        return None if any(condition is None for condition in conditions) else \
+            [item for condition in conditions for item in condition]
+    field = filters.get("field", "")
+    if not field.startswith("meta."):
+        return None
+    if filters.get("operator") == "==":
+        return [(field[len("meta."):], [filters["value"]])]
+    if filters.get("operator") == "in":
+        return [(field[len("meta."):], list(filters["value"]))]
+    return None
+
+
+def tokenize(text: str) -> List[str]:
+    tokens = TOKEN_PATTERN.findall((text or "").lower())
+    # `@defer` also matches a query for `defer`
+    return tokens + [token[1:] for token in tokens if token.startswith("@")]
+
+
+class BM25Index:
+    """
+    Okapi BM25 inverted index over the contents of a MemmapDocumentStore.
+    """
+
+    def __init__(self, documents: List[tuple], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.lengths: Dict[str, int] = {}
+        for doc_id, content in documents:
+            tokens = tokenize(content)
+            self.lengths[doc_id] = len(tokens)
+            for token in tokens:
+                postings = self.postings.setdefault(token, {})
+                postings[doc_id] = postings.get(doc_id, 0) + 1
+        self.average_length = (sum(self.lengths.values()) / len(self.lengths)) if self.lengths else 0.0
+
+    def scores(self, query: str, allowed: Optional[set] = None) -> Dict[str, float]:
+        """
+        Arguments:
+        - allowed: only these document ids are scored (a filtered search)
+        """
+        scores: Dict[str, float] = {}
+        total = len(self.lengths)
+        for token in set(tokenize(query)):
+            postings = self.postings.get(token)
+            if not postings:
+                continue
+            idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, frequency in postings.items():
+                if allowed is not None and doc_id not in allowed:
+                    continue
+                norm = 1 - self.b + self.b * self.lengths[doc_id] / (self.average_length or 1.0)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + self.k1 * norm)
+        return scores
+
+
+class MemmapDocumentStore:
+    """
+    In-process vector store, an offline alternative to PgvectorDocumentStore.
+
+    Embeddings are normalized and kept in a memory-mapped NumPy matrix (optionally
+    quantized to float16 or int8), so a cosine search is a single matmul plus an
+    argpartition. Contents and metadata live in a SQLite file next to the matrix.
+
+    Equality filters on metadata (e.g. `meta.version`) select the rows from an in-memory
+    index of the field before the matmul, so a filtered search only reads the matching rows.
+
+    The store keeps the dtype it was written with: opening it with another one re-encodes the
+    matrix, and a different embedding dimension is refused. Writes made by another process
+    (e.g. `index.py`) are picked up by the next read (SQLite's `PRAGMA data_version`).
+    """
+
+    def __init__(self, path: str, embedding_dimension: int = 768, dtype: str = "float32"):
+        if dtype not in DTYPES:
+            raise ValueError(
+                f"Unsupported dtype '{dtype}', use one of {list(DTYPES)}")
+        self.path = path
+        self.embedding_dimension = embedding_dimension
+        self.dtype = dtype
+        self._lock = threading.RLock()
+        self._bm25: Optional[BM25Index] = None
+        # Rows by value of every filtered metadata field, rebuilt after writes
+        self._meta_rows: Dict[str, Dict[Any, np.ndarray]] = {}
+
+        os.makedirs(path, exist_ok=True)
+        self._matrix_path = os.path.join(path, f"embeddings.{dtype}.npy")
+        self._connection = sqlite3.connect(
+            os.path.join(path, "documents.sqlite"), check_same_thread=False)
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS documents (
+                id TEXT PRIMARY KEY,
+                row INTEGER UNIQUE,
+                content TEXT,
+                meta TEXT NOT NULL,
+                norm REAL,
+                scale REAL
+            )
+        """)
+        self._connection.execute("CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._connection.commit()
+        self._check_settings()
+        self._load()
+
+    def _setting(self, key: str) -> Optional[str]:
+        row = self._connection.execute("SELECT value FROM settings WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _stored_dtype(self) -> Optional[str]:
+        # Stores written before the settings table only have their matrix file
+        stored = self._setting("dtype")
+        if stored is None and not os.path.exists(self._matrix_path):
+            stored = next((dtype for dtype in DTYPES
+                           if os.path.exists(os.path.join(self.path, f"embeddings.{dtype}.npy"))), None)
+        return stored
+
+    def _check_settings(self):
+        dimension = self._setting("embedding_dimension")
+        if dimension is not None and int(dimension) != self.embedding_dimension:
+            raise ValueError(f"The store at '{self.path}' holds {dimension}-dimensional embeddings, "
+                             f"not {self.embedding_dimension}: re-index it into another path")
+        stored_dtype = self._stored_dtype()
+        if stored_dtype is not None and stored_dtype != self.dtype:
+            self._reencode(stored_dtype)
+        self._connection.executemany("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
+                                     [("dtype", self.dtype), ("embedding_dimension", str(self.embedding_dimension))])
+        self._connection.commit()
+
+    def _reencode(self, stored_dtype: str):
+        # The rows keep their position, only their vector and int8 scale change
+        stored_path = os.path.join(self.path, f"embeddings.{stored_dtype}.npy")
+        rows = self._connection.execute(
+            "SELECT row, scale FROM documents WHERE row IS NOT NULL ORDER BY row").fetchall()
+        stored = np.load(stored_path, mmap_mode="r") if os.path.exists(stored_path) else None
+        if rows and stored is None:
+            raise ValueError(f"The store at '{self.path}' has no {stored_dtype} matrix to re-encode")
+        tmp_path = f"{self._matrix_path}.tmp"
+        matrix = np.lib.format.open_memmap(
+            tmp_path, mode="w+", dtype=DTYPES[self.dtype],
+            shape=(max(1024, stored.shape[0] if stored is not None else 0), self.embedding_dimension))
+        scales = []
+        for row, scale in rows:
+            vector, _, new_scale = self._encode(stored[row].astype(np.float32) * (scale or 1.0))
+            matrix[row] = vector
+            scales.append((new_scale, row))
+        matrix.flush()
+        del matrix
+        os.replace(tmp_path, self._matrix_path)
+        self._connection.executemany("UPDATE documents SET scale = ? WHERE row = ?", scales)
+        self._connection.execute("INSERT OR REPLACE INTO settings (key, value) VALUES ('dtype', ?)", (self.dtype,))
+        self._connection.commit()
+        if stored is not None:
+            del stored
+            os.remove(stored_path)
+
+    def _refresh(self):
+        # Another connection (e.g. the `index.py` process) committed since the last load
+        if self._connection.execute("PRAGMA data_version").fetchone()[0] != self._data_version:
+            self._load()
+            self._bm25 = None
+            self._meta_rows = {}
+
+    def _load(self):
+        self._data_version = self._connection.execute("PRAGMA data_version").fetchone()[0]
+        rows = self._connection.execute(
+            "SELECT row, id, norm, scale FROM documents WHERE row IS NOT NULL ORDER BY row").fetchall()
+        self._count = len(rows)
+        self._ids = [doc_id for _, doc_id, _, _ in rows]
+        self._norms = np.array([norm for _, _, norm, _ in rows], dtype=np.float32)
+        self._scales = np.array([scale or 1.0 for _, _, _, scale in rows], dtype=np.float32)
+        if os.path.exists(self._matrix_path):
+            self._matrix = np.load(self._matrix_path, mmap_mode="r+")
+        else:
+            self._matrix = self._allocate(1024)
+
+    def _allocate(self, capacity: int) -> np.memmap:
+        tmp_path = f"{self._matrix_path}.tmp"
+        matrix = np.lib.format.open_memmap(
+            tmp_path, mode="w+", dtype=DTYPES[self.dtype],
+            shape=(capacity, self.embedding_dimension))
+        if getattr(self, "_matrix", None) is not None and self._count:
+            matrix[:self._count] = self._matrix[:self._count]
+        matrix.flush()
+        os.replace(tmp_path, self._matrix_path)
+        return np.load(self._matrix_path, mmap_mode="r+")
+
+    def _encode(self, embedding: List[float]) -> tuple:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = float(np.linalg.norm(vector)) or 1.0
+        vector = vector / norm
+        if self.dtype == "int8":
+            scale = float(np.abs(vector).max()) / 127 or 1.0
+            return np.round(vector / scale).astype(np.int8), norm, scale
+        return vector.astype(DTYPES[self.dtype]), norm, 1.0
+
+    def _decode(self, row: int) -> List[float]:
+        vector = self._matrix[row].astype(np.float32) * self._scales[row]
+        return (vector * self._norms[row]).tolist()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return default_to_dict(
+            self, path=self.path, embedding_dimension=self.embedding_dimension, dtype=self.dtype)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "MemmapDocumentStore":
+        return default_from_dict(cls, data)
+
+    def count_documents(self) -> int:
+        return self._connection.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def _to_document(self, doc_id: str, row: Optional[int], content: str, meta: str, score=None) -> Document:
+        embedding = self._decode(row) if row is not None else None
+        return Document(id=doc_id, content=content, meta=json.loads(meta), embedding=embedding, score=score)
+
+    def filter_documents(self, filters: Optional[Dict[str, Any]] = None) -> List[Document]:
+        with self._lock:
+            self._refresh()
+            rows = self._connection.execute(
+                "SELECT id, row, content, meta FROM documents ORDER BY row").fetchall()
+            documents = [self._to_document(*row) for row in rows]
+        if not filters:
+            return documents
+        return [doc for doc in documents if document_matches_filter(filters, doc)]
+
+    def write_documents(self, documents: List[Document], policy: DuplicatePolicy = DuplicatePolicy.NONE) -> int:
+        if policy == DuplicatePolicy.NONE:
+            policy = DuplicatePolicy.FAIL
+
+        written = 0
+        with self._lock:
+            self._refresh()
+            for doc in documents:
+                existing = self._connection.execute(
+                    "SELECT row FROM documents WHERE id = ?", (doc.id,)).fetchone()
+                if existing is not None:
+                    if policy == DuplicatePolicy.SKIP:
+                        continue
+                    if policy == DuplicatePolicy.FAIL:
+                        raise DuplicateDocumentError(
+                            f"ID '{doc.id}' already exists in the document store.")
+                    self._delete([doc.id])
+
+                row, norm, scale = None, None, None
+                if doc.embedding is not None:
+                    if self._count == self._matrix.shape[0]:
+                        self._matrix = self._allocate(self._matrix.shape[0] * 2)
+                    vector, norm, scale = self._encode(doc.embedding)
+                    row = self._count
+                    self._matrix[row] = vector
+                    self._ids.append(doc.id)
+                    self._norms = np.append(self._norms, np.float32(norm))
+                    self._scales = np.append(self._scales, np.float32(scale))
+                    self._count += 1
+
+                self._connection.execute(
+                    "INSERT INTO documents (id, row, content, meta, norm, scale) VALUES (?, ?, ?, ?, ?, ?)",
+                    (doc.id, row, doc.content, json.dumps(doc.meta), norm, scale)
+                )
+                written += 1
+            self._bm25 = None
+            self._meta_rows = {}
+            self._matrix.flush()
+            self._connection.commit()
+        return written
+
+    def _delete(self, document_ids: List[str]):
+        for doc_id in document_ids:
+            found = self._connection.execute(
+                "SELECT row FROM documents WHERE id = ?", (doc_id,)).fetchone()
+            if found is None:
+                continue
+            self._connection.execute("DELETE FROM documents WHERE id = ?", (doc_id,))
+            row = found[0]
+            if row is None:
+                continue
+            # The last row takes the place of the deleted one, so the matrix stays dense
+            last = self._count - 1
+            if row != last:
+                self._matrix[row] = self._matrix[last]
+                self._norms[row] = self._norms[last]
+                self._scales[row] = self._scales[last]
+                self._ids[row] = self._ids[last]
+                self._connection.execute(
+                    "UPDATE documents SET row = ? WHERE id = ?", (row, self._ids[row]))
+            self._ids.pop()
+            self._norms = self._norms[:last]
+            self._scales = self._scales[:last]
+            self._count = last
+
+    def delete_documents(self, document_ids: List[str]) -> None:
+        with self._lock:
+            self._refresh()
+            self._delete(document_ids)
+            self._bm25 = None
+            self._meta_rows = {}
+            self._matrix.flush()
+            self._connection.commit()
+
+    def _rows_by_value(self, field: str) -> Dict[Any, np.ndarray]:
+        rows_by_value = self._meta_rows.get(field)
+        if rows_by_value is None:
+            grouped = {}
+            for row, value in self._connection.execute(
+                    "SELECT row, json_extract(meta, ?) FROM documents WHERE row IS NOT NULL", (f"$.{field}",)):
+                grouped.setdefault(value, []).append(row)
+            rows_by_value = {value: np.array(rows, dtype=np.int64) for value, rows in grouped.items()}
+            self._meta_rows[field] = rows_by_value
+        return rows_by_value
+
+    def _filtered_rows(self, filters: Dict[str, Any]) -> np.ndarray:
+        conditions = equality_conditions(filters)
+        if conditions is None:
+            # Any other filter is evaluated document by document
+            return np.array([row for row, doc in enumerate(self._documents_by_row())
+                             if document_matches_filter(filters, doc)], dtype=np.int64)
+        rows = None
+        for field, values in conditions:
+            rows_by_value = self._rows_by_value(field)
+            matched = [rows_by_value[value] for value in values if value in rows_by_value]
+            matched = np.concatenate(matched) if matched else np.array([], dtype=np.int64)
+            rows = matched if rows is None else np.intersect1d(rows, matched)
+        return np.sort(rows)
+
+    def embedding_retrieval(
+        self,
+        query_embedding: List[float],
+        filters: Optional[Dict[str, Any]] = None,
+        top_k: int = 10
+    ) -> List[Document]:
+        """
+        Returns the `top_k` documents by cosine similarity with `query_embedding`.
+        """
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+
+        with self._lock:
+            self._refresh()
+            if filters:
+                rows = self._filtered_rows(filters)
+                matrix = self._matrix[rows]
+                scales = self._scales[rows]
+            else:
+                rows = np.arange(self._count)
+                matrix = self._matrix[:self._count]
+                scales = self._scales
+
+            if len(rows) == 0:
+                return []
+            scores = matrix.astype(np.float32, copy=False) @ query
+            if self.dtype == "int8":
+                scores = scores * scales
+
+            k = min(top_k, len(rows))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top], kind="stable")]
+            ids = [self._ids[rows[i]] for i in top]
+            by_id = {}
+            for doc_id, row, content, meta in self._connection.execute(
+                f"SELECT id, row, content, meta FROM documents WHERE id IN ({','.join('?' * len(ids))})", ids
+            ):
+                by_id[doc_id] = (doc_id, row, content, meta)
+            return [self._to_document(*by_id[doc_id], score=float(scores[i])) for doc_id, i in zip(ids, top)]
+
+    def keyword_retrieval(
+        self,
+        query: str,
+        filters: Optional[Dict[str, Any]] = None,
+        top_k: int = 10
+    ) -> List[Document]:
+        """
+        Returns the `top_k` documents by BM25 score, the index is rebuilt after writes.
+        """
+        with self._lock:
+            self._refresh()
+            if self._bm25 is None:
+                self._bm25 = BM25Index(self._connection.execute(
+                    "SELECT id, content FROM documents").fetchall())
+            allowed = None
+            if filters and equality_conditions(filters) is not None:
+                allowed = {self._ids[row] for row in self._filtered_rows(filters)}
+            scores = self._bm25.scores(query, allowed)
+            ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+            documents = []
+            for doc_id, score in ranked:
+                row = self._connection.execute(
+                    "SELECT id, row, content, meta FROM documents WHERE id = ?", (doc_id,)).fetchone()
+                document = self._to_document(*row, score=score)
+                if filters and not document_matches_filter(filters, document):
+                    continue
+                documents.append(document)
+                if len(documents) == top_k:
+                    break
+            return documents
+
+    def _documents_by_row(self) -> List[Document]:
+        rows = self._connection.execute(
+            "SELECT id, content, meta FROM documents WHERE row IS NOT NULL ORDER BY row").fetchall()
+        return [Document(id=doc_id, content=content, meta=json.loads(meta)) for doc_id, content, meta in rows]
+
+
+@component
+class MemmapEmbeddingRetriever:
+    """
+    Retrieves documents from a MemmapDocumentStore, with the same sockets as PgvectorEmbeddingRetriever.
+    """
+
+    def __init__(
+        self,
+        document_store: MemmapDocumentStore,
+        filters: Optional[Dict[str, Any]] = None,
+        top_k: int = 10,
+        vector_function: str = "cosine_similarity"
+    ):
+        if vector_function != "cosine_similarity":
+            raise ValueError("MemmapEmbeddingRetriever only supports 'cosine_similarity'")
+        self.document_store = document_store
+        self.filters = filters or {}
+        self.top_k = top_k
+        self.vector_function = vector_function
+
+    def to_dict(self) -> Dict[str, Any]:
+        return default_to_dict(
+            self,
+            document_store=self.document_store.to_dict(),
+            filters=self.filters,
+            top_k=self.top_k,
+            vector_function=self.vector_function
+        )
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "MemmapEmbeddingRetriever":
+        data["init_parameters"]["document_store"] = MemmapDocumentStore.from_dict(
+            data["init_parameters"]["document_store"])
+        return default_from_dict(cls, data)
+
+    @component.output_types(documents=List[Document])
+    def run(
+        self,
+        query_embedding: List[float],
+        filters: Optional[Dict[str, Any]] = None,
+        top_k: Optional[int] = None,
+        vector_function: Optional[str] = None
+    ):
+        documents = self.document_store.embedding_retrieval(
+            query_embedding,
+            filters=filters or self.filters,
+            top_k=top_k or self.top_k
+        )
+        return {"documents": documents}
+
+
+@component
+class MemmapKeywordRetriever:
+    """
+    Retrieves documents from a MemmapDocumentStore by BM25, with the same sockets as PgvectorKeywordRetriever.
+    """
+
+    def __init__(
+        self,
+        document_store: MemmapDocumentStore,
+        filters: Optional[Dict[str, Any]] = None,
+        top_k: int = 10
+    ):
+        self.document_store = document_store
+        self.filters = filters or {}
+        self.top_k = top_k
+
+    def to_dict(self) -> Dict[str, Any]:
+        return default_to_dict(
+            self,
+            document_store=self.document_store.to_dict(),
+            filters=self.filters,
+            top_k=self.top_k
+        )
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "MemmapKeywordRetriever":
+        data["init_parameters"]["document_store"] = MemmapDocumentStore.from_dict(
+            data["init_parameters"]["document_store"])
+        return default_from_dict(cls, data)
+
+    @component.output_types(documents=List[Document])
+    def run(self, query: str, filters: Optional[Dict[str, Any]] = None, top_k: Optional[int] = None):
+        documents = self.document_store.keyword_retrieval(
+            query,
+            filters=filters or self.filters,
+            top_k=top_k or self.top_k
+        )
+        return {"documents": documents}
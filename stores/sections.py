@@ -0,0 +1,125 @@
+import os
+import json
+import threading
+from typing import List, Optional
+from haystack.dataclasses import Document
+from registry import lazy
+from constants import SECTION_INDEX_FILE
+
+
+class SectionIndex:
+    """
+    Sections of the indexed Markdown (heading path, parent and own text) keyed by `section_id`,
+    written by the indexing stage next to the chunks.
+
+    Lets the retrieved chunks be expanded to their whole section, or to the biggest parent
+    section within a word budget, without another embedding query. The word count of every
+    section (with its subsections) is computed once per load of the file, the full text of the
+    expanded sections (within the budget) once when first needed.
+    """
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._sections = None
+        self._children = None
+        self._words = None
+        self._full_texts = None
+        self._mtime = None
+
+    def _load(self):
+        # Re-read when another process (index.py) rewrote the file
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if self._sections is not None and mtime == self._mtime:
+            return
+        sections = {}
+        if mtime is not None:
+            with open(self.path, "r") as f:
+                for sections_by_id in json.load(f).values():
+                    sections.update(sections_by_id)
+        children = {}
+        for section_id, section in sections.items():
+            if section["parent"]:
+                children.setdefault(section["parent"], []).append(section_id)
+        # Subsections come after their section, so in reverse order they're counted before it
+        words = {}
+        for section_id in reversed(list(sections)):
+            words[section_id] = len(sections[section_id]["text"].split()) + \
+                sum(words[child_id] for child_id in children.get(section_id, []))
+        self._sections, self._children, self._words, self._mtime = sections, children, words, mtime
+        self._full_texts = {}
+
+    def save(self, url: str, sections: List[dict]):
+        """
+        Replaces the sections of `url`.
+        """
+        with self._lock:
+            try:
+                with open(self.path, "r") as f:
+                    data = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                data = {}
+            data[url] = {section["id"]: {key: value for key, value in section.items() if key != "id"}
+                         for section in sections}
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+            self._sections = None
+
+    def _full_text(self, section_id: str) -> str:
+        # The section followed by its subsections, in document order
+        if section_id not in self._full_texts:
+            texts = [self._sections[section_id]["text"]]
+            texts += [self._full_text(child_id) for child_id in self._children.get(section_id, [])]
+            self._full_texts[section_id] = "\n\n".join(text for text in texts if text)
+        return self._full_texts[section_id]
+
+    def _ancestors(self, section_id: str) -> List[str]:
+        ancestors = []
+        while self._sections[section_id]["parent"] in self._sections:
+            section_id = self._sections[section_id]["parent"]
+            ancestors.append(section_id)
+        return ancestors
+
+    def _expanded_id(self, section_id: str, max_words: int) -> Optional[str]:
+        # The biggest section containing `section_id` (itself or a parent) within `max_words`
+        best = None
+        while section_id in self._sections:
+            if self._words[section_id] > max_words:
+                break
+            best = section_id
+            section_id = self._sections[section_id]["parent"]
+        return best
+
+    def expand(self, documents: List[Document], max_words: int) -> List[Document]:
+        """
+        Replaces every chunk by its section, or the biggest parent section within `max_words`.
+        Chunks whose section is already included (by another chunk or a parent) are dropped,
+        chunks whose own section doesn't fit are kept as they are.
+        """
+        with self._lock:
+            self._load()
+            expanded_ids = [self._expanded_id(doc.meta["section_id"], max_words)
+                            if doc.meta.get("section_id") else None for doc in documents]
+            included = {section_id for section_id in expanded_ids if section_id}
+            expanded, seen = [], set()
+            for doc, section_id in zip(documents, expanded_ids):
+                if section_id is None:
+                    expanded.append(doc)
+                    continue
+                if section_id in seen or included & set(self._ancestors(section_id)):
+                    continue
+                seen.add(section_id)
+                expanded.append(Document(id=doc.id, content=self._full_text(section_id), score=doc.score,
+                                         meta={**doc.meta, "expanded_section_id": section_id}))
+            return expanded
+
+
+@lazy
+def get_section_index() -> SectionIndex:
+    return SectionIndex(SECTION_INDEX_FILE)
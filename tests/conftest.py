@@ -0,0 +1,9 @@
+import os
+import tempfile
+
+# The modules read their paths from constants.py on import, keep them out of the real cache
+_cache_dir = tempfile.mkdtemp(prefix="haystack-angular-tests-")
+os.environ.setdefault("ANGULAR_CACHE_DIR", f"{_cache_dir}/.cache")
+os.environ.setdefault("ANGULAR_RESULT_DIR", f"{_cache_dir}/result")
+os.environ.setdefault("ANGULAR_SKILLS_DIR", f"{_cache_dir}/skills")
+os.environ.setdefault("DOCUMENT_STORE", "memmap")
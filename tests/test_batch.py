@@ -0,0 +1,53 @@
+import json
+import asyncio
+import batch
+from haystack import tracing
+from instrumentation.tracer import JsonlMetricsSink, MetricsTracer, collect_spans, stage_timings
+
+
+def test_resume_runs_the_failed_and_cut_queries_again(tmp_path, monkeypatch):
+    input_path, output_path = tmp_path / "queries.jsonl", tmp_path / "results.jsonl"
+    input_path.write_text("".join(json.dumps({"id": str(i), "query": f"query {i}"}) + "\n" for i in range(4)))
+    output_path.write_text(json.dumps({"id": "0", "error": None}) + "\n" +
+                           json.dumps({"id": "1", "error": "RuntimeError: boom"}) + "\n" +
+                           '{"id": "2", "err')
+    assert batch.completed_ids(str(output_path)) == {"0"}
+
+    ran = []
+
+    async def run_query(entry: dict) -> dict:
+        ran.append(entry["id"])
+        return {"id": entry["id"], "todo_path": "TODO.md", "error": None, "timings": {"total_s": 0.0}}
+
+    monkeypatch.setattr(batch, "run_query", run_query)
+    asyncio.run(batch.run_batch(str(input_path), str(output_path), concurrency=2))
+
+    assert sorted(ran) == ["1", "2", "3"]
+    assert batch.completed_ids(str(output_path)) == {"0", "1", "2", "3"}
+
+
+def test_stage_timings_of_one_request(tmp_path):
+    tracer = MetricsTracer(tracing.tracer.actual_tracer, JsonlMetricsSink(str(tmp_path / "metrics.jsonl")))
+
+    def component(name: str, parent=None):
+        return tracer.trace("haystack.component.run", tags={"haystack.component.name": name}, parent_span=parent)
+
+    with collect_spans() as spans:
+        with tracer.trace("haystack.pipeline.run"):
+            with component("agent") as agent:
+                for _ in range(2):
+                    with component("chat_generator", agent):
+                        pass
+                with component("tool_invoker", agent) as invoker:
+                    with tracer.trace("angular.tool.invoke", tags={"angular.tool.name": "documentation_tool"},
+                                      parent_span=invoker):
+                        with component("retriever"):
+                            pass
+    # Outside the block nothing is collected
+    with tracer.trace("haystack.pipeline.run"):
+        pass
+
+    stages = stage_timings(spans)
+    assert list(stages) == ["pipeline", "pipeline/agent", "pipeline/agent/chat_generator",
+                            "pipeline/agent/tool_invoker", "pipeline/agent/tool_invoker/documentation_tool"]
+    assert len([record for record in spans if record["name"] == "chat_generator"]) == 2
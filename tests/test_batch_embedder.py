@@ -0,0 +1,77 @@
+import time
+import random
+import threading
+from typing import List
+from haystack import component
+from haystack.dataclasses import Document
+from models.batch_embedder import ConcurrentDocumentEmbedder
+
+
+@component
+class SlowEmbedder:
+    def __init__(self):
+        self.running = 0
+        self.max_running = 0
+        self._lock = threading.Lock()
+
+    @component.output_types(documents=List[Document])
+    def run(self, documents: List[Document]):
+        with self._lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        # Batches finish out of order
+        time.sleep(random.uniform(0.001, 0.02))
+        with self._lock:
+            self.running -= 1
+        return {"documents": [Document(id=doc.id, content=doc.content, embedding=[1.0]) for doc in documents]}
+
+
+@component
+class RecordingWriter:
+    def __init__(self):
+        self.batches = []
+
+    @component.output_types(documents_written=int)
+    def run(self, documents: List[Document]):
+        self.batches.append([doc.content for doc in documents])
+        return {"documents_written": len(documents)}
+
+
+def documents(count: int) -> List[Document]:
+    return [Document(content=str(i)) for i in range(count)]
+
+
+def test_batches_are_written_in_order_from_concurrent_workers():
+    embedder, writer = SlowEmbedder(), RecordingWriter()
+    result = ConcurrentDocumentEmbedder(embedder, writer=writer, batch_size=3, max_workers=4).run(documents(50))
+
+    assert result["documents_written"] == 50
+    assert [doc.content for doc in result["documents"]] == [str(i) for i in range(50)]
+    assert [len(batch) for batch in writer.batches] == [3] * 16 + [2]
+    assert [content for batch in writer.batches for content in batch] == [str(i) for i in range(50)]
+    assert 1 < embedder.max_running <= 4
+
+
+def test_the_input_is_read_as_the_batches_are_embedded():
+    read = []
+
+    def generate():
+        for document in documents(40):
+            read.append(document.content)
+            yield document
+
+    pending_at_write = []
+    writer = RecordingWriter()
+
+    @component
+    class Writer:
+        @component.output_types(documents_written=int)
+        def run(self, documents: List[Document]):
+            # Documents read but not written yet: at most max_pending batches and the one being built
+            pending_at_write.append(len(read) - sum(len(batch) for batch in writer.batches))
+            return writer.run(documents)
+
+    result = ConcurrentDocumentEmbedder(SlowEmbedder(), writer=Writer(), batch_size=2, max_workers=2,
+                                        max_pending=2, keep_documents=False).run(generate())
+    assert result["documents"] == [] and result["documents_written"] == 40
+    assert max(pending_at_write) <= 2 * 2 + 2
@@ -0,0 +1,59 @@
+from haystack.core.serialization import component_to_dict
+from haystack.dataclasses import Document
+from stores.memmap import MemmapDocumentStore, MemmapKeywordRetriever
+from stores.sections import SectionIndex
+from tools import documentation
+from tools.documentation import DocumentationPipeline, version_filters
+
+SOURCES = {"v20": "https://angular.dev/llms-full.txt", "v17": "/docs/v17/llms-full.txt"}
+
+
+def test_version_filters():
+    assert version_filters("v17", "v20", SOURCES) == {"field": "meta.version", "operator": "==", "value": "v17"}
+    # Missing or not indexed versions search the default one
+    assert version_filters(None, "v20", SOURCES)["value"] == "v20"
+    assert version_filters("v12", "v17", SOURCES)["value"] == "v17"
+
+
+def test_default_version_is_part_of_the_serialized_component():
+    # pipeline_version (the keys of the memoized documentation_tool) hashes the serialized components
+    v20 = component_to_dict(DocumentationPipeline("v20", SOURCES), "documentation")
+    v17 = component_to_dict(DocumentationPipeline("v17", SOURCES), "documentation")
+    assert v20 != v17
+    assert v17["init_parameters"] == {"default_version": "v17", "sources": SOURCES}
+
+
+def test_hybrid_retrieval_fuses_the_embedding_and_keyword_rankings(tmp_path, monkeypatch):
+    store = MemmapDocumentStore(str(tmp_path / "store"), embedding_dimension=2)
+    chunks = {
+        "router": Document(content="Configure the routes with provideRouter()", meta={"version": "v20"}),
+        "signals": Document(content="Signals hold reactive state", meta={"version": "v20"}),
+        "navigation": Document(content="Navigation between pages uses the router", meta={"version": "v20"}),
+        "old_router": Document(content="provideRouter in the old release", meta={"version": "v17"}),
+    }
+    store.write_documents([Document(id=name, content=doc.content, meta=doc.meta, embedding=[1.0, 0.0])
+                           for name, doc in chunks.items()])
+    searched = []
+
+    class SearchPipeline:
+        # The embedding branch, it misses the exact API name
+        def run(self, data, include_outputs_from):
+            searched.append(data["retriever"]["filters"])
+            documents = [store.filter_documents({"field": "id", "operator": "==", "value": doc_id})[0]
+                         for doc_id in ["navigation", "signals"]]
+            return {"retriever": {"documents": documents}, "text_embedder": {"embedding": [1.0, 0.0]}}
+
+    monkeypatch.setattr(documentation, "ensure_index", lambda: None)
+    monkeypatch.setattr(documentation, "get_search_pipeline", lambda: SearchPipeline())
+    monkeypatch.setattr(documentation, "get_section_index", lambda: SectionIndex(str(tmp_path / "sections.json")))
+    pipeline = DocumentationPipeline("v20", SOURCES)
+    pipeline.keyword_retriever = MemmapKeywordRetriever(store, top_k=5)
+    pipeline.joiner.top_k = 3
+
+    result = pipeline.run(query="provideRouter navigation")
+    ids = [doc.id for doc in result["relevant_documentation"]]
+    # Found by both branches first, the keyword-only match is kept, the other version never searched
+    assert ids[0] == "navigation"
+    assert "router" in ids and "old_router" not in ids
+    assert searched == [{"field": "meta.version", "operator": "==", "value": "v20"}]
+    assert result["query_embedding"] == [1.0, 0.0]
@@ -0,0 +1,69 @@
+import time
+from typing import List
+from haystack import component
+from haystack.dataclasses import Document
+from models.embedding_cache import CachedDocumentEmbedder, CachedTextEmbedder, EmbeddingCache
+
+# Bytes of one 4-dimensional embedding (float64)
+SIZE = 4 * 8
+
+
+@component
+class FakeEmbedder:
+    model = "nomic-embed-text"
+    prefix = ""
+
+    def __init__(self):
+        self.embedded = []
+
+    @component.output_types(documents=List[Document])
+    def run(self, documents: List[Document]):
+        self.embedded += [doc.content for doc in documents]
+        return {"documents": [Document(content=doc.content, embedding=[float(len(doc.content)), 0.0, 0.0, 1.0])
+                              for doc in documents]}
+
+
+def test_least_recently_used_embeddings_are_evicted(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "embeddings.sqlite"), max_bytes=3 * SIZE)
+    for key in ["a", "b", "c"]:
+        cache.put_many({key: [1.0, 2.0, 3.0, 4.0]})
+        time.sleep(0.01)
+    # "a" is read, "b" becomes the least recently used
+    assert cache.get_many(["a"]) == {"a": [1.0, 2.0, 3.0, 4.0]}
+    time.sleep(0.01)
+    cache.put_many({"d": [0.0, 0.0, 0.0, 0.0]})
+    assert set(cache.get_many(["a", "b", "c", "d"])) == {"a", "c", "d"}
+
+
+def test_document_embedder_only_embeds_the_misses(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "embeddings.sqlite"), max_bytes=10 ** 6)
+    embedder = FakeEmbedder()
+    cached_embedder = CachedDocumentEmbedder(embedder, cache)
+    cached_embedder.run(documents=[Document(content="signals"), Document(content="forms")])
+
+    result = cached_embedder.run(documents=[Document(content="forms"), Document(content="signals  "),
+                                            Document(content="router")])
+    assert embedder.embedded == ["signals", "forms", "router"]
+    assert (result["meta"]["cache_hits"], result["meta"]["cache_misses"]) == (2, 1)
+    # In the order of the input, the normalized text shares the cached embedding
+    assert [doc.embedding[0] for doc in result["documents"]] == [5.0, 7.0, 6.0]
+
+
+def test_embeddings_are_keyed_by_model_and_prefix(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "embeddings.sqlite"), max_bytes=10 ** 6)
+    calls = []
+
+    @component
+    class TextEmbedder:
+        def __init__(self, model: str, prefix: str = ""):
+            self.model = model
+            self.prefix = prefix
+
+        @component.output_types(embedding=List[float])
+        def run(self, text: str):
+            calls.append((self.model, self.prefix, text))
+            return {"embedding": [1.0]}
+
+    for embedder in [TextEmbedder("a"), TextEmbedder("a"), TextEmbedder("b"), TextEmbedder("a", "search_query: ")]:
+        CachedTextEmbedder(embedder, cache).run(text="signals")
+    assert calls == [("a", "", "signals"), ("b", "", "signals"), ("a", "search_query: ", "signals")]
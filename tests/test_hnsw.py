@@ -0,0 +1,103 @@
+from contextlib import contextmanager
+from types import SimpleNamespace
+import pytest
+from haystack.utils import Secret
+from haystack_integrations.document_stores.pgvector import PgvectorDocumentStore
+from stores.hnsw import PgvectorHnswRetriever, build_hnsw_index, hnsw_embedding_retrieval, recall_report
+
+
+class FakeConnection:
+    """
+    Records the SQL of the store, the dict cursor answers with `rows`.
+    """
+
+    def __init__(self):
+        self.statements = []
+        self.rows = []
+
+    def execute(self, query, params=None):
+        self.statements.append(query if isinstance(query, str) else query.as_string(None))
+        return self
+
+    def fetchall(self):
+        return self.rows
+
+    @contextmanager
+    def transaction(self):
+        self.statements.append("BEGIN")
+        yield
+        self.statements.append("COMMIT")
+
+
+def row(doc_id: str, score: float) -> dict:
+    return {"id": doc_id, "content": doc_id, "meta": {}, "embedding": None, "score": score,
+            "blob_data": None, "blob_meta": None, "blob_mime_type": None}
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = PgvectorDocumentStore(connection_string=Secret.from_token("postgresql://localhost/test"),
+                                  embedding_dimension=3, search_strategy="hnsw", hnsw_ef_search=40)
+    connection = FakeConnection()
+    monkeypatch.setattr(store, "_ensure_db_setup", lambda: None)
+    store._connection = store._dict_cursor = connection
+    return store
+
+
+def test_build_replaces_the_index_with_the_new_parameters(store):
+    build_hnsw_index(store, m=32, ef_construction=128)
+    assert store._connection.statements == [
+        'DROP INDEX IF EXISTS "public"."haystack_hnsw_index"',
+        'CREATE INDEX "haystack_hnsw_index" ON "public"."haystack_documents" USING hnsw '
+        '(embedding vector_cosine_ops) WITH (m = 32, ef_construction = 128)'
+    ]
+
+
+def test_retrieval_orders_by_the_distance_and_sets_ef_search_per_query(store):
+    hnsw_embedding_retrieval(store, [0.1, 0.2, 0.3], top_k=5, ef_search=100)
+    begin, ef_search, query, commit = store._connection.statements
+    assert (begin, commit) == ("BEGIN", "COMMIT")
+    assert ef_search == "SET LOCAL hnsw.ef_search = 100"
+    # The index can only answer an ORDER BY on the distance operator
+    assert query.endswith("ORDER BY embedding <=> %s::vector LIMIT 5")
+
+    store._connection.statements = []
+    hnsw_embedding_retrieval(store, [0.1, 0.2, 0.3])
+    assert store._connection.statements[1] == "SET LOCAL hnsw.ef_search = 40"
+
+    store._connection.statements = []
+    hnsw_embedding_retrieval(store, [0.1, 0.2, 0.3], exact=True)
+    assert store._connection.statements[1] == "SET LOCAL enable_indexscan = off"
+
+
+def test_filtered_retrieval_scans_iteratively_and_sorts_the_relaxed_order(store):
+    store._connection.rows = [row("a", 0.5), row("b", 0.9)]
+    filters = {"field": "meta.version", "operator": "==", "value": "v20"}
+    documents = PgvectorHnswRetriever(store, iterative_scan="relaxed_order").run(
+        query_embedding=[0.1, 0.2, 0.3], filters=filters)["documents"]
+
+    assert "SET LOCAL hnsw.iterative_scan = 'relaxed_order'" in store._connection.statements
+    assert [doc.id for doc in documents] == ["b", "a"]
+
+    # Without filters there is nothing to scan for
+    store._connection.statements = []
+    PgvectorHnswRetriever(store, iterative_scan="relaxed_order").run(query_embedding=[0.1, 0.2, 0.3])
+    assert not any("iterative_scan" in statement for statement in store._connection.statements)
+
+
+def test_only_cosine_similarity_is_supported(store):
+    with pytest.raises(ValueError):
+        PgvectorHnswRetriever(store, vector_function="inner_product")
+
+
+def test_recall_report_compares_every_ef_search_with_the_exact_search(store, monkeypatch):
+    from stores import hnsw
+
+    def retrieval(store, embedding, top_k, exact=False, ef_search=None):
+        ids = ["a", "b", "c", "d"] if exact or ef_search >= 100 else ["a", "b", "x", "y"]
+        return [SimpleNamespace(id=doc_id) for doc_id in ids]
+
+    monkeypatch.setattr(hnsw, "hnsw_embedding_retrieval", retrieval)
+    report = recall_report(store, [[0.1, 0.2, 0.3]] * 3, ef_search_values=[40, 100], top_k=4)
+    assert [(entry["ef_search"], entry["recall"]) for entry in report] == [("exact", 1.0), (40, 0.5), (100, 1.0)]
+    assert all(entry["p95_ms"] >= 0 for entry in report)
@@ -0,0 +1,178 @@
+from typing import List
+import pytest
+from haystack import component
+from haystack.components.writers import DocumentWriter
+from haystack.dataclasses import Document
+from haystack.dataclasses.byte_stream import ByteStream
+from haystack.document_stores.types import DuplicatePolicy
+from models.batch_embedder import ConcurrentDocumentEmbedder
+from stores.memmap import MemmapDocumentStore
+from stores.sections import SectionIndex
+from tools import indexing
+from tools.indexing import ChunkDiffer, SourceIndexer
+from tools.markdown_splitter import MarkdownSectionSplitter
+
+URL = "https://angular.dev/llms-full.txt"
+
+
+@component
+class FakeEmbedder:
+    def __init__(self):
+        self.batches = []
+
+    @component.output_types(documents=List[Document])
+    def run(self, documents: List[Document]):
+        self.batches.append(len(documents))
+        return {"documents": [Document(id=doc.id, content=doc.content, meta=doc.meta, embedding=[1.0, 0.0, 0.0, 0.0])
+                              for doc in documents]}
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = MemmapDocumentStore(str(tmp_path / "store"), embedding_dimension=4)
+    sections = SectionIndex(str(tmp_path / "sections.json"))
+    monkeypatch.setattr(indexing, "get_document_store", lambda: store)
+    monkeypatch.setattr(indexing, "get_section_index", lambda: sections)
+    return store
+
+
+def markdown(pages: int, changed: int = -1) -> str:
+    return "\n\n".join(f"# Page {page}\n\nThe text of page {page}{' changed' if page == changed else ''}."
+                       for page in range(pages))
+
+
+def source_indexer(store, embedder, splitter=None) -> SourceIndexer:
+    return SourceIndexer(
+        splitter=splitter or MarkdownSectionSplitter(),
+        differ=ChunkDiffer(),
+        embedder=ConcurrentDocumentEmbedder(
+            embedder, writer=DocumentWriter(document_store=store, policy=DuplicatePolicy.OVERWRITE),
+            batch_size=4, max_workers=1, max_pending=1, keep_documents=False))
+
+
+def stream(text: str) -> ByteStream:
+    return ByteStream(data=text.encode("utf-8"), meta={"url": URL, "version": "v20", "content_hash": "hash"})
+
+
+def test_chunks_are_embedded_while_the_source_is_split(store):
+    read = []
+
+    class CountingSplitter(MarkdownSectionSplitter):
+        def split(self, stream):
+            for kind, item in super().split(stream):
+                read.append(kind)
+                yield kind, item
+
+    embedded_after = []
+
+    class RecordingEmbedder(FakeEmbedder):
+        @component.output_types(documents=List[Document])
+        def run(self, documents: List[Document]):
+            embedded_after.append(read.count("chunk"))
+            return super().run(documents)
+
+    result = source_indexer(store, RecordingEmbedder(), CountingSplitter()).run(streams=[stream(markdown(40))])
+
+    assert result["added"] == 40 and store.count_documents() == 40
+    # The first batch is embedded before the splitter reached the end of the source
+    assert embedded_after[0] < 40
+    assert "content_hash" not in store.filter_documents()[0].meta
+
+
+def test_reindexing_only_embeds_the_changed_chunks(store):
+    indexer = source_indexer(store, FakeEmbedder())
+    indexer.run(streams=[stream(markdown(10))])
+
+    embedder = FakeEmbedder()
+    result = source_indexer(store, embedder).run(streams=[stream(markdown(9, changed=3))])
+
+    assert (result["added"], result["removed"], result["unchanged"]) == (1, 2, 8)
+    assert sum(embedder.batches) == 1
+    assert sorted(doc.meta["page"] for doc in store.filter_documents()) == [f"Page {page}" for page in range(9)]
+    assert "changed" in store.filter_documents(
+        filters={"field": "meta.page", "operator": "==", "value": "Page 3"})[0].content
+
+
+def test_ensure_index_retries_a_failed_build(store, monkeypatch):
+    runs = []
+
+    def run_indexing(force: bool = False):
+        runs.append(force)
+        if len(runs) == 1:
+            raise RuntimeError("embedder unavailable")
+        if len(runs) == 3:
+            store.write_documents([Document(content="chunk", embedding=[1.0, 0.0, 0.0, 0.0])])
+
+    monkeypatch.setattr(indexing, "run_indexing", run_indexing)
+    monkeypatch.setattr(indexing, "_last_check", 0.0)
+    with pytest.raises(RuntimeError):
+        indexing.ensure_index()
+    # The sources could not be fetched, the index is still empty
+    indexing.ensure_index()
+    indexing.ensure_index()
+    indexing.ensure_index()
+    assert runs == [True, True, True]
+
+
+def test_chunk_differ_counts_new_unchanged_and_stale_chunks(store):
+    differ = ChunkDiffer()
+    meta = {"url": URL, "version": "v20", "section_id": "s", "etag": '"1"'}
+    first = differ.run(documents=[Document(content=text, meta=meta) for text in ["a", "b", "b", "c"]])
+    assert (len(first["documents"]), first["stale_ids"], first["unchanged"]) == (3, [], 0)
+    # The chunk id doesn't depend on the document level meta
+    assert "etag" not in first["documents"][0].meta
+    store.write_documents([Document(id=doc.id, content=doc.content, meta=doc.meta, embedding=[1.0, 0.0, 0.0, 0.0])
+                           for doc in first["documents"]])
+
+    second = differ.run(documents=[Document(content=text, meta={**meta, "etag": '"2"'}) for text in ["a", "c", "d"]])
+    assert [doc.content for doc in second["documents"]] == ["d"]
+    assert second["unchanged"] == 2
+    assert second["stale_ids"] == [first["documents"][1].id]
+
+    # Another version of the same chunk is another chunk
+    other_version = differ.run(documents=[Document(content="a", meta={**meta, "version": "v17"})])
+    assert len(other_version["documents"]) == 1
+
+
+class FakeResponse:
+    def __init__(self, status_code: int, content: bytes = b"", headers: dict = None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+
+
+def test_fetcher_only_returns_changed_sources(tmp_path, monkeypatch):
+    monkeypatch.setattr(indexing, "INDEX_STATE_FILE", str(tmp_path / "index_state.json"))
+    local = tmp_path / "v17.txt"
+    local.write_text("# v17")
+    sources = {"v20": URL, "v17": str(local)}
+    sent = []
+    responses = {}
+
+    def get(url, headers, timeout):
+        sent.append(headers)
+        return responses[url]
+
+    monkeypatch.setattr(indexing.requests, "get", get)
+    fetcher = indexing.DocSourcesFetcher(sources)
+
+    responses[URL] = FakeResponse(200, b"# v20", {"ETag": '"1"'})
+    fetched = fetcher.run()
+    assert [stream.meta["version"] for stream in fetched["streams"]] == ["v20", "v17"]
+    indexing.save_index_state({stream.meta["url"]: stream.meta for stream in fetched["streams"]})
+
+    # Not modified, and the file's mtime didn't change
+    responses[URL] = FakeResponse(304)
+    assert fetcher.run() == {"streams": [], "unchanged": {}, "failed": []}
+    assert sent[-1] == {"If-None-Match": '"1"'}
+
+    # New validators for the same body only refresh the validators
+    responses[URL] = FakeResponse(200, b"# v20", {"ETag": '"2"'})
+    fetched = fetcher.run()
+    assert fetched["streams"] == [] and fetched["unchanged"][URL]["etag"] == '"2"'
+
+    responses[URL] = FakeResponse(500)
+    assert fetcher.run()["failed"] == [URL]
+    # Forced, every source is read again
+    responses[URL] = FakeResponse(200, b"# v20", {"ETag": '"2"'})
+    assert len(fetcher.run(force=True)["streams"]) == 2
@@ -0,0 +1,71 @@
+from haystack.dataclasses.byte_stream import ByteStream
+from tools.markdown_splitter import MarkdownSectionSplitter, iter_blocks
+
+MARKDOWN = """# Components
+
+Intro of the components.
+
+## Inputs
+
+Use `input()` to declare an input.
+
+```bash
+# not a heading
+ng generate component
+```
+
+## Outputs
+
+Use `output()`.
+
+## Inputs
+
+A repeated heading.
+"""
+
+
+def stream(text: str = MARKDOWN) -> ByteStream:
+    return ByteStream(data=text.encode("utf-8"), meta={"url": "https://angular.dev/llms.txt", "version": "v20"})
+
+
+def test_iter_blocks_keeps_code_fences_whole():
+    blocks = list(iter_blocks(iter(MARKDOWN.splitlines())))
+    assert ("heading", 1, "Components") in blocks
+    code = [text for kind, text, *_ in blocks if kind == "code"]
+    assert code == ["```bash\n# not a heading\nng generate component\n```"]
+    assert ("heading", 1, "not a heading") not in blocks
+
+
+def test_chunks_carry_their_heading_and_section():
+    result = MarkdownSectionSplitter(max_words=250).run(sources=[stream()])
+    documents, sections = result["documents"], result["sections"]
+
+    assert [doc.meta["heading_path"] for doc in documents] == \
+        ["Components", "Components > Inputs", "Components > Outputs", "Components > Inputs"]
+    inputs = documents[1]
+    assert inputs.content.startswith("## Inputs")
+    assert "# not a heading" in inputs.content
+    assert inputs.meta["page"] == "Components"
+    assert inputs.meta["version"] == "v20"
+
+    by_id = {section["id"]: section for section in sections}
+    assert [doc.meta["section_id"] for doc in documents] == [section["id"] for section in sections]
+    # Repeated headings are different sections of the same parent
+    assert documents[1].meta["section_id"] != documents[3].meta["section_id"]
+    assert by_id[inputs.meta["section_id"]]["parent"] == documents[0].meta["section_id"]
+    assert by_id[documents[0].meta["section_id"]]["parent"] is None
+
+
+def test_long_sections_are_split_without_cutting_code():
+    code = "\n".join(f"const line{i} = {i};" for i in range(40))
+    text = "# Page\n\n" + "\n\n".join(f"Paragraph {i} " + "word " * 20 for i in range(5)) + \
+        f"\n\n```ts\n{code}\n```\n"
+    documents = MarkdownSectionSplitter(max_words=50).run(sources=[stream(text)])["documents"]
+
+    assert len(documents) > 3
+    assert [doc.meta["chunk_index"] for doc in documents] == list(range(len(documents)))
+    for doc in documents:
+        assert doc.content.startswith("# Page")
+        # Every piece of the code block gets its fences back
+        assert doc.content.count("```") % 2 == 0
+    assert sum(doc.content.count("const line") for doc in documents) == 40
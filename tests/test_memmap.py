@@ -0,0 +1,93 @@
+import os
+from typing import List
+import numpy as np
+import pytest
+from haystack.dataclasses import Document
+from stores.memmap import MemmapDocumentStore, equality_conditions
+
+
+def test_equality_conditions():
+    assert equality_conditions({"field": "meta.version", "operator": "==", "value": "v20"}) == [("version", ["v20"])]
+    assert equality_conditions({"field": "meta.version", "operator": "in", "value": ("v17", "v20")}) == \
+        [("version", ["v17", "v20"])]
+    assert equality_conditions({"operator": "AND", "conditions": [
+        {"field": "meta.version", "operator": "==", "value": "v20"},
+        {"field": "meta.page", "operator": "in", "value": ["Forms"]}
+    ]}) == [("version", ["v20"]), ("page", ["Forms"])]
+
+
+@pytest.mark.parametrize("filters", [
+    {"field": "meta.version", "operator": "!=", "value": "v20"},
+    {"field": "content", "operator": "==", "value": "text"},
+    {"operator": "OR", "conditions": [{"field": "meta.version", "operator": "==", "value": "v20"}]},
+    {"operator": "AND", "conditions": [
+        {"field": "meta.version", "operator": "==", "value": "v20"},
+        {"field": "meta.chunk_index", "operator": ">", "value": 1}
+    ]},
+])
+def test_equality_conditions_of_other_filters(filters):
+    assert equality_conditions(filters) is None
+
+
+def test_filtered_retrieval_only_returns_the_matching_rows(tmp_path):
+    store = MemmapDocumentStore(str(tmp_path / "store"), embedding_dimension=4)
+    rng = np.random.default_rng(0)
+    documents = [Document(content=f"signals chunk {i}", embedding=rng.normal(size=4).tolist(),
+                          meta={"version": ["v17", "v20"][i % 2], "chunk_index": i}) for i in range(20)]
+    store.write_documents(documents)
+    query = rng.normal(size=4).tolist()
+
+    equality = {"field": "meta.version", "operator": "==", "value": "v17"}
+    # The same filter, evaluated document by document
+    generic = {"operator": "OR", "conditions": [equality]}
+    indexed = store.embedding_retrieval(query, filters=equality, top_k=5)
+    assert [doc.id for doc in indexed] == [doc.id for doc in store.embedding_retrieval(query, generic, top_k=5)]
+    assert len(indexed) == 5 and all(doc.meta["version"] == "v17" for doc in indexed)
+
+    assert store.embedding_retrieval(query, {"field": "meta.version", "operator": "==", "value": "v1"}) == []
+    keyword = store.keyword_retrieval("signals", filters=equality, top_k=20)
+    assert len(keyword) == 10 and all(doc.meta["version"] == "v17" for doc in keyword)
+
+
+def write_vectors(store: MemmapDocumentStore, count: int, seed: int = 0) -> List[Document]:
+    rng = np.random.default_rng(seed)
+    documents = [Document(content=f"chunk {i}", embedding=rng.normal(size=4).tolist(), meta={"chunk_index": i})
+                 for i in range(count)]
+    store.write_documents(documents)
+    return documents
+
+
+@pytest.mark.parametrize("dtype", ["float16", "int8"])
+def test_reopening_with_another_dtype_reencodes_the_matrix(tmp_path, dtype):
+    path = str(tmp_path / "store")
+    documents = write_vectors(MemmapDocumentStore(path, embedding_dimension=4), 30)
+
+    store = MemmapDocumentStore(path, embedding_dimension=4, dtype=dtype)
+    assert sorted(os.listdir(path)) == ["documents.sqlite", f"embeddings.{dtype}.npy"]
+    for document in documents[:5]:
+        best = store.embedding_retrieval(document.embedding, top_k=1)[0]
+        assert best.id == document.id
+        assert best.score == pytest.approx(1.0, abs=0.02)
+        assert np.allclose(best.embedding, document.embedding, atol=0.05)
+
+
+def test_another_embedding_dimension_is_refused(tmp_path):
+    path = str(tmp_path / "store")
+    write_vectors(MemmapDocumentStore(path, embedding_dimension=4), 3)
+    with pytest.raises(ValueError, match="4-dimensional"):
+        MemmapDocumentStore(path, embedding_dimension=8)
+
+
+def test_reads_see_the_writes_of_another_process(tmp_path):
+    path = str(tmp_path / "store")
+    reader = MemmapDocumentStore(path, embedding_dimension=4)
+    # index.py in another process: it writes past the first allocation and deletes (swapping rows)
+    writer = MemmapDocumentStore(path, embedding_dimension=4)
+    documents = write_vectors(writer, 1100)
+    writer.delete_documents([documents[0].id, documents[10].id])
+
+    assert reader.count_documents() == 1098
+    for document in [documents[1], documents[-1], documents[-2]]:
+        assert reader.embedding_retrieval(document.embedding, top_k=1)[0].id == document.id
+    assert documents[0].id not in {doc.id for doc in reader.embedding_retrieval(documents[0].embedding, top_k=5)}
+    assert len(reader.keyword_retrieval("chunk", top_k=2000)) == 1098
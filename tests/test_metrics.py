@@ -0,0 +1,76 @@
+import json
+import pytest
+from haystack import tracing
+from haystack.dataclasses import ChatMessage
+from haystack.tools import Tool
+from instrumentation import tracer as tracer_module
+from instrumentation.summary import compare_modes, load_records, percentile, summarize
+from instrumentation.tracer import JsonlMetricsSink, MetricsTracer, trace_tool
+
+
+@pytest.fixture
+def metrics(tmp_path, monkeypatch):
+    path = str(tmp_path / "metrics.jsonl")
+    metrics_tracer = MetricsTracer(tracing.tracer.actual_tracer, JsonlMetricsSink(path))
+    monkeypatch.setattr(tracing.tracer, "actual_tracer", metrics_tracer)
+    return metrics_tracer, path
+
+
+def component(metrics_tracer: MetricsTracer, name: str, **tags):
+    return metrics_tracer.trace("haystack.component.run", tags={"haystack.component.name": name, **tags})
+
+
+def test_records_paths_tokens_and_errors(metrics):
+    metrics_tracer, path = metrics
+    with metrics_tracer.trace("haystack.pipeline.run"):
+        with component(metrics_tracer, "generator", **{"haystack.component.visits": 3}) as span:
+            reply = ChatMessage.from_assistant("Hi", meta={"usage": {"prompt_tokens": 12, "completion_tokens": 5}})
+            span.set_content_tag("haystack.component.output", {"replies": [reply]})
+        with pytest.raises(RuntimeError):
+            with component(metrics_tracer, "writer"):
+                raise RuntimeError("boom")
+
+    records = {record["path"]: record for record in load_records(path)}
+    assert set(records) == {"pipeline", "pipeline/generator", "pipeline/writer"}
+    generator = records["pipeline/generator"]
+    assert (generator["prompt_tokens"], generator["completion_tokens"], generator["retries"]) == (12, 5, 2)
+    assert records["pipeline/writer"]["error"] == "RuntimeError"
+    assert len({record["run_id"] for record in records.values()}) == 1
+
+
+def test_traced_tools_get_their_own_span(metrics):
+    metrics_tracer, path = metrics
+    tool = trace_tool(Tool(name="documentation_tool", description="docs", function=lambda query: query,
+                           parameters={"type": "object", "properties": {"query": {"type": "string"}}}))
+    assert trace_tool(tool) is tool
+    with metrics_tracer.trace("haystack.pipeline.run"):
+        with component(metrics_tracer, "tool_invoker"):
+            with tracer_module.tools_submitted():
+                assert tool.invoke(query="forms") == "forms"
+
+    record = [record for record in load_records(path) if record["name"] == "documentation_tool"][0]
+    assert record["path"] == "pipeline/tool_invoker/documentation_tool"
+    assert record["queue_wait_ms"] >= 0
+
+
+def test_summary_and_mode_comparison(tmp_path):
+    def record(path: str, wall_ms: float, mode: str = None, run_id: str = "1") -> dict:
+        return {"ts": 1.0, "run_id": run_id, "path": path, "type": "component", "wall_ms": wall_ms,
+                "queue_wait_ms": 1.0, "prompt_tokens": 10, "completion_tokens": 2, "retries": 0,
+                "llm_calls_avoided": 0, "mode": mode, "error": None}
+
+    records = [record("pipeline/agent", 100), record("pipeline/agent", 300, run_id="2"),
+               record("pipeline/agent", 50, "planned", run_id="3"), record("pipeline/agent/generator", 20)]
+    path = tmp_path / "metrics.jsonl"
+    path.write_text("".join(json.dumps(entry) + "\n" for entry in records) + '{"cut')
+
+    assert load_records(str(path)) == records
+    assert [entry["run_id"] for entry in load_records(str(path), last_runs=2)] == ["2", "3"]
+    assert percentile([1, 2, 3, 4], 50) == 2 and percentile([], 95) == 0.0
+
+    rows = summarize(records)
+    assert [(row["path"], row["count"], row["total_ms"]) for row in rows] == \
+        [("pipeline/agent", 3, 450), ("pipeline/agent/generator", 1, 20)]
+    comparison = compare_modes(records)
+    assert comparison["agent"]["p50_ms"] == 100 and comparison["planned"]["count"] == 1
+    assert comparison["saved_p50_ms"] == 50
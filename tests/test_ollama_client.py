@@ -0,0 +1,89 @@
+import time
+import threading
+from types import SimpleNamespace
+import pytest
+from models.ollama_client import ModelResidency, ResidentClient, count_chat_calls, share_client
+
+
+def test_residency_waits_for_the_running_model():
+    residency = ModelResidency(resident_models=1, max_switch_wait=60, reload_threshold_ms=500)
+    residency.acquire("coder")
+    # The running model goes ahead, another one waits
+    assert residency.acquire("coder", blocking=False)
+    assert not residency.acquire("thinking", blocking=False)
+
+    started = threading.Event()
+    waiter = threading.Thread(target=lambda: (residency.acquire("thinking"), started.set()))
+    waiter.start()
+    residency.release("coder")
+    assert not started.wait(timeout=0.2)
+    residency.release("coder")
+    assert started.wait(timeout=5)
+    waiter.join()
+    residency.release("thinking")
+
+    stats = residency.stats()
+    assert stats["coder"]["calls"] == 2 and stats["thinking"]["calls"] == 1
+    assert stats["thinking"]["switch_wait_ms"] > 0
+
+
+def test_residency_switches_after_max_switch_wait():
+    residency = ModelResidency(resident_models=1, max_switch_wait=0, reload_threshold_ms=500)
+    residency.acquire("coder")
+    waiter = threading.Thread(target=residency.acquire, args=("thinking",))
+    waiter.start()
+    while not residency._waiting:
+        time.sleep(0.01)
+    # The call waiting for the switch goes first, the running model no longer cuts in
+    assert not residency.acquire("coder", blocking=False)
+    residency.release("coder")
+    waiter.join(timeout=5)
+    assert not waiter.is_alive()
+    residency.release("thinking")
+
+
+def test_record_load_counts_the_loads_over_the_threshold():
+    residency = ModelResidency(resident_models=1, max_switch_wait=1, reload_threshold_ms=500)
+    residency.record_load("coder", 100 * 10 ** 6)
+    residency.record_load("coder", None)
+    assert residency.stats() == {}
+
+    residency.record_load("coder", 2000 * 10 ** 6)
+    assert residency.stats()["coder"]["loads"] == 1
+    assert residency.stats()["coder"]["load_ms"] == pytest.approx(2000)
+
+
+class FakeOllama:
+    def chat(self, model: str, stream: bool = False, **kwargs):
+        if stream:
+            return iter([SimpleNamespace(done=False),
+                         SimpleNamespace(done=True, prompt_eval_count=30, eval_count=10, load_duration=10 ** 9)])
+        return SimpleNamespace(prompt_eval_count=40, eval_count=20, load_duration=0)
+
+    def embed(self, model: str, **kwargs):
+        return SimpleNamespace(embeddings=[[0.1]], load_duration=10 ** 9)
+
+
+def test_resident_client_counts_calls_tokens_and_loads():
+    residency = ModelResidency(resident_models=1, max_switch_wait=1, reload_threshold_ms=500)
+    client = ResidentClient(FakeOllama(), residency)
+
+    with count_chat_calls() as outer:
+        client.chat(model="thinking")
+        with count_chat_calls() as inner:
+            chunks = client.chat(model="thinking", stream=True)
+            # The streamed call holds the model until it's consumed
+            assert not residency.acquire("coder", blocking=False)
+            assert len(list(chunks)) == 2
+    client.embed(model="embedder")
+
+    assert outer == [2, 100] and inner == [1, 40]
+    stats = residency.stats()
+    assert stats["thinking"]["calls"] == 2 and stats["thinking"]["loads"] == 1
+    assert stats["embedder"]["loads"] == 1
+    assert not residency._running
+
+
+def test_share_client_requires_the_integration_clients():
+    with pytest.raises(RuntimeError, match="_client, _async_client"):
+        share_client(SimpleNamespace(_client=None))
@@ -0,0 +1,72 @@
+import os
+import threading
+from uuid import uuid4
+import pytest
+from tools import output_store, write
+from tools.output_store import OutputStore
+
+
+def make_store(tmp_path, batched: bool = False) -> OutputStore:
+    return OutputStore(str(tmp_path / "out"), str(tmp_path / "state"), batched=batched)
+
+
+def test_write_returns_the_same_file_and_refuses_another_content(tmp_path):
+    store = make_store(tmp_path)
+    path = store.write(os.path.join("signals", "SKILL.md"), "content")
+    assert store.write(os.path.join("signals", "SKILL.md"), "content") == path
+    with pytest.raises(FileExistsError):
+        store.write(os.path.join("signals", "SKILL.md"), "other content")
+    with open(path) as f:
+        assert f.read() == "content"
+
+
+def test_write_unique_deduplicates_concurrent_writes(tmp_path):
+    store = make_store(tmp_path)
+    paths = []
+    threads = [threading.Thread(target=lambda: paths.append(
+        store.write_unique(lambda: os.path.join(str(uuid4()), "TODO.md"), "same TODO")))
+        for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(set(paths)) == 1
+    assert len(os.listdir(tmp_path / "out")) == 1
+    other = store.write_unique(lambda: os.path.join(str(uuid4()), "TODO.md"), "another TODO")
+    assert other != paths[0]
+
+    # The removed file is written again
+    os.remove(paths[0])
+    assert store.write_unique(lambda: os.path.join("again", "TODO.md"), "same TODO").endswith("again/TODO.md")
+
+
+def test_failed_write_leaves_no_partial_file(tmp_path, monkeypatch):
+    store = make_store(tmp_path)
+
+    def fail(src, dst):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(output_store.os, "replace", fail)
+    with pytest.raises(OSError):
+        store.write(os.path.join("signals", "SKILL.md"), "content")
+    assert os.listdir(tmp_path / "out" / "signals") == []
+
+
+def test_batched_writes_are_flushed(tmp_path):
+    store = make_store(tmp_path, batched=True)
+    path = store.write("TODO.md", "content")
+    # Visible right away, fsynced on flush
+    assert os.path.exists(path) and store._unsynced == {path}
+    store.flush()
+    assert store._unsynced == set()
+
+
+def test_write_todo_tool(tmp_path, monkeypatch):
+    store = make_store(tmp_path)
+    monkeypatch.setattr(write, "get_todo_store", lambda: store)
+
+    path = write.write_todo.invoke(file_content="- [ ] Step")
+    assert path.startswith(str(tmp_path / "out")) and path.endswith("TODO.md")
+    assert write.write_todo.invoke(file_content="- [ ] Step") == path
+    assert write.write_todo.invoke(file_content="") == ""
@@ -0,0 +1,117 @@
+import threading
+from types import SimpleNamespace
+import pytest
+from haystack.dataclasses import ChatMessage
+from haystack.tools import Tool
+from agents.planned import BudgetExceeded, PlannedOrchestrator, RequestBudget, requested_version
+from models.ollama_client import ModelResidency, ResidentClient, count_chat_calls, guard_chat_calls
+
+
+def test_budget_steps():
+    budget = RequestBudget(max_steps=2, max_tokens=1000, max_seconds=60)
+    budget.take_step()
+    budget.check()
+    with pytest.raises(BudgetExceeded):
+        budget.check(steps=2)
+    budget.take_step()
+    assert budget.remaining_steps() == 0
+    with pytest.raises(BudgetExceeded, match="step budget"):
+        budget.take_step()
+    assert budget.steps == 2
+
+
+def test_budget_concurrent_steps_dont_both_take_the_last_one():
+    budget = RequestBudget(max_steps=5, max_tokens=1000, max_seconds=60)
+    taken = []
+
+    def take():
+        try:
+            budget.take_step()
+            taken.append(1)
+        except BudgetExceeded:
+            pass
+
+    threads = [threading.Thread(target=take) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(taken) == 5 and budget.steps == 5
+
+
+def test_budget_tokens_and_time():
+    budget = RequestBudget(max_steps=10, max_tokens=100, max_seconds=60)
+    budget.charge(1, 99)
+    budget.check()
+    budget.charge(0, 1)
+    with pytest.raises(BudgetExceeded, match="token budget"):
+        budget.check()
+    assert budget.usage()["tokens"] == 100
+
+    # Tokens not charged yet (e.g. a running step)
+    with pytest.raises(BudgetExceeded, match="token budget"):
+        RequestBudget(max_steps=10, max_tokens=100, max_seconds=60).check_usage(150)
+
+    with pytest.raises(BudgetExceeded, match="time budget"):
+        RequestBudget(max_steps=10, max_tokens=100, max_seconds=0).check()
+
+
+class FakeOllama:
+    def __init__(self):
+        self.calls = 0
+
+    def chat(self, model: str, **kwargs):
+        self.calls += 1
+        return SimpleNamespace(prompt_eval_count=40, eval_count=20, load_duration=0)
+
+
+def test_budget_guard_stops_the_chat_calls_once_spent():
+    ollama = FakeOllama()
+    client = ResidentClient(ollama, ModelResidency(resident_models=1, max_switch_wait=1, reload_threshold_ms=500))
+    budget = RequestBudget(max_steps=10, max_tokens=100, max_seconds=60)
+
+    with count_chat_calls() as spent, guard_chat_calls(lambda: budget.check_usage(spent[1])):
+        client.chat(model="model")
+        client.chat(model="model")
+        with pytest.raises(BudgetExceeded):
+            client.chat(model="model")
+
+    assert ollama.calls == 2 and spent == [2, 120]
+    # Outside the block the calls go ahead, and the model was released
+    client.chat(model="other")
+    assert ollama.calls == 3
+
+
+def test_requested_version():
+    versions = ["v20", "v17", "latest"]
+    assert requested_version("Add a form in Angular 17", versions) == "v17"
+    assert requested_version("signals in v20.1", versions) == "v20"
+    assert requested_version("angular 17.2 router", versions) == "v17"
+    assert requested_version("Add a form", versions) is None
+    assert requested_version("the latest API, 17 items", versions) is None
+
+
+def planned_orchestrator(calls: list, **kwargs) -> PlannedOrchestrator:
+    def documentation(query: str, version: str = None):
+        calls.append(("documentation_tool", query, version))
+        return {"relevant_documentation": [], "summary": ""}
+
+    def skills(query: str):
+        return "no skill"
+
+    def todo(query: str, documentation: list = None):
+        return {"messages": []}
+
+    tools = [Tool(name=name, description=name, function=function,
+                  parameters={"type": "object", "properties": {"query": {"type": "string"}}})
+             for name, function in [("documentation_tool", documentation), ("skill_tool", skills), ("todo_tool", todo)]]
+    fallback = SimpleNamespace(run=lambda messages, **state: {"messages": messages})
+    return PlannedOrchestrator(tools=tools, fallback=lambda steps: fallback, max_steps=10, max_tokens=1000,
+                               max_seconds=60, doc_sources={"v20": "v20.txt", "v17": "v17.txt"}, **kwargs)
+
+
+@pytest.mark.parametrize("query, version", [("Add a form", "v20"), ("Add a form in Angular 17", "v17")])
+def test_planned_run_searches_the_requested_or_default_version(query, version):
+    calls = []
+    planned_orchestrator(calls, doc_version="v20").run(messages=[ChatMessage.from_user(query)])
+    assert calls == [("documentation_tool", query, version)]
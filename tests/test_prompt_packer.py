@@ -0,0 +1,39 @@
+from haystack.dataclasses import Document
+from tools.prompt_packer import PromptPacker, compact_whitespace, estimate_tokens
+
+
+def words(start: int, end: int) -> str:
+    return " ".join(f"word{i}" for i in range(start, end))
+
+
+def test_compact_whitespace_keeps_the_indentation():
+    text = "Intro   text  \n\n\n\n```ts\n  const a  =  1;\n```\n"
+    assert compact_whitespace(text) == "Intro text\n\n```ts\n  const a = 1;\n```"
+
+
+def test_estimate_tokens_counts_long_words_more():
+    assert estimate_tokens("a b") == 2
+    assert estimate_tokens("provideRouter()") == 5
+
+
+def test_duplicates_and_overlaps_are_dropped_best_score_first():
+    documents = [
+        Document(id="second", content=words(20, 60), score=0.5),
+        Document(id="first", content=words(0, 30), score=0.9),
+        Document(id="copy", content=words(0, 30).replace(" ", "  "), score=0.4),
+    ]
+    packed = PromptPacker("test", token_budget=1000).run(documents=documents)["documents"]
+    assert [doc.id for doc in packed] == ["first", "second"]
+    # The 10 words the splitter repeated at the beginning of the next chunk are only pasted once
+    assert packed[1].content == words(30, 60)
+
+
+def test_documents_are_cut_to_the_token_budget():
+    documents = [Document(id=str(i), content=words(i * 100, i * 100 + 100), score=1.0 - i / 10) for i in range(3)]
+    budget = estimate_tokens(words(0, 100)) + 100
+    packed = PromptPacker("test", token_budget=budget).run(documents=documents)["documents"]
+
+    assert [doc.id for doc in packed] == ["0", "1"]
+    assert packed[1].content.endswith(" ...")
+    assert sum(estimate_tokens(doc.content) for doc in packed) <= budget + estimate_tokens(" ...")
+    assert PromptPacker("test", token_budget=10).run(documents=None)["documents"] == []
@@ -0,0 +1,143 @@
+import threading
+import time
+import pytest
+from haystack.dataclasses import ChatMessage
+from agents import request_cache
+from agents.request_cache import RequestCache, SingleFlight, run_cached
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = RequestCache(str(tmp_path / "requests.sqlite"), ttl=3600, max_entries=100)
+    monkeypatch.setattr(request_cache, "REQUEST_CACHE_ENABLED", True)
+    monkeypatch.setattr(request_cache, "get_request_cache", lambda: cache)
+    monkeypatch.setattr(request_cache, "get_config_version", lambda: "config")
+    monkeypatch.setattr(request_cache, "index_versions", lambda: {"docs": "1", "skills": "1"})
+    # Every test gets its own flights
+    monkeypatch.setattr(request_cache, "_in_flight", SingleFlight())
+    return cache
+
+
+def todo_messages(tmp_path, name: str = "TODO.md") -> list:
+    todo_path = tmp_path / name
+    todo_path.write_text("- [ ] step")
+    return [ChatMessage.from_user("Add a login form"), ChatMessage.from_assistant(f"Written to {todo_path}")]
+
+
+def wait_for(condition, timeout: float = 5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_single_flight_has_one_leader_until_finished():
+    flights = SingleFlight()
+    future, leader = flights.join("key")
+    same_future, follower_leads = flights.join("key")
+    assert leader and not follower_leads
+    assert same_future is future
+    _, other_leads = flights.join("other")
+    assert other_leads
+
+    flights.finish("key")
+    new_future, leads_again = flights.join("key")
+    assert leads_again and new_future is not future
+
+
+def run_concurrently(query: str, run, followers: int, cache: RequestCache) -> tuple:
+    results, errors = [], []
+
+    def call():
+        try:
+            results.append(run_cached(query, run))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(followers + 1)]
+    for thread in threads:
+        thread.start()
+    wait_for(lambda: cache.coalesced == followers)
+    return threads, results, errors
+
+
+def test_run_cached_runs_identical_requests_in_flight_once(cache, tmp_path):
+    release = threading.Event()
+    calls = []
+    messages = todo_messages(tmp_path)
+
+    def run():
+        calls.append(1)
+        release.wait(5)
+        return messages
+
+    # Normalized queries are the same request
+    threads, results, errors = run_concurrently("Add a login form.", run, 3, cache)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1 and not errors
+    assert len(results) == 4
+    assert all(result is results[0] for result in results)
+    assert results[0]["todo_path"] == str(tmp_path / "TODO.md")
+
+    # Answered from the cache afterwards
+    assert run_cached("add a  login form", run)["todo_path"] == results[0]["todo_path"]
+    assert len(calls) == 1
+    assert cache.stats()["hits"] == 1
+
+
+def test_run_cached_followers_get_the_exception_and_the_flight_ends(cache, tmp_path):
+    release = threading.Event()
+    calls = []
+
+    def failing_run():
+        calls.append(1)
+        release.wait(5)
+        raise RuntimeError("ollama is down")
+
+    threads, results, errors = run_concurrently("Add a login form", failing_run, 2, cache)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1 and not results
+    assert len(errors) == 3
+    assert all(isinstance(error, RuntimeError) for error in errors)
+
+    # The failed flight doesn't stay in flight, nor in the cache: the next request runs
+    result = run_cached("Add a login form", lambda: todo_messages(tmp_path))
+    assert result["todo_path"] == str(tmp_path / "TODO.md")
+
+
+def test_run_cached_doesnt_store_requests_without_todo(cache):
+    calls = []
+
+    def run():
+        calls.append(1)
+        return [ChatMessage.from_assistant("The request was stopped.")]
+
+    assert run_cached("Add a login form", run)["todo_path"] == ""
+    run_cached("Add a login form", run)
+    assert len(calls) == 2
+
+
+def test_request_cache_expires_entries_of_other_versions_on_lookup(cache, tmp_path):
+    old = {"todo_path": str(tmp_path / "TODO.md"), "messages": todo_messages(tmp_path)}
+    new = {"todo_path": str(tmp_path / "NEW_TODO.md"), "messages": todo_messages(tmp_path, "NEW_TODO.md")}
+    cache.put("old", "old query", old, {"docs": "1"})
+    # Writing an entry of other versions keeps the existing ones
+    cache.put("new", "new query", new, {"docs": "2"})
+    assert cache.get("old", {"docs": "1"})["todo_path"] == old["todo_path"]
+
+    assert cache.get("old", {"docs": "2"}) is None
+    assert cache.get("old", {"docs": "1"}) is None
+    assert cache.get("new", {"docs": "2"})["todo_path"] == new["todo_path"]
+
+
+def test_request_cache_drops_entries_whose_todo_is_gone(cache, tmp_path):
+    messages = todo_messages(tmp_path)
+    cache.put("key", "query", {"todo_path": str(tmp_path / "TODO.md"), "messages": messages}, {})
+    (tmp_path / "TODO.md").unlink()
+    assert cache.get("key", {}) is None
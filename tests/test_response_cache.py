@@ -0,0 +1,60 @@
+import time
+from haystack.dataclasses import ChatMessage, Document
+from tools.response_cache import ResponseCacheChecker, ResponseCacheWriter, SemanticResponseCache
+
+
+def response_cache(tmp_path, **kwargs) -> SemanticResponseCache:
+    settings = {"model": "model", "threshold": 0.9, "ttl": 3600, "max_entries": 100, **kwargs}
+    return SemanticResponseCache(str(tmp_path / "responses.sqlite"), **settings)
+
+
+def test_reuses_a_summary_of_a_similar_query_with_the_same_chunks(tmp_path):
+    cache = response_cache(tmp_path)
+    cache.store([1.0, 0.0], ["a", "b"], "summary")
+
+    # Same chunks in another order, query within the threshold
+    assert cache.lookup([1.0, 0.3], ["b", "a"]) == "summary"
+    # Below the threshold (cos = 0.8)
+    assert cache.lookup([0.8, 0.6], ["a", "b"]) is None
+    # Other chunks
+    assert cache.lookup([1.0, 0.0], ["a", "c"]) is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+
+
+def test_summaries_are_keyed_by_model(tmp_path):
+    response_cache(tmp_path, model="small").store([1.0, 0.0], ["a"], "summary")
+    assert response_cache(tmp_path, model="big").lookup([1.0, 0.0], ["a"]) is None
+
+
+def test_expired_and_least_recently_used_entries_are_dropped(tmp_path, monkeypatch):
+    clock = [1000.0]
+
+    def tick() -> float:
+        clock[0] += 1
+        return clock[0]
+
+    monkeypatch.setattr(time, "time", tick)
+    cache = response_cache(tmp_path, ttl=60, max_entries=2)
+    cache.store([1.0, 0.0], ["old"], "old")
+    clock[0] += 120
+    assert cache.lookup([1.0, 0.0], ["old"]) is None
+
+    cache.store([1.0, 0.0], ["a"], "a")
+    cache.store([1.0, 0.0], ["b"], "b")
+    # "a" is used again, "b" is evicted by the third entry
+    assert cache.lookup([1.0, 0.0], ["a"]) == "a"
+    cache.store([1.0, 0.0], ["c"], "c")
+    assert [cache.lookup([1.0, 0.0], [doc_id]) for doc_id in ["a", "b", "c"]] == ["a", None, "c"]
+
+
+def test_checker_and_writer_close_the_loop(tmp_path):
+    cache = response_cache(tmp_path)
+    documents = [Document(id="a", content="chunk")]
+    checker, writer = ResponseCacheChecker(cache), ResponseCacheWriter(cache)
+
+    miss = checker.run(documents=documents, query_embedding=[1.0, 0.0])
+    assert "replies" not in miss
+    writer.run(replies=[ChatMessage.from_assistant("summary")], **miss)
+
+    hit = checker.run(documents=documents, query_embedding=[1.0, 0.05])
+    assert hit["replies"][0].text == "summary" and hit["replies"][0].meta["cache"] == "hit"
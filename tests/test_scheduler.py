@@ -0,0 +1,98 @@
+import time
+from typing import Any, Dict, List, Optional
+from haystack import component
+from haystack.dataclasses import ChatMessage, ToolCall
+from haystack.tools import Tool
+from agents.scheduler import ScheduledAgent
+
+SCHEMA = {"type": "object", "properties": {"query": {"type": "string"}}}
+
+
+@component
+class ScriptedGenerator:
+    """
+    Replies with the tool calls of `turns`, one turn per call, then with a text.
+    """
+
+    def __init__(self, turns: List[List[ToolCall]]):
+        self.turns = turns
+
+    @component.output_types(replies=List[ChatMessage])
+    def run(self, messages: List[ChatMessage], tools: Optional[Any] = None, **kwargs) -> Dict[str, Any]:
+        turn = sum(1 for message in messages if message.is_from("assistant"))
+        if turn < len(self.turns):
+            return {"replies": [ChatMessage.from_assistant(tool_calls=self.turns[turn])]}
+        return {"replies": [ChatMessage.from_assistant("done")]}
+
+
+def create_agent(turns: List[List[ToolCall]], calls: list) -> ScheduledAgent:
+    def fetch(query: str):
+        calls.append(("fetch start", query))
+        time.sleep(0.2)
+        calls.append(("fetch end", query))
+        return {"documents": [f"doc about {query}"]}
+
+    def plan(query: str, documentation: Optional[list] = None):
+        calls.append(("plan", list(documentation or [])))
+        return f"plan for {query}"
+
+    def skills(query: str):
+        calls.append(("skills start", query))
+        time.sleep(0.2)
+        calls.append(("skills end", query))
+        return "skills"
+
+    tools = [
+        Tool(name="fetch", description="Fetches", parameters=SCHEMA, function=fetch,
+             outputs_to_state={"documentation": {"source": "documents"}}),
+        Tool(name="plan", description="Plans", parameters=SCHEMA, function=plan,
+             inputs_from_state={"documentation": "documentation"}),
+        Tool(name="skills", description="Skills", parameters=SCHEMA, function=skills)
+    ]
+    agent = ScheduledAgent(chat_generator=ScriptedGenerator(turns), tools=tools, exit_conditions=["text"],
+                           state_schema={"documentation": {"type": list}})
+    agent.warm_up()
+    return agent
+
+
+def test_a_call_waits_for_the_calls_of_its_turn_writing_what_it_reads():
+    calls = []
+    # The reader comes first in the turn
+    turn = [ToolCall(tool_name="plan", arguments={"query": "forms"}),
+            ToolCall(tool_name="fetch", arguments={"query": "forms"}),
+            ToolCall(tool_name="fetch", arguments={"query": "validators"})]
+    result = create_agent([turn], calls).run(messages=[ChatMessage.from_user("Add a form")])
+
+    plan = [call for call in calls if call[0] == "plan"]
+    assert plan == [("plan", ["doc about forms", "doc about validators"])]
+    assert calls.index(plan[0]) > max(calls.index(("fetch end", "forms")), calls.index(("fetch end", "validators")))
+    # The State gets the outputs once, and the tool messages keep the order of the calls
+    assert result["documentation"] == ["doc about forms", "doc about validators"]
+    assert [message.tool_call_result.origin.tool_name for message in result["messages"]
+            if message.tool_call_result] == ["plan", "fetch", "fetch"]
+
+
+def test_independent_calls_run_concurrently():
+    calls = []
+    turn = [ToolCall(tool_name="fetch", arguments={"query": "forms"}),
+            ToolCall(tool_name="skills", arguments={"query": "forms"})]
+    create_agent([turn], calls).run(messages=[ChatMessage.from_user("Add a form")])
+    starts = [calls.index(("fetch start", "forms")), calls.index(("skills start", "forms"))]
+    ends = [calls.index(("fetch end", "forms")), calls.index(("skills end", "forms"))]
+    assert max(starts) < min(ends)
+
+
+def test_a_call_of_a_later_turn_reads_the_state():
+    calls = []
+    turns = [[ToolCall(tool_name="fetch", arguments={"query": "forms"})],
+             [ToolCall(tool_name="plan", arguments={"query": "forms"})]]
+    create_agent(turns, calls).run(messages=[ChatMessage.from_user("Add a form")])
+    assert ("plan", ["doc about forms"]) in calls
+
+
+def test_the_agent_keeps_its_own_tools():
+    agent = create_agent([], [])
+    result = agent.run(messages=[ChatMessage.from_user("Add a form")])
+    assert result["last_message"].text == "done"
+    assert [tool.name for tool in agent.tools] == ["fetch", "plan", "skills"]
+    assert agent.tools[1].inputs_from_state == {"documentation": "documentation"}
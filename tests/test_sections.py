@@ -0,0 +1,81 @@
+from haystack.dataclasses import Document
+from haystack.dataclasses.byte_stream import ByteStream
+from stores.sections import SectionIndex
+from tools.markdown_splitter import MarkdownSectionSplitter
+
+MARKDOWN = """# Signals
+
+Signals are reactive values.
+
+## Computed
+
+A computed signal derives its value from other signals.
+
+## Effects
+
+An effect runs when the signals it reads change.
+
+# Forms
+
+""" + "Reactive forms are built from FormControl and FormGroup. " * 20 + """
+
+## Validators
+
+Validators check the value of a control.
+"""
+
+
+def index(tmp_path) -> tuple:
+    result = MarkdownSectionSplitter(max_words=250).run(
+        sources=[ByteStream(data=MARKDOWN.encode("utf-8"), meta={"url": "llms.txt"})])
+    sections = SectionIndex(str(tmp_path / "sections.json"))
+    sections.save("llms.txt", result["sections"])
+    chunks = {doc.meta["heading_path"]: doc for doc in result["documents"]}
+    return sections, chunks
+
+
+def test_expand_to_the_biggest_section_within_the_budget(tmp_path):
+    sections, chunks = index(tmp_path)
+    expanded = sections.expand([chunks["Signals > Computed"]], max_words=100)
+
+    assert len(expanded) == 1
+    assert expanded[0].meta["expanded_section_id"] == chunks["Signals"].meta["section_id"]
+    # The parent section followed by its subsections, in document order
+    content = expanded[0].content
+    assert content.index("# Signals") < content.index("## Computed") < content.index("## Effects")
+    assert expanded[0].id == chunks["Signals > Computed"].id
+
+
+def test_expand_drops_chunks_already_included(tmp_path):
+    sections, chunks = index(tmp_path)
+    documents = [chunks["Signals > Effects"], chunks["Signals"], chunks["Signals > Computed"]]
+    expanded = sections.expand(documents, max_words=100)
+    assert [doc.meta["expanded_section_id"] for doc in expanded] == [chunks["Signals"].meta["section_id"]]
+
+    # Within a smaller budget the subsections only get their own section, Signals (with its
+    # subsections) doesn't fit and its chunk is kept
+    expanded = sections.expand(documents, max_words=15)
+    assert [doc.meta.get("expanded_section_id") for doc in expanded] == \
+        [chunks["Signals > Effects"].meta["section_id"], None, chunks["Signals > Computed"].meta["section_id"]]
+    assert expanded[1] is chunks["Signals"]
+
+
+def test_expand_keeps_the_chunks_that_dont_fit(tmp_path):
+    sections, chunks = index(tmp_path)
+    # The parent (Forms) is too big: only Validators itself fits
+    expanded = sections.expand([chunks["Forms > Validators"], chunks["Forms"]], max_words=20)
+    assert expanded[0].meta["expanded_section_id"] == chunks["Forms > Validators"].meta["section_id"]
+    assert expanded[1] is chunks["Forms"]
+
+    unknown = Document(content="no section", meta={"section_id": "missing"})
+    without_section = Document(content="no section")
+    assert sections.expand([unknown, without_section], max_words=100) == [unknown, without_section]
+
+
+def test_expand_reads_the_sections_saved_again(tmp_path):
+    sections, chunks = index(tmp_path)
+    assert "Computed" in sections.expand([chunks["Signals"]], max_words=100)[0].content
+
+    sections.save("llms.txt", [{"id": chunks["Signals"].meta["section_id"], "url": "llms.txt", "parent": None,
+                                "heading_path": ["Signals"], "text": "# Signals\n\nRewritten."}])
+    assert sections.expand([chunks["Signals"]], max_words=100)[0].content == "# Signals\n\nRewritten."
@@ -0,0 +1,68 @@
+from types import SimpleNamespace
+import pytest
+from haystack.dataclasses import ChatMessage
+from agents import skills
+from agents.skills import FixedLinkContentFetcher
+from tools.skill_definition_cache import SkillDefinitionCacheChecker, SkillDefinitionStore
+
+
+class FakeSite:
+    def __init__(self):
+        self.requests = []
+
+    def get(self, url: str, headers: dict, timeout: int):
+        self.requests.append((url, headers))
+        if headers.get("If-None-Match") == f'"{url}"':
+            return SimpleNamespace(status_code=304, headers={}, content=b"")
+        return SimpleNamespace(status_code=200, content=f"<p>{url}</p>".encode("utf-8"),
+                               headers={"ETag": f'"{url}"', "Content-Type": "text/html; charset=utf-8"})
+
+
+@pytest.fixture
+def site(monkeypatch):
+    site = FakeSite()
+    monkeypatch.setattr(skills.requests, "get", site.get)
+    monkeypatch.setattr(skills, "SKILLS_DEFINITION_OFFLINE", False)
+    return site
+
+
+def summarize(store: SkillDefinitionStore, streams: list) -> list:
+    # The definition pipeline: cache check, then the summary is stored with the pages
+    checked = SkillDefinitionCacheChecker(store).run(streams=streams)
+    if "key" in checked:
+        store.put(checked["key"], "summary", checked["streams"])
+        return [ChatMessage.from_assistant("summary")]
+    return checked["replies"]
+
+
+def test_pages_are_fetched_once_per_ttl_then_revalidated(tmp_path, site, monkeypatch):
+    store = SkillDefinitionStore(str(tmp_path), model="model")
+    fetcher = FixedLinkContentFetcher(store, ttl=3600)
+
+    streams = fetcher.run()["streams"]
+    assert [stream.mime_type for stream in streams] == ["text/html", "text/html"]
+    summarize(store, streams)
+    assert len(site.requests) == 2
+
+    # Within the TTL the snapshot is used without a request
+    assert fetcher.run()["streams"] == []
+    assert summarize(store, [])[0].meta["cache"] == "hit"
+    assert len(site.requests) == 2
+
+    # Once it's old, the pages are requested with their ETag and the snapshot's copies are returned
+    monkeypatch.setattr(skills.time, "time", lambda: 10 ** 10)
+    revalidated = fetcher.run()["streams"]
+    assert [headers for _, headers in site.requests[2:]] == [{"If-None-Match": f'"{url}"'} for url in fetcher.URLS]
+    assert [stream.data for stream in revalidated] == [stream.data for stream in streams]
+    assert summarize(store, revalidated)[0].meta["cache"] == "hit"
+    # The new fetch time is stored, the next call doesn't request anything
+    assert fetcher.run()["streams"] == []
+    assert len(site.requests) == 4
+
+
+def test_pages_without_a_summary_are_fetched_unconditionally(tmp_path, site):
+    store = SkillDefinitionStore(str(tmp_path), model="model")
+    FixedLinkContentFetcher(store, ttl=3600).run()
+    # The summary was never stored (e.g. the summarizer failed)
+    assert len(FixedLinkContentFetcher(store, ttl=3600).run()["streams"]) == 2
+    assert all(headers == {} for _, headers in site.requests)
@@ -0,0 +1,70 @@
+import os
+from tools.skills_index import SkillsIndex
+
+
+class FakeTextEmbedder:
+    def __init__(self):
+        self.texts = []
+
+    def run(self, text: str):
+        self.texts.append(text)
+        return {"embedding": [1.0, 0.0] if "signals" in text else [0.0, 1.0]}
+
+
+def write_skill(skills_dir, name: str, description: str) -> str:
+    os.makedirs(skills_dir / name, exist_ok=True)
+    file_path = str(skills_dir / name / "SKILL.md")
+    with open(file_path, "w") as f:
+        f.write(f"---\nname: {name}\ndescription: {description}\n---\n\nBody\n")
+    return file_path
+
+
+def test_only_new_or_modified_skills_are_embedded(tmp_path):
+    skills_dir = tmp_path / "skills"
+    embedder = FakeTextEmbedder()
+    signals = write_skill(skills_dir, "signals", "Angular signals")
+    write_skill(skills_dir, "forms", "Reactive forms")
+    index = SkillsIndex(str(tmp_path / "index.json"), str(skills_dir), embedder, model="embedder")
+
+    assert {skill["name"] for skill in index.skills()} == {"signals", "forms"}
+    version = index.version()
+    assert len(embedder.texts) == 2
+
+    # A new process reads the manifest, the unchanged files aren't parsed nor embedded
+    index = SkillsIndex(str(tmp_path / "index.json"), str(skills_dir), embedder, model="embedder")
+    assert index.version() == version and len(embedder.texts) == 2
+
+    with open(signals, "a") as f:
+        f.write("More\n")
+    assert index.version() != version
+    assert embedder.texts[2:] == ["signals: Angular signals"]
+
+    # Another embedding model rebuilds the manifest
+    SkillsIndex(str(tmp_path / "index.json"), str(skills_dir), embedder, model="other").refresh()
+    assert len(embedder.texts) == 5
+
+
+def test_removed_and_malformed_skills_are_left_out(tmp_path):
+    skills_dir = tmp_path / "skills"
+    forms = write_skill(skills_dir, "forms", "Reactive forms")
+    write_skill(skills_dir, "signals", "Angular signals")
+    os.makedirs(skills_dir / "broken")
+    with open(skills_dir / "broken" / "SKILL.md", "w") as f:
+        f.write("no frontmatter\n")
+    index = SkillsIndex(str(tmp_path / "index.json"), str(skills_dir), FakeTextEmbedder(), model="embedder")
+
+    assert {skill["name"] for skill in index.skills()} == {"forms", "signals"}
+    os.remove(forms)
+    index.update(forms)
+    assert [skill["name"] for skill in index.skills()] == ["signals"]
+
+
+def test_search_ranks_by_similarity(tmp_path):
+    skills_dir = tmp_path / "skills"
+    write_skill(skills_dir, "signals", "Angular signals")
+    write_skill(skills_dir, "forms", "Reactive forms")
+    index = SkillsIndex(str(tmp_path / "index.json"), str(skills_dir), FakeTextEmbedder(), model="embedder")
+
+    results = index.search("computed signals", top_k=1)
+    assert [result["name"] for result in results] == ["signals"]
+    assert results[0]["score"] == 1.0
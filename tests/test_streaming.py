@@ -0,0 +1,59 @@
+import asyncio
+import threading
+import contextvars
+from haystack.dataclasses import StreamingChunk, ToolCall, ToolCallDelta, ToolCallResult
+from models.streaming import PrintSink, QueueSink, StreamEvent, stream_to, tagged_callback, to_event
+
+
+def test_chunks_become_tagged_events():
+    assert to_event("todo", StreamingChunk(content="Hi")) == StreamEvent("todo", "token", "Hi")
+    tool_call = StreamingChunk(content="", index=0, tool_calls=[ToolCallDelta(index=0, tool_name="documentation_tool",
+                                                                      arguments='{"query": "forms"}')])
+    assert to_event("orchestrator", tool_call) == \
+        StreamEvent("orchestrator", "tool_call", 'documentation_tool({"query": "forms"})')
+    result = StreamingChunk(content="", index=0, tool_call_result=ToolCallResult(
+        result="boom", origin=ToolCall(tool_name="todo_tool", arguments={}), error=True))
+    assert to_event("orchestrator", result).text == "todo_tool: error"
+    assert to_event("todo", StreamingChunk(content="")) is None
+
+
+def test_events_reach_the_sinks_of_their_request_only():
+    first, second = [], []
+
+    def request(events: list, text: str):
+        with stream_to(events.append):
+            # A worker thread with the copied context, as the ToolInvoker runs the tools
+            context = contextvars.copy_context()
+            thread = threading.Thread(target=context.run, args=(tagged_callback("documentation"),
+                                                                StreamingChunk(content=text)))
+            thread.start()
+            thread.join()
+
+    threads = [threading.Thread(target=request, args=(events, text))
+               for events, text in [(first, "one"), (second, "two")]]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert first == [StreamEvent("documentation", "token", "one")]
+    assert second == [StreamEvent("documentation", "token", "two")]
+    # Outside a request nothing is streamed
+    tagged_callback("todo")(StreamingChunk(content="lost"))
+
+
+def test_print_sink_starts_a_line_per_emitter(capsys):
+    sink = PrintSink()
+    for event in [StreamEvent("todo", "token", "a"), StreamEvent("todo", "token", "b"),
+                  StreamEvent("coder", "reasoning", "hidden"), StreamEvent("coder", "token", "c")]:
+        sink(event)
+    assert capsys.readouterr().out == "\n[todo] ab\n[coder] c"
+
+
+def test_queue_sink_from_worker_threads():
+    async def consume() -> list:
+        queue = asyncio.Queue()
+        sink = QueueSink(queue, asyncio.get_running_loop())
+        await asyncio.to_thread(sink, StreamEvent("todo", "token", "a"))
+        return [await queue.get()]
+
+    assert asyncio.run(consume()) == [StreamEvent("todo", "token", "a")]
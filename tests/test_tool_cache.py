@@ -0,0 +1,64 @@
+from haystack import Pipeline, component
+from haystack.dataclasses import ChatMessage, Document
+from haystack.tools import PipelineTool
+from agents.angular import TOOL_CACHE_CHECKS
+from tools import indexing
+from tools.indexing import save_index_state
+from tools.tool_cache import ToolResultCache, memoize_tool
+
+
+@component
+class Retriever:
+    def __init__(self):
+        self.calls = 0
+
+    @component.output_types(documents=list)
+    def run(self, query: str):
+        self.calls += 1
+        return {"documents": [Document(content=f"{query} #{self.calls}")]}
+
+
+def documentation_tool() -> tuple:
+    retriever = Retriever()
+    pipeline = Pipeline()
+    pipeline.add_component("retriever", retriever)
+    tool = PipelineTool(pipeline=pipeline, name="documentation_tool", description="Searches the documentation",
+                        input_mapping={"query": ["retriever.query"]},
+                        output_mapping={"retriever.documents": "documents"})
+    return tool, retriever
+
+
+def test_cache_key_normalizes_the_arguments():
+    key = ToolResultCache.key
+    assert key("tool", "1", {"query": "Add  a form\n"}) == key("tool", "1", {"query": "Add a form"})
+    assert key("tool", "1", {"messages": [ChatMessage.from_user("Hi")]}) == \
+        key("tool", "1", {"messages": [ChatMessage.from_user(" Hi ")]})
+    assert key("tool", "1", {"query": "a"}) != key("tool", "2", {"query": "a"})
+    assert key("tool", "1", {"query": "a"}, {"docs": "1"}) != key("tool", "1", {"query": "a"}, {"docs": "2"})
+
+
+def test_memory_entries_are_evicted_least_recently_used_first(tmp_path):
+    cache = ToolResultCache(str(tmp_path / "tools.sqlite"), memory_entries=2, max_entries=2)
+    for key in ["a", "b", "c"]:
+        cache.put(key, "tool", {"value": key}, llm_calls=1)
+    assert list(cache._memory) == ["b", "c"]
+    # Only the max_entries most recently used are kept on disk
+    assert cache.get("a", ttl=60) is None
+    assert cache.get("b", ttl=60) == ({"value": "b"}, 1)
+    assert cache.get("b", ttl=0) is None
+    assert cache.stats()["llm_calls_avoided"] == 1
+
+
+def test_documentation_results_are_invalidated_by_a_reindex(tmp_path, monkeypatch):
+    monkeypatch.setattr(indexing, "INDEX_STATE_FILE", str(tmp_path / "index_state.json"))
+    cache = ToolResultCache(str(tmp_path / "tools.sqlite"), memory_entries=10, max_entries=10)
+    tool, retriever = documentation_tool()
+    tool = memoize_tool(tool, ttl=60, cache=cache, **TOOL_CACHE_CHECKS["documentation_tool"])
+
+    save_index_state({"https://angular.dev/llms-full.txt": {"content_hash": "1"}})
+    first = tool.invoke(query="signals")
+    assert tool.invoke(query=" signals") == first and retriever.calls == 1
+
+    # New content in the index, the same query retrieves again
+    save_index_state({"https://angular.dev/llms-full.txt": {"content_hash": "2"}})
+    assert tool.invoke(query="signals") != first and retriever.calls == 2
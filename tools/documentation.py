@@ -1,163 +1,202 @@
-from typing import List
-from haystack import Pipeline, component
-from haystack.tools import PipelineTool, Tool
-from haystack.components.caching import CacheChecker
-from haystack.dataclasses.byte_stream import ByteStream
-from haystack.components.writers import DocumentWriter
+import time
+import logging
+from haystack import Pipeline, component, tracing
+from haystack.components.joiners import DocumentJoiner, BranchJoiner
+from haystack.tools import PipelineTool
 from haystack.components.builders.chat_prompt_builder import ChatPromptBuilder
-from haystack.dataclasses import ChatMessage
-from haystack.components.converters import MarkdownToDocument
-from haystack.components.preprocessors import DocumentCleaner
-from haystack.components.preprocessors import DocumentSplitter
-from haystack_integrations.document_stores.pgvector import PgvectorDocumentStore
-from haystack_integrations.components.retrievers.pgvector import PgvectorEmbeddingRetriever
-from haystack.components.fetchers.link_content import LinkContentFetcher
-from haystack_integrations.components.generators.ollama import OllamaChatGenerator
-from models.ollama import thinking_generator
-from models.ollama import doc_embedder, text_embedder
-from constants import THINKING_MODEL
+from haystack.dataclasses import ChatMessage, Document
+from typing import Dict, List, Optional
+from models.ollama import create_thinking_generator, get_text_embedder
+from models.streaming import tagged_callback
+from stores.documents import create_embedding_retriever, create_keyword_retriever
+from stores.sections import get_section_index
+from tools.indexing import ensure_index
+from tools.response_cache import SemanticResponseCache, ResponseCacheChecker, ResponseCacheWriter
+from tools.prompt_packer import PromptPacker
+from registry import lazy
+from constants import THINKING_MODEL, RETRIEVER_TOP_K, HYBRID_BRANCH_TOP_K, DOCUMENTATION_TOKEN_BUDGET
+from constants import SECTION_EXPAND_MAX_WORDS, DOC_SOURCES, DEFAULT_DOC_VERSION
+from constants import RESPONSE_CACHE_FILE, RESPONSE_CACHE_THRESHOLD, RESPONSE_CACHE_TTL, RESPONSE_CACHE_MAX_ENTRIES
 from dotenv import load_dotenv
 
 load_dotenv()
 
-# https://angular.dev/llms-full.txt
-# https://angular.dev/assets/context/llms-full.txt
-LLM_URL = "https://angular.dev/assets/context/llms-full.txt"
-
-# Vector store
-document_store = PgvectorDocumentStore(
-    embedding_dimension=768,  # Because of nomic embed text
-    vector_function="cosine_similarity",
-    # recreate_table=True,
-    search_strategy="exact_nearest_neighbor"
-)
-
-# Retrieves documents from the vector store
-retriever = PgvectorEmbeddingRetriever(
-    document_store=document_store,
-    vector_function="cosine_similarity",
-    top_k=2
-)
-
-
-@component
-class AngularLLMFetcher:
-    def __init__(self):
-        self.fetcher = LinkContentFetcher(
-            timeout=3,
-            raise_on_failure=False,
-            retry_attempts=2
-        )
-
-    @component.output_types(streams=List[ByteStream])
-    def run(self):
-        cache = CacheChecker(document_store=document_store,
-                             cache_field="meta.url")
-        results = cache.run(items=[LLM_URL])
-        return {"streams": self.fetcher.run(results["misses"])["streams"]}
+logger = logging.getLogger(__name__)
+
+@lazy
+def get_search_pipeline() -> Pipeline:
+    """
+    Builds and warms up (once per process) the pipeline that embeds the query and retrieves the documents.
+    """
+    search_pipeline = Pipeline(max_runs_per_component=1)
+    search_pipeline.add_component("text_embedder", get_text_embedder())
+    # Retrieves documents from the vector store
+    search_pipeline.add_component(
+        "retriever", create_embedding_retriever(top_k=HYBRID_BRANCH_TOP_K))
+    search_pipeline.connect("text_embedder.embedding",
+                            "retriever.query_embedding")
+    search_pipeline.warm_up()
+    return search_pipeline
+
+
+def version_filters(version: Optional[str], default_version: str = DEFAULT_DOC_VERSION,
+                    sources: Optional[Dict[str, str]] = None) -> dict:
+    """
+    Returns:
+    - The filters of the chunks of `version`, `default_version` when missing or not indexed
+      (one of the `sources`, DOC_SOURCES by default)
+    """
+    if version not in (sources or DOC_SOURCES):
+        if version:
+            logger.warning("Unknown documentation version '%s', searching '%s'", version, default_version)
+        version = default_version
+    return {"field": "meta.version", "operator": "==", "value": version}
 
 
 # def documentation_pipeline(query: str):
 @component
 class DocumentationPipeline:
 
-    @component.output_types(relevant_documentation=list)
-    def run(self, query: str):
-        # Indexing pipeline
-        index_pipeline = Pipeline(max_runs_per_component=1)
-        index_pipeline.add_component("fetcher", AngularLLMFetcher())
-        index_pipeline.add_component(
-            "converter", MarkdownToDocument(store_full_path=True))
-        index_pipeline.add_component("cleaner", DocumentCleaner())
-        index_pipeline.add_component(
-            "splitter",
-            DocumentSplitter(
-                split_by="word",
-                split_length=250,
-                split_overlap=30
-            )
-        )
-        index_pipeline.add_component("embedder", doc_embedder)
-        index_pipeline.add_component(
-            "document_writer",
-            DocumentWriter(document_store=document_store)
-        )
-        index_pipeline.connect("fetcher.streams", "converter.sources")
-        index_pipeline.connect("converter.documents", "cleaner.documents")
-        index_pipeline.connect("cleaner.documents", "splitter.documents")
-        index_pipeline.connect("splitter.documents", "embedder.documents")
-        index_pipeline.connect("embedder.documents",
-                               "document_writer.documents")
-
-        # Searching pipeline
-        search_pipeline = Pipeline(max_runs_per_component=1)
-        search_pipeline.add_component("text_embedder", text_embedder)
-        search_pipeline.add_component("retriever", retriever)
-        search_pipeline.connect("text_embedder.embedding",
-                                "retriever.query_embedding")
-
-        # Execute both pipelines sequentially
-        index_pipeline.run(data={})
-        results = search_pipeline.run({"text_embedder": {"text": query}})
-
-        return {"relevant_documentation": results["retriever"]["documents"]}
-
-
-thinking_generator = OllamaChatGenerator(
-    model=THINKING_MODEL,
-    timeout=3600,
-    generation_kwargs={
-        "temperature": 0.1
-    }
-)
-
-pipeline = Pipeline(max_runs_per_component=1)
-pipeline.add_component("documentation", DocumentationPipeline())
-pipeline.add_component("builder", ChatPromptBuilder(
-    template=[
-        ChatMessage.from_user("""
-        Analyze the following Angular documentation and guidelines, extract the most relevant information 
-        and best practices related to the user request, and return it in clear Markdown format.
+    def __init__(self, default_version: str = DEFAULT_DOC_VERSION, sources: Optional[Dict[str, str]] = None):
+        """
+        Arguments:
+        - default_version: version searched when the query doesn't select one
+        - sources: the indexed versions (DOC_SOURCES by default), init parameters so they're
+          part of the serialized pipeline and of the keys of its memoized results
+        """
+        self.default_version = default_version
+        self.sources = sources or dict(DOC_SOURCES)
+        # Finds exact API names (`provideRouter`, `@defer`, `signal()`) the embeddings miss
+        self.keyword_retriever = create_keyword_retriever(top_k=HYBRID_BRANCH_TOP_K)
+        # Fuses both rankings
+        self.joiner = DocumentJoiner(join_mode="reciprocal_rank_fusion",
+                                     top_k=RETRIEVER_TOP_K)
+
+    @component.output_types(relevant_documentation=List[Document], query_embedding=List[float])
+    def run(self, query: str, version: Optional[str] = None):
+        # The index is built by `index.py`, here we only check its freshness from time to time
+        ensure_index()
+        # Every version shares the store, the searches only read the chunks of one of them
+        filters = version_filters(version, self.default_version, self.sources)
+
+        with tracing.tracer.trace("documentation.embedding_branch") as span:
+            start = time.perf_counter()
+            results = get_search_pipeline().run(
+                {"text_embedder": {"text": query}, "retriever": {"filters": filters}},
+                include_outputs_from={"text_embedder"})
+            embedding_documents = results["retriever"]["documents"]
+            embedding_ms = (time.perf_counter() - start) * 1000
+            span.set_tag("latency_ms", embedding_ms)
+
+        with tracing.tracer.trace("documentation.keyword_branch") as span:
+            start = time.perf_counter()
+            keyword_documents = self.keyword_retriever.run(query=query, filters=filters)["documents"]
+            keyword_ms = (time.perf_counter() - start) * 1000
+            span.set_tag("latency_ms", keyword_ms)
+
+        documents = self.joiner.run(
+            documents=[embedding_documents, keyword_documents])["documents"]
+        logger.info("Hybrid retrieval: embedding %.1fms (%d docs), keyword %.1fms (%d docs)",
+                    embedding_ms, len(embedding_documents), keyword_ms, len(keyword_documents))
+        # Whole sections (with their code examples) instead of the chunks, no extra query
+        documents = get_section_index().expand(documents, max_words=SECTION_EXPAND_MAX_WORDS)
+
+        return {
+            "relevant_documentation": documents,
+            "query_embedding": results["text_embedder"]["embedding"]
+        }
+
+
+# Summaries of near-identical queries that retrieved the same chunks are reused
+@lazy
+def get_response_cache() -> SemanticResponseCache:
+    return SemanticResponseCache(
+        RESPONSE_CACHE_FILE,
+        model=THINKING_MODEL,
+        threshold=RESPONSE_CACHE_THRESHOLD,
+        ttl=RESPONSE_CACHE_TTL,
+        max_entries=RESPONSE_CACHE_MAX_ENTRIES
+    )
+
+
+@lazy
+def get_documentation_tool() -> PipelineTool:
+    """
+    Builds (once per process) the documentation_tool, nothing is created until the first call.
+    """
+    pipeline = Pipeline(max_runs_per_component=1)
+    pipeline.add_component("documentation", DocumentationPipeline())
+    pipeline.add_component("cache_checker", ResponseCacheChecker(get_response_cache()))
+    pipeline.add_component("packer", PromptPacker("documentation", token_budget=DOCUMENTATION_TOKEN_BUDGET))
+    pipeline.add_component("builder", ChatPromptBuilder(
+        template=[
+            ChatMessage.from_user("""
+            Analyze the following Angular documentation and guidelines, extract the most relevant information 
+            and best practices related to the user request, and return it in clear Markdown format.
                               
-        <angular_documentation>
-        {% for doc in docs %}
-            {{ doc.content }}
-        {% endfor %}                  
-        </angular_documentation>
+            <angular_documentation>
+            {% for doc in docs %}
+                {{ doc.content }}
+            {% endfor %}                  
+            </angular_documentation>
                               
-        User request: {{query}}
-        """)],
-    required_variables=["docs", "query"]
-))
-pipeline.add_component("generator", thinking_generator)
-
-pipeline.connect("documentation.relevant_documentation",
-                 "builder.docs")
-pipeline.connect("builder.prompt", "generator.messages")
-
-documentation_tool = PipelineTool(
-    pipeline=pipeline,
-    parameters={
-        "type": "object",
-        "properties": {
-            "query": {
-                "type": "string",
-                "description": "The user request to identify the documentation and guidelines"
-            }
-        }
-    },
-    input_mapping={
-        # Mapea el parametro "query" a la variable "query" del componente "builder" y "documentation"
-        "query": ["builder.query", "documentation.query"],
-    },
-    # TODO: Keeping it just in case...
-    # output_mapping={
-    #    "generator.replies": "relevant_replies"
-    # },
-    # outputs_to_state={
-    #    # Mapea el output "relevant_documentation" del componente "documentation" a "messages"
-    #    "relevant_documentation": {"source": "relevant_replies"}
-    # },
-    name="documentation_tool",
-    description="Retrieves documentation and guidelines for Angular development."
-)
+            User request: {{query}}
+            """)],
+        required_variables=["docs", "query"]
+    ))
+    pipeline.add_component("generator", create_thinking_generator(
+        streaming_callback=tagged_callback("documentation")))
+    pipeline.add_component("cache_writer", ResponseCacheWriter(get_response_cache()))
+    # Receives the replies either from the cache or from the generator
+    pipeline.add_component("replies", BranchJoiner(List[ChatMessage]))
+
+    pipeline.connect("documentation.relevant_documentation",
+                     "cache_checker.documents")
+    pipeline.connect("documentation.query_embedding",
+                     "cache_checker.query_embedding")
+    pipeline.connect("cache_checker.documents", "packer.documents")
+    pipeline.connect("packer.documents", "builder.docs")
+    pipeline.connect("cache_checker.documents", "cache_writer.documents")
+    pipeline.connect("cache_checker.query_embedding",
+                     "cache_writer.query_embedding")
+    pipeline.connect("builder.prompt", "generator.messages")
+    pipeline.connect("generator.replies", "cache_writer.replies")
+    pipeline.connect("cache_checker.replies", "replies")
+    pipeline.connect("cache_writer.replies", "replies")
+
+    return PipelineTool(
+        pipeline=pipeline,
+        parameters={
+            "type": "object",
+            "properties": {
+                "query": {
+                    "type": "string",
+                    "description": "The user request to identify the documentation and guidelines"
+                },
+                "version": {
+                    "type": "string",
+                    "enum": list(DOC_SOURCES),
+                    "description": "Angular version of the documentation, only when the user asks for one "
+                                   f"(default: {DEFAULT_DOC_VERSION})"
+                }
+            },
+            "required": ["query"]
+        },
+        input_mapping={
+            # Mapea el parametro "query" a la variable "query" del componente "builder" y "documentation"
+            "query": ["builder.query", "documentation.query"],
+            "version": ["documentation.version"],
+        },
+        output_mapping={
+            "replies.value": "replies",
+            "documentation.relevant_documentation": "relevant_documentation"
+        },
+        # The orchestrator only reads the summary, the retrieved documents go to the State
+        # "relevant_documentation" the todo_tool reads its documentation from
+        outputs_to_string={"source": "replies"},
+        outputs_to_state={
+            "relevant_documentation": {"source": "relevant_documentation"}
+        },
+        name="documentation_tool",
+        description="Retrieves documentation and guidelines for Angular development."
+    )
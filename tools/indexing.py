@@ -0,0 +1,375 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
+import requests
+from haystack import Pipeline, component
+from haystack.dataclasses import Document
+from haystack.dataclasses.byte_stream import ByteStream
+from haystack.components.writers import DocumentWriter
+from haystack.document_stores.types import DuplicatePolicy
+from stores.documents import get_document_store
+from stores.sections import get_section_index
+from tools.markdown_splitter import MarkdownSectionSplitter
+from models.ollama import get_doc_embedder
+from models.batch_embedder import ConcurrentDocumentEmbedder
+from registry import lazy
+from constants import DOC_SOURCES, INDEX_STATE_FILE, INDEX_MAX_AGE
+from constants import EMBED_BATCH_SIZE, EMBED_WORKERS, SPLIT_MAX_WORDS
+
+logger = logging.getLogger(__name__)
+
+_check_lock = threading.Lock()
+_last_check = 0.0
+_refresh_thread = None
+
+
+def load_index_state() -> dict:
+    """
+    Reads the freshness state of the indexed sources, keyed by url.
+    """
+    try:
+        with open(INDEX_STATE_FILE, "r") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def index_version() -> str:
+    """
+    Returns:
+    - A hash of the indexed content of every source, it changes when a re-index adds new content
+    """
+    state = load_index_state()
+    hashes = sorted((url, meta.get("content_hash")) for url, meta in state.items())
+    return hashlib.sha256(json.dumps(hashes).encode("utf-8")).hexdigest()[:16]
+
+
+def save_index_state(state: dict):
+    os.makedirs(os.path.dirname(INDEX_STATE_FILE), exist_ok=True)
+    tmp_path = f"{INDEX_STATE_FILE}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, INDEX_STATE_FILE)
+
+
+def is_url(source: str) -> bool:
+    return source.startswith(("http://", "https://"))
+
+
+class SourceFetchError(Exception):
+    """
+    A documentation source could not be fetched or read.
+    """
+
+
+@component
+class DocSourcesFetcher:
+    """
+    Fetches the versioned documentation sources (urls or local files) that changed since the
+    last indexing run, every stream gets the `version` of its source in its meta.
+
+    Urls are requested conditionally (ETag / Last-Modified), files are only read when their
+    mtime changed, and the body is compared against the stored content hash, so an unchanged
+    source yields no stream. The sources that could not be fetched are returned in `failed`.
+    """
+
+    def __init__(self, sources: Optional[Dict[str, str]] = None, timeout: int = 3, retry_attempts: int = 2):
+        self.sources = sources or DOC_SOURCES
+        self.timeout = timeout
+        self.retry_attempts = retry_attempts
+
+    def _get(self, url: str, headers: dict):
+        for attempt in range(self.retry_attempts + 1):
+            try:
+                return requests.get(url, headers=headers, timeout=self.timeout)
+            except requests.RequestException as e:
+                if attempt == self.retry_attempts:
+                    raise SourceFetchError(f"Could not fetch {url}: {e}") from e
+
+    def _fetch_url(self, url: str, previous: dict) -> Optional[tuple]:
+        headers = {}
+        if previous.get("etag"):
+            headers["If-None-Match"] = previous["etag"]
+        if previous.get("last_modified"):
+            headers["If-Modified-Since"] = previous["last_modified"]
+
+        response = self._get(url, headers)
+        if response.status_code == 304:
+            return None
+        if response.status_code != 200:
+            raise SourceFetchError(f"Could not fetch {url}: HTTP {response.status_code}")
+        return response.content, {"etag": response.headers.get("ETag"),
+                                   "last_modified": response.headers.get("Last-Modified")}
+
+    def _read_file(self, path: str, previous: dict) -> Optional[tuple]:
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+            if mtime_ns == previous.get("mtime_ns"):
+                return None
+            with open(path, "rb") as f:
+                return f.read(), {"mtime_ns": mtime_ns}
+        except OSError as e:
+            raise SourceFetchError(f"Could not read {path}: {e}") from e
+
+    @component.output_types(streams=List[ByteStream], unchanged=Dict[str, dict], failed=List[str])
+    def run(self, force: bool = False):
+        state = {} if force else load_index_state()
+        streams, unchanged, failed = [], {}, []
+        for version, source in self.sources.items():
+            previous = state.get(source, {})
+            if previous.get("version") != version:
+                # New source, or indexed before under another version (or without one)
+                previous = {}
+            try:
+                fetched = self._fetch_url(source, previous) if is_url(source) else self._read_file(source, previous)
+            except SourceFetchError as e:
+                logger.warning("%s", e)
+                failed.append(source)
+                continue
+            if fetched is None:
+                continue
+
+            content, validators = fetched
+            meta = {"url": source, "version": version,
+                    "content_hash": hashlib.sha256(content).hexdigest(), **validators}
+            if meta["content_hash"] == previous.get("content_hash"):
+                # Same body behind new validators, only those are refreshed
+                unchanged[source] = meta
+                continue
+            streams.append(ByteStream(data=content, meta=meta, mime_type="text/plain"))
+        return {"streams": streams, "unchanged": unchanged, "failed": failed}
+
+
+@component
+class ChunkDiffer:
+    """
+    Gives every chunk an id derived from its url, version and content hash and compares them
+    with the chunks already stored, so only new or changed chunks are embedded.
+    """
+
+    # Document level metadata that would otherwise change the meta of every chunk
+    DOCUMENT_META = ("content_hash", "etag", "last_modified", "mtime_ns")
+
+    def identify(self, doc: Document) -> Document:
+        """
+        Returns:
+        - The chunk with its id and `chunk_hash`, without the document level metadata
+        """
+        chunk_hash = hashlib.sha256(doc.content.encode("utf-8")).hexdigest()
+        url = doc.meta.get("url", "")
+        # The section is part of the id, a chunk moved to another section keeps a valid section_id,
+        # and so is the version, a source indexed under another version is written again with it
+        chunk_id = hashlib.sha256(
+            f"{url}\n{doc.meta.get('version', '')}\n{doc.meta.get('section_id', '')}\n{chunk_hash}"
+            .encode("utf-8")).hexdigest()
+        meta = {key: value for key, value in doc.meta.items()
+                if key not in self.DOCUMENT_META}
+        return Document(id=chunk_id, content=doc.content, meta={**meta, "chunk_hash": chunk_hash})
+
+    def stored_ids(self, url: str) -> Set[str]:
+        stored = get_document_store().filter_documents(
+            filters={"field": "meta.url", "operator": "==", "value": url})
+        return {doc.id for doc in stored}
+
+    def new_chunks(self, documents: Iterable[Document], stored_ids: Set[str], seen: Set[str]) -> Iterator[Document]:
+        """
+        Yields the chunks of `documents` not in `stored_ids` as they are read, every chunk id is added to `seen`.
+        """
+        for doc in documents:
+            chunk = self.identify(doc)
+            if chunk.id in seen:
+                continue
+            seen.add(chunk.id)
+            if chunk.id not in stored_ids:
+                yield chunk
+
+    @component.output_types(documents=List[Document], stale_ids=List[str], unchanged=int)
+    def run(self, documents: List[Document]):
+        stored_ids = set()
+        for url in {doc.meta.get("url", "") for doc in documents}:
+            stored_ids.update(self.stored_ids(url))
+        seen = set()
+        new_documents = list(self.new_chunks(documents, stored_ids, seen))
+        return {
+            "documents": new_documents,
+            "stale_ids": [chunk_id for chunk_id in stored_ids if chunk_id not in seen],
+            "unchanged": len(seen) - len(new_documents)
+        }
+
+
+@component
+class SourceIndexer:
+    """
+    Splits, diffs, embeds and writes the fetched sources one at a time. Once the chunks of a
+    source are written its stale chunks are deleted, so the index is never empty, and its
+    sections are saved.
+
+    The chunks go from the splitter to the embedder as they are read (see
+    MarkdownSectionSplitter.split), so only the batches being embedded are in memory, not the
+    chunks of every source. The sections of the current source are kept for the section index,
+    which is saved per source.
+    """
+
+    def __init__(self, splitter: MarkdownSectionSplitter, differ: ChunkDiffer, embedder: ConcurrentDocumentEmbedder):
+        self.splitter = splitter
+        self.differ = differ
+        self.embedder = embedder
+
+    def warm_up(self):
+        self.embedder.warm_up()
+
+    def _index(self, stream: ByteStream) -> dict:
+        url = stream.meta.get("url", "")
+        stored_ids, seen, sections, added = self.differ.stored_ids(url), set(), [], 0
+
+        def chunks():
+            nonlocal added
+            for kind, item in self.splitter.split(stream):
+                if kind == "section":
+                    sections.append(item)
+                    continue
+                for chunk in self.differ.new_chunks([item], stored_ids, seen):
+                    added += 1
+                    yield chunk
+
+        embedded = self.embedder.run(documents=chunks())
+        stale_ids = [chunk_id for chunk_id in stored_ids if chunk_id not in seen]
+        if stale_ids:
+            get_document_store().delete_documents(stale_ids)
+        get_section_index().save(url, sections)
+        return {"added": added, "removed": len(stale_ids), "unchanged": len(seen) - added,
+                "elapsed": embedded["meta"]["elapsed"]}
+
+    @component.output_types(added=int, removed=int, unchanged=int, meta=Dict[str, Any])
+    def run(self, streams: List[ByteStream]):
+        totals = {"added": 0, "removed": 0, "unchanged": 0, "elapsed": 0.0}
+        for stream in streams:
+            for key, value in self._index(stream).items():
+                totals[key] += value
+        elapsed = totals.pop("elapsed")
+        return {**totals, "meta": {"docs_per_second": totals["added"] / elapsed if elapsed > 0 else 0.0}}
+
+
+@lazy
+def get_index_pipeline() -> Pipeline:
+    """
+    Builds (once per process) the pipeline that fetches, splits, embeds and writes the documentation.
+    """
+    index_pipeline = Pipeline(max_runs_per_component=1)
+    index_pipeline.add_component("fetcher", DocSourcesFetcher())
+    index_pipeline.add_component("indexer", SourceIndexer(
+        # Splits the raw Markdown by headings, never inside a code fence
+        splitter=MarkdownSectionSplitter(max_words=SPLIT_MAX_WORDS),
+        differ=ChunkDiffer(),
+        # Writes every batch as soon as it is embedded, and doesn't keep it
+        embedder=ConcurrentDocumentEmbedder(
+            get_doc_embedder(),
+            writer=DocumentWriter(document_store=get_document_store(),
+                                  policy=DuplicatePolicy.OVERWRITE),
+            batch_size=EMBED_BATCH_SIZE,
+            max_workers=EMBED_WORKERS,
+            keep_documents=False
+        )
+    ))
+    index_pipeline.connect("fetcher.streams", "indexer.streams")
+    index_pipeline.warm_up()
+    return index_pipeline
+
+
+def _remove_sources(state: dict) -> int:
+    # Sources no longer in DOC_SOURCES leave the store (and their version stops matching)
+    removed = 0
+    configured = set(DOC_SOURCES.values())
+    for url in [url for url in state if url not in configured]:
+        stored = get_document_store().filter_documents(
+            filters={"field": "meta.url", "operator": "==", "value": url})
+        if stored:
+            get_document_store().delete_documents([doc.id for doc in stored])
+        get_section_index().save(url, [])
+        del state[url]
+        removed += len(stored)
+        logger.info("Removed %d chunks of %s, no longer in DOC_SOURCES", len(stored), url)
+    return removed
+
+
+def run_indexing(force: bool = False) -> dict:
+    """
+    Runs the indexing stage and records the freshness of every source in DOC_SOURCES.
+    Only new or changed chunks are embedded, chunks no longer in their document are deleted.
+
+    Arguments:
+    - force (bool): Ignore the stored ETag / Last-Modified / mtime / content hash and re-index
+
+    Returns:
+    - A dictionary with the status and the added, removed and unchanged chunks
+    """
+    pipeline = get_index_pipeline()
+    results = pipeline.run(
+        data={"fetcher": {"force": force}},
+        include_outputs_from={"fetcher", "indexer"}
+    )
+    fetched = results["fetcher"]
+    state = load_index_state()
+    now = time.time()
+    removed = _remove_sources(state)
+    for url in DOC_SOURCES.values():
+        if url in fetched["failed"]:
+            # Checked again on the next run instead of looking fresh for INDEX_MAX_AGE
+            continue
+        entry = state.setdefault(url, {})
+        entry.update(fetched["unchanged"].get(url, {}))
+        entry["checked_at"] = now
+
+    if not fetched["streams"]:
+        save_index_state(state)
+        return {"status": "unchanged", "added": 0, "removed": removed, "unchanged": None}
+
+    indexed = results["indexer"]
+    for stream in fetched["streams"]:
+        state[stream.meta["url"]] = {**stream.meta, "checked_at": now, "indexed_at": now}
+    save_index_state(state)
+    return {
+        "status": "indexed",
+        "added": indexed["added"],
+        "removed": removed + indexed["removed"],
+        "unchanged": indexed["unchanged"],
+        "docs_per_second": indexed["meta"]["docs_per_second"]
+    }
+
+
+def _refresh_index():
+    try:
+        stats = run_indexing()
+        logger.info("Documentation index refreshed: %s", stats)
+    except Exception:
+        logger.exception("Could not refresh the documentation index")
+
+
+def ensure_index():
+    """
+    Checks the freshness of the index at most once every INDEX_MAX_AGE seconds.
+    Only an empty index is built before answering, a stale one is refreshed in a background
+    thread while the queries keep searching the current one. Until an empty index is built
+    (its sources could not be fetched, or the build raised) every call tries again.
+    """
+    global _last_check, _refresh_thread
+    with _check_lock:
+        if time.time() - _last_check < INDEX_MAX_AGE:
+            return
+        if get_document_store().count_documents() == 0:
+            run_indexing(force=True)
+            if get_document_store().count_documents() > 0:
+                _last_check = time.time()
+            return
+        _last_check = time.time()
+        state = load_index_state()
+        checked_at = min(state.get(url, {}).get("checked_at", 0) for url in DOC_SOURCES.values())
+        if time.time() - checked_at < INDEX_MAX_AGE:
+            return
+        if _refresh_thread is None or not _refresh_thread.is_alive():
+            _refresh_thread = threading.Thread(target=_refresh_index, name="index-refresh", daemon=True)
+            _refresh_thread.start()
@@ -0,0 +1,166 @@
+import io
+import re
+import hashlib
+from typing import Iterator, List
+from haystack import component
+from haystack.dataclasses import Document
+from haystack.dataclasses.byte_stream import ByteStream
+
+HEADING_PATTERN = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+FENCE_PATTERN = re.compile(r"^\s*(`{3,}|~{3,})")
+
+
+def section_id(url: str, heading_path: List[str], occurrence: int) -> str:
+    # Pages repeat headings ("Usage", "API"), the occurrence keeps them apart
+    key = "\n".join([url, *heading_path, str(occurrence)])
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+
+
+def iter_blocks(lines: Iterator[str]) -> Iterator[tuple]:
+    """
+    Reads Markdown line by line and yields its blocks:
+
+    - ("heading", level, title)
+    - ("text", text): a paragraph or list, ends at a blank line
+    - ("code", text): a whole fenced code block, fences included
+
+    Headings inside code fences (shell comments) are not headings.
+    """
+    paragraph, fence, code = [], None, []
+    for line in lines:
+        line = line.rstrip("\n").rstrip()
+        if fence is not None:
+            code.append(line)
+            match = FENCE_PATTERN.match(line)
+            if match and match.group(1)[0] == fence[0] and len(match.group(1)) >= len(fence) \
+                    and not line.strip()[len(match.group(1)):]:
+                yield "code", "\n".join(code)
+                fence, code = None, []
+            continue
+
+        fence_match = FENCE_PATTERN.match(line)
+        heading_match = HEADING_PATTERN.match(line)
+        if fence_match or heading_match or not line.strip():
+            if paragraph:
+                yield "text", "\n".join(paragraph)
+                paragraph = []
+        if fence_match:
+            fence, code = fence_match.group(1), [line]
+        elif heading_match:
+            yield "heading", len(heading_match.group(1)), heading_match.group(2)
+        elif line.strip():
+            paragraph.append(line)
+
+    if paragraph:
+        yield "text", "\n".join(paragraph)
+    if code:
+        # Unclosed fence at the end of the document
+        yield "code", "\n".join(code)
+
+
+def _split_block(kind: str, text: str, max_words: int) -> List[str]:
+    # Blocks longer than a chunk are cut by lines, code pieces get their fences back
+    if len(text.split()) <= max_words:
+        return [text]
+    lines = text.split("\n")
+    fence = None
+    if kind == "code":
+        fence, lines = lines[0], lines[1:-1] if FENCE_PATTERN.match(lines[-1]) else lines[1:]
+    pieces, current, words = [], [], 0
+    for line in lines:
+        line_words = len(line.split())
+        if current and words + line_words > max_words:
+            pieces.append(current)
+            current, words = [], 0
+        current.append(line)
+        words += line_words
+    if current:
+        pieces.append(current)
+    closing = fence.strip()[:len(FENCE_PATTERN.match(fence).group(1))] if fence else None
+    return ["\n".join([fence, *piece, closing]) if fence else "\n".join(piece) for piece in pieces]
+
+
+@component
+class MarkdownSectionSplitter:
+    """
+    Splits Markdown into chunks that never cross a heading or cut a code fence.
+
+    Every chunk starts with its heading and gets the `page` (first level heading) and the
+    `heading_path` ("Components > Inputs") in its meta, plus the `section_id` of its section.
+    The sections (heading path, parent and full text) are also returned to build the section
+    index, used to expand the retrieved chunks to their section.
+
+    `split` reads the document line by line and yields every section as soon as it ends, the
+    indexing stage embeds its chunks as they come (see SourceIndexer). `run`, the Pipeline
+    interface, collects them: the chunks and the sections of all the sources are returned
+    together, about twice the size of the documents.
+    """
+
+    def __init__(self, max_words: int = 250):
+        self.max_words = max_words
+
+    def _chunks(self, blocks: List[tuple], heading: str) -> Iterator[str]:
+        current, words = [heading] if heading else [], 0
+        for kind, text in blocks:
+            for piece in _split_block(kind, text, self.max_words):
+                piece_words = len(piece.split())
+                if words and words + piece_words > self.max_words:
+                    yield "\n\n".join(current)
+                    current, words = [heading] if heading else [], 0
+                current.append(piece)
+                words += piece_words
+        if words:
+            yield "\n\n".join(current)
+
+    def split(self, stream: ByteStream) -> Iterator[tuple]:
+        """
+        Yields ("chunk", Document) and ("section", dict) as the document is read.
+        """
+        url = stream.meta.get("url", "")
+        meta = dict(stream.meta)
+        lines = io.TextIOWrapper(io.BytesIO(stream.data), encoding="utf-8", errors="replace")
+
+        stack = []  # (level, title, section_id)
+        occurrences = {}
+        blocks, heading_line = [], ""
+
+        def flush():
+            path = [title for _, title, _ in stack]
+            current_id = stack[-1][2] if stack else section_id(url, [], 0)
+            parent_id = stack[-2][2] if len(stack) > 1 else None
+            text = "\n\n".join([heading_line] + [text for _, text in blocks]) if heading_line else \
+                "\n\n".join(text for _, text in blocks)
+            yield "section", {"id": current_id, "url": url, "parent": parent_id, "heading_path": path, "text": text}
+            for chunk_index, content in enumerate(self._chunks(blocks, heading_line)):
+                yield "chunk", Document(content=content, meta={
+                    **meta,
+                    "page": path[0] if path else "",
+                    "heading_path": " > ".join(path),
+                    "section_id": current_id,
+                    "chunk_index": chunk_index
+                })
+
+        for block in iter_blocks(lines):
+            if block[0] != "heading":
+                blocks.append(block)
+                continue
+            if blocks or heading_line:
+                yield from flush()
+            _, level, title = block
+            while stack and stack[-1][0] >= level:
+                stack.pop()
+            path = [title for _, title, _ in stack] + [title]
+            occurrence = occurrences.get(tuple(path), 0)
+            occurrences[tuple(path)] = occurrence + 1
+            stack.append((level, title, section_id(url, path, occurrence)))
+            blocks, heading_line = [], f"{'#' * level} {title}"
+        if blocks or heading_line:
+            yield from flush()
+
+    @component.output_types(documents=List[Document], sections=List[dict])
+    def run(self, sources: List[ByteStream]):
+        documents, sections = [], []
+        for stream in sources:
+            for kind, item in self.split(stream):
+                (documents if kind == "chunk" else sections).append(item)
+        return {"documents": documents, "sections": sections}
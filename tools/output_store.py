@@ -0,0 +1,166 @@
+import os
+import fcntl
+import atexit
+import hashlib
+import logging
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Callable, Optional
+from registry import lazy
+from constants import RESULT_DIR, SKILLS_DIR, OUTPUT_STORE_DIR, OUTPUT_BATCHED_FLUSH
+
+logger = logging.getLogger(__name__)
+
+
+def content_hash(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def _fsync_dir(path: str):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class OutputStore:
+    """
+    Writes the generated files (SKILL.md, TODO.md) under `root`:
+
+    - Atomically: a temporary file in the same directory renamed over the target, a crash never
+      leaves a partial file
+    - Under a lock per file (`flock`, so concurrent threads and batch processes are covered)
+    - Deduplicated by content hash, writing the same content again returns the existing file
+
+    With `batched` the files are still renamed right away (visible to the readers and the dedup)
+    but fsynced together on `flush()`, which is also called at exit.
+    """
+
+    def __init__(self, root: str, state_dir: str, batched: bool = False):
+        self.root = root
+        self.locks_dir = os.path.join(state_dir, "locks")
+        self.hashes_dir = os.path.join(state_dir, "hashes")
+        os.makedirs(self.locks_dir, exist_ok=True)
+        os.makedirs(self.hashes_dir, exist_ok=True)
+        self.batched = batched
+        self._unsynced = set()
+        self._unsynced_lock = threading.Lock()
+        if batched:
+            atexit.register(self.flush)
+
+    @contextmanager
+    def _locked(self, name: str):
+        lock_path = os.path.join(self.locks_dir, content_hash(name)[:32] + ".lock")
+        with open(lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _atomic_write(self, path: str, content: str):
+        dir_path = os.path.dirname(path)
+        os.makedirs(dir_path, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=dir_path, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(content)
+                f.flush()
+                if not self.batched:
+                    os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        if self.batched:
+            with self._unsynced_lock:
+                self._unsynced.add(path)
+        else:
+            _fsync_dir(dir_path)
+
+    def _read(self, path: str) -> Optional[str]:
+        try:
+            with open(path, "r") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def write(self, relative_path: str, content: str) -> str:
+        """
+        Writes `content` to `relative_path` unless the file already exists.
+
+        Returns:
+        - The file path, also when the file already has the same content
+
+        Raises:
+        - FileExistsError: the file exists with a different content
+        """
+        path = os.path.join(self.root, relative_path)
+        with self._locked(path):
+            existing = self._read(path)
+            if existing is not None:
+                if content_hash(existing) == content_hash(content):
+                    logger.info("%s already written with the same content", path)
+                    return path
+                raise FileExistsError(path)
+            self._atomic_write(path, content)
+        return path
+
+    def write_unique(self, relative_path: Callable[[], str], content: str) -> str:
+        """
+        Writes `content` to a new file (`relative_path()`, e.g. in a new uuid directory),
+        unless the same content was already written.
+
+        Returns:
+        - The file path
+        """
+        digest = content_hash(content)
+        marker = os.path.join(self.hashes_dir, digest)
+        with self._locked(digest):
+            path = self._read(marker)
+            if path and os.path.exists(path):
+                logger.info("Same content as %s, not written again", path)
+                return path
+            path = os.path.join(self.root, relative_path())
+            self._atomic_write(path, content)
+            self._atomic_write(marker, path)
+        return path
+
+    def flush(self):
+        """
+        Fsyncs the files written since the last flush (batched mode).
+        """
+        with self._unsynced_lock:
+            paths, self._unsynced = self._unsynced, set()
+        for path in paths:
+            try:
+                fd = os.open(path, os.O_RDONLY)
+                try:
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+            except FileNotFoundError:
+                continue
+        for dir_path in {os.path.dirname(path) for path in paths}:
+            _fsync_dir(dir_path)
+        if paths:
+            logger.info("Flushed %d output files", len(paths))
+
+
+@lazy
+def get_skill_store() -> OutputStore:
+    return OutputStore(SKILLS_DIR, os.path.join(OUTPUT_STORE_DIR, "skills"), batched=OUTPUT_BATCHED_FLUSH)
+
+
+@lazy
+def get_todo_store() -> OutputStore:
+    return OutputStore(RESULT_DIR, os.path.join(OUTPUT_STORE_DIR, "todos"), batched=OUTPUT_BATCHED_FLUSH)
+
+
+def flush_outputs():
+    for get_store in (get_skill_store, get_todo_store):
+        if get_store.is_built():
+            get_store().flush()
@@ -0,0 +1,121 @@
+import re
+import logging
+from typing import List, Optional
+from haystack import component
+from haystack.dataclasses import Document
+
+logger = logging.getLogger(__name__)
+
+# Words, numbers and every punctuation sign, roughly how BPE vocabularies split English and code
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+WORD_PATTERN = re.compile(r"\S+")
+# Minimum words shared by two chunks to be considered the overlap of the splitter
+MIN_OVERLAP_WORDS = 8
+# Minimum room (tokens) left in the budget to include the beginning of the next document
+MIN_PARTIAL_TOKENS = 64
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimates the tokens of `text`. Ollama doesn't expose the tokenizer of its models, long words
+    count once more every 6 characters, as they are split in several tokens.
+    """
+    return sum(1 + len(token) // 6 for token in TOKEN_PATTERN.findall(text))
+
+
+def compact_whitespace(text: str) -> str:
+    """
+    Removes trailing spaces, runs of spaces inside the lines and repeated blank lines.
+    The indentation is kept, it's meaningful in the code examples.
+    """
+    lines = []
+    for line in text.splitlines():
+        indent = line[:len(line) - len(line.lstrip())]
+        line = indent + re.sub(r"[ \t]+", " ", line.strip())
+        if line or (lines and lines[-1]):
+            lines.append(line)
+    return "\n".join(lines).strip()
+
+
+def _overlap(previous: List[str], words: List[str]) -> int:
+    # Longest tail of `previous` the beginning of `words` repeats
+    for size in range(min(len(previous), len(words)), MIN_OVERLAP_WORDS - 1, -1):
+        if previous[-size:] == words[:size]:
+            return size
+    return 0
+
+
+def _truncate(text: str, max_tokens: int) -> str:
+    # Cuts at the last line (or word) that fits
+    kept, tokens = [], 0
+    for line in text.splitlines():
+        line_tokens = estimate_tokens(line)
+        if tokens + line_tokens > max_tokens:
+            words = []
+            for word in line.split(" "):
+                tokens += estimate_tokens(word)
+                if tokens > max_tokens:
+                    break
+                words.append(word)
+            kept.append(" ".join(words))
+            break
+        kept.append(line)
+        tokens += line_tokens
+    return "\n".join(kept).rstrip() + " ..."
+
+
+@component
+class PromptPacker:
+    """
+    Packs the retrieved documents before they are pasted in a prompt:
+
+    - Compacts their whitespace
+    - Drops the repeated ones and the text the splitter overlaps between consecutive chunks
+    - Keeps the best scored ones within `token_budget` (estimated tokens), the last one may be truncated
+
+    The documents are returned by descending score, `name` identifies the prompt in the logs.
+    """
+
+    def __init__(self, name: str, token_budget: int):
+        self.name = name
+        self.token_budget = token_budget
+
+    @component.output_types(documents=List[Document])
+    def run(self, documents: Optional[List[Document]] = None):
+        documents = documents or []
+        tokens_before = sum(estimate_tokens(doc.content or "") for doc in documents)
+        ranked = sorted(documents, key=lambda doc: doc.score if doc.score is not None else float("-inf"),
+                        reverse=True)
+
+        packed, seen, kept_words, tokens = [], set(), [], 0
+        for doc in ranked:
+            content = compact_whitespace(doc.content or "")
+            if not content or content in seen:
+                continue
+            seen.add(content)
+
+            # Drops the words already in the prompt from the previous / next chunk
+            words = WORD_PATTERN.findall(content)
+            head = max((_overlap(kept, words) for kept in kept_words), default=0)
+            tail = max((_overlap(words, kept) for kept in kept_words), default=0)
+            if head + tail >= len(words):
+                continue
+            if head or tail:
+                spans = [match.span() for match in WORD_PATTERN.finditer(content)]
+                content = content[spans[head][0]:spans[len(words) - tail - 1][1]]
+
+            remaining = self.token_budget - tokens
+            content_tokens = estimate_tokens(content)
+            if content_tokens > remaining:
+                if remaining < MIN_PARTIAL_TOKENS:
+                    break
+                content = _truncate(content, remaining)
+                content_tokens = estimate_tokens(content)
+
+            packed.append(Document(id=doc.id, content=content, meta=doc.meta, score=doc.score))
+            kept_words.append(words)
+            tokens += content_tokens
+
+        logger.info("Prompt %s: %d documents / ~%d tokens packed into %d documents / ~%d tokens (budget %d)",
+                    self.name, len(documents), tokens_before, len(packed), tokens, self.token_budget)
+        return {"documents": packed}
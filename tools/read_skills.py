@@ -1,7 +1,6 @@
-import os
-import frontmatter
 from haystack.tools import tool
-from constants import SKILLS_DIR
+from tools.skills_index import get_skills_index
+from constants import SKILLS_SEARCH_TOP_K
 
 
 @tool
@@ -12,17 +11,19 @@ def read_skills_descriptions() -> list[dict]:
     Returns:
     - A list of dictionaries with the name and description for each SKILL
     """
-    try:
-        # Reads the file
-        skills = []
-        for root, _, files in os.walk(SKILLS_DIR):
-            for file in files:
-                file_path = os.path.join(root, file)
-                with open(file_path, "r") as f:
-                    post = frontmatter.load(f)
-                    skills.append(
-                        {"file_path": file_path, "nombre": post["name"], "description": post["description"]})
+    return [{"file_path": skill["file_path"], "nombre": skill["name"], "description": skill["description"]}
+            for skill in get_skills_index().skills()]
 
-        return skills
-    except Exception:
-        return []
+
+@tool
+def search_skills(query: str) -> list[dict]:
+    """
+    Searches the existing SKILLs most similar to a SKILL.
+
+    Arguments:
+    - query (str): The name and a short description of the SKILL to look for
+
+    Returns:
+    - A list of dictionaries with the file path, name, description and similarity score of the closest SKILLs
+    """
+    return get_skills_index().search(query, top_k=SKILLS_SEARCH_TOP_K)
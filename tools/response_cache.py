@@ -0,0 +1,142 @@
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from array import array
+from typing import List, Optional
+import numpy as np
+from haystack import component
+from haystack.dataclasses import ChatMessage, Document
+
+logger = logging.getLogger(__name__)
+
+
+class SemanticResponseCache:
+    """
+    SQLite cache of generated summaries keyed by the retrieved chunk ids.
+
+    A stored summary is reused when a new query retrieved exactly the same chunks
+    and its embedding is within `threshold` cosine similarity of the cached query.
+    Entries expire after `ttl` seconds and the least recently used ones are evicted
+    over `max_entries`.
+    """
+
+    def __init__(self, path: str, model: str, threshold: float, ttl: int, max_entries: int):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.model = model
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                documents_key TEXT NOT NULL,
+                embedding BLOB NOT NULL,
+                reply TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS responses_documents_key ON responses (documents_key)")
+        self._connection.commit()
+
+    def _documents_key(self, document_ids: List[str]) -> str:
+        return hashlib.sha256(
+            "\0".join([self.model, *sorted(set(document_ids))]).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float64)
+        return vector / (np.linalg.norm(vector) or 1.0)
+
+    def lookup(self, query_embedding: List[float], document_ids: List[str]) -> Optional[str]:
+        query = self._normalize(query_embedding)
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT id, embedding, reply FROM responses WHERE documents_key = ? AND created_at > ?",
+                (self._documents_key(document_ids), time.time() - self.ttl)
+            ).fetchall()
+
+            best_id, best_reply, best_score = None, None, self.threshold
+            for row_id, blob, reply in rows:
+                score = float(np.dot(query, np.frombuffer(blob, dtype=np.float64)))
+                if score >= best_score:
+                    best_id, best_reply, best_score = row_id, reply, score
+
+            if best_id is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._connection.execute(
+                "UPDATE responses SET last_used = ? WHERE id = ?", (time.time(), best_id))
+            self._connection.commit()
+            return best_reply
+
+    def store(self, query_embedding: List[float], document_ids: List[str], reply: str):
+        now = time.time()
+        blob = array("d", self._normalize(query_embedding)).tobytes()
+        with self._lock:
+            self._connection.execute(
+                "INSERT INTO responses (documents_key, embedding, reply, created_at, last_used) VALUES (?, ?, ?, ?, ?)",
+                (self._documents_key(document_ids), blob, reply, now, now)
+            )
+            self._connection.execute(
+                "DELETE FROM responses WHERE created_at <= ?", (now - self.ttl,))
+            self._connection.execute("""
+                DELETE FROM responses WHERE id NOT IN (
+                    SELECT id FROM responses ORDER BY last_used DESC LIMIT ?
+                )
+            """, (self.max_entries,))
+            self._connection.commit()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0
+        }
+
+
+@component
+class ResponseCacheChecker:
+    """
+    Outputs the cached `replies` on a hit, otherwise forwards `documents` and
+    `query_embedding` to build the prompt and store the new summary.
+    """
+
+    def __init__(self, cache: SemanticResponseCache):
+        self.cache = cache
+
+    @component.output_types(replies=List[ChatMessage], documents=List[Document], query_embedding=List[float])
+    def run(self, documents: List[Document], query_embedding: List[float]):
+        reply = self.cache.lookup(query_embedding, [doc.id for doc in documents])
+        logger.info("Documentation response cache: %s (%s)",
+                    "hit" if reply is not None else "miss", self.cache.stats())
+        if reply is not None:
+            return {"replies": [ChatMessage.from_assistant(reply, meta={"cache": "hit"})]}
+        return {"documents": documents, "query_embedding": query_embedding}
+
+
+@component
+class ResponseCacheWriter:
+    """
+    Stores the generated summary and passes the replies through.
+    """
+
+    def __init__(self, cache: SemanticResponseCache):
+        self.cache = cache
+
+    @component.output_types(replies=List[ChatMessage])
+    def run(self, replies: List[ChatMessage], documents: List[Document], query_embedding: List[float]):
+        if replies and replies[0].text:
+            self.cache.store(query_embedding, [doc.id for doc in documents], replies[0].text)
+        return {"replies": replies}
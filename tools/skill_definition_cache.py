@@ -0,0 +1,126 @@
+import os
+import json
+import hashlib
+import logging
+from typing import List, Optional
+from haystack import component
+from haystack.dataclasses import ChatMessage
+from haystack.dataclasses.byte_stream import ByteStream
+
+logger = logging.getLogger(__name__)
+
+
+class SkillDefinitionStore:
+    """
+    Content-addressed store of the summarized SKILLs definition.
+
+    Summaries are keyed by the hash of the fetched pages and the model, and the
+    last fetched pages are kept as a snapshot so the definition is available offline.
+    The snapshot also keeps when the pages were fetched and their ETag / Last-Modified,
+    to fetch them again only once they're old, and conditionally.
+    """
+
+    # When the page was fetched and its validators, in the meta of the fetched streams
+    PAGE_META = ("fetched_at", "etag", "last_modified")
+
+    def __init__(self, path: str, model: str):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.model = model
+
+    def key(self, streams: List[ByteStream]) -> str:
+        page_hashes = sorted(hashlib.sha256(stream.data).hexdigest() for stream in streams)
+        return hashlib.sha256("\0".join([self.model, *page_hashes]).encode("utf-8")).hexdigest()
+
+    def _read(self, name: str) -> Optional[dict]:
+        try:
+            with open(os.path.join(self.path, name), "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _write(self, name: str, data: dict):
+        tmp_path = os.path.join(self.path, f"{name}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, os.path.join(self.path, name))
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self._read(f"{key}.json")
+        return entry["summary"] if entry else None
+
+    def put(self, key: str, summary: str, streams: List[ByteStream]):
+        self._write(f"{key}.json", {"summary": summary})
+        self.save_snapshot(key, streams)
+
+    def save_snapshot(self, key: str, streams: List[ByteStream]):
+        self._write("snapshot.json", {
+            "key": key,
+            "pages": [{
+                "url": stream.meta.get("url"),
+                "content": stream.data.decode("utf-8", errors="replace"),
+                "mime_type": stream.mime_type,
+                **{name: stream.meta.get(name) for name in self.PAGE_META}
+            } for stream in streams]
+        })
+
+    def snapshot(self) -> List[ByteStream]:
+        snapshot = self._read("snapshot.json") or {"pages": []}
+        return [
+            ByteStream(data=page["content"].encode("utf-8"),
+                       meta={"url": page["url"], **{name: page.get(name) for name in self.PAGE_META}},
+                       mime_type=page["mime_type"])
+            for page in snapshot["pages"]
+        ]
+
+    def summarized_snapshot(self) -> List[ByteStream]:
+        """
+        Returns:
+        - The snapshot when its summary (with the current model) is stored, else an empty list
+        """
+        streams = self.snapshot()
+        return streams if streams and self.get(self.key(streams)) is not None else []
+
+
+@component
+class SkillDefinitionCacheChecker:
+    """
+    Outputs the cached summary as `replies` when the fetched pages didn't change,
+    otherwise forwards the `streams` to be summarized.
+    Without fetched pages (offline, or fetched recently) the stored snapshot is used.
+    """
+
+    def __init__(self, store: SkillDefinitionStore):
+        self.store = store
+
+    @component.output_types(replies=List[ChatMessage], streams=List[ByteStream], key=str)
+    def run(self, streams: List[ByteStream]):
+        fetched = bool(streams)
+        if not fetched:
+            logger.info("SKILLs definition pages not fetched, using the stored snapshot")
+            streams = self.store.snapshot()
+
+        key = self.store.key(streams)
+        summary = self.store.get(key)
+        if summary is not None:
+            if fetched:
+                # Same pages, fetched again: their fetch time and validators are refreshed
+                self.store.save_snapshot(key, streams)
+            return {"replies": [ChatMessage.from_assistant(summary, meta={"cache": "hit"})]}
+        return {"streams": streams, "key": key}
+
+
+@component
+class SkillDefinitionCacheWriter:
+    """
+    Stores the summarized definition and passes the replies through.
+    """
+
+    def __init__(self, store: SkillDefinitionStore):
+        self.store = store
+
+    @component.output_types(replies=List[ChatMessage])
+    def run(self, replies: List[ChatMessage], key: str, streams: List[ByteStream]):
+        if replies and replies[0].text:
+            self.store.put(key, replies[0].text, streams)
+        return {"replies": replies}
@@ -0,0 +1,150 @@
+import os
+import json
+import hashlib
+import logging
+import threading
+from typing import Any, List
+import frontmatter
+import numpy as np
+from models.ollama import get_text_embedder
+from registry import lazy
+from constants import SKILLS_DIR, SKILLS_INDEX_FILE, EMBEDDER_MODEL
+
+logger = logging.getLogger(__name__)
+
+SKILL_FILE = "SKILL.md"
+
+
+class SkillsIndex:
+    """
+    Manifest (JSON) of the SKILL.md files in `skills_dir` with their name, description and
+    the embedding of both.
+
+    A file is only parsed and embedded again when its mtime or size change, the manifest is
+    rebuilt when the embedding model changes.
+    """
+
+    def __init__(self, path: str, skills_dir: str, embedder: Any, model: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.skills_dir = skills_dir
+        self.embedder = embedder
+        self.model = model
+        self._lock = threading.Lock()
+        self._skills = self._read()
+
+    def _read(self) -> dict:
+        try:
+            with open(self.path, "r") as f:
+                manifest = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+        return manifest["skills"] if manifest.get("model") == self.model else {}
+
+    def _write(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"model": self.model, "skills": self._skills}, f)
+        os.replace(tmp_path, self.path)
+
+    def _skill_files(self) -> List[str]:
+        file_paths = []
+        for root, _, files in os.walk(self.skills_dir):
+            if SKILL_FILE in files:
+                file_paths.append(os.path.join(root, SKILL_FILE))
+        return file_paths
+
+    def _load(self, file_path: str, stat: os.stat_result) -> dict:
+        entry = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+        try:
+            with open(file_path, "r") as f:
+                post = frontmatter.load(f)
+            name, description = post["name"], post["description"]
+        except Exception as e:
+            # A malformed SKILL is left out (until it's modified), the others are still listed
+            logger.warning("Skipping SKILL %s: %r", file_path, e)
+            return {**entry, "error": repr(e)}
+        embedding = self.embedder.run(text=f"{name}: {description}")["embedding"]
+        return {**entry, "name": name, "description": description, "embedding": embedding}
+
+    def _valid(self) -> List[tuple]:
+        return [(file_path, entry) for file_path, entry in self._skills.items() if "error" not in entry]
+
+    def _update(self, file_path: str) -> bool:
+        try:
+            stat = os.stat(file_path)
+        except FileNotFoundError:
+            return self._skills.pop(file_path, None) is not None
+        entry = self._skills.get(file_path)
+        if entry and entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+            return False
+        self._skills[file_path] = self._load(file_path, stat)
+        return True
+
+    def update(self, file_path: str):
+        """
+        Indexes (or removes) a single SKILL.md, e.g. right after `write_skill`.
+        """
+        with self._lock:
+            if self._update(file_path):
+                self._write()
+
+    def refresh(self):
+        """
+        Validates the manifest against the files, only the new or modified ones are parsed.
+        """
+        with self._lock:
+            file_paths = self._skill_files()
+            changed = False
+            for file_path in set(self._skills) - set(file_paths):
+                del self._skills[file_path]
+                changed = True
+            for file_path in file_paths:
+                changed = self._update(file_path) or changed
+            if changed:
+                self._write()
+                logger.info("Skills index updated: %d skills", len(self._valid()))
+
+    def version(self) -> str:
+        """
+        Returns:
+        - A hash of the indexed SKILL files (path, mtime and size), it changes with every written SKILL
+        """
+        self.refresh()
+        with self._lock:
+            files = sorted((file_path, entry["mtime_ns"], entry["size"]) for file_path, entry in self._skills.items())
+        return hashlib.sha256(json.dumps(files).encode("utf-8")).hexdigest()[:16]
+
+    def skills(self) -> List[dict]:
+        self.refresh()
+        with self._lock:
+            return [{"file_path": file_path, "name": entry["name"], "description": entry["description"]}
+                    for file_path, entry in self._valid()]
+
+    def search(self, query: str, top_k: int) -> List[dict]:
+        """
+        Returns:
+        - The `top_k` skills whose name and description are the most similar to `query`
+        """
+        self.refresh()
+        with self._lock:
+            entries = self._valid()
+        if not entries:
+            return []
+
+        query_embedding = np.asarray(self.embedder.run(text=query)["embedding"])
+        matrix = np.asarray([entry["embedding"] for _, entry in entries])
+        scores = matrix @ query_embedding / (
+            np.linalg.norm(matrix, axis=1) * np.linalg.norm(query_embedding) + 1e-12)
+        best = np.argsort(-scores)[:top_k]
+        return [{
+            "file_path": entries[i][0],
+            "name": entries[i][1]["name"],
+            "description": entries[i][1]["description"],
+            "score": round(float(scores[i]), 4)
+        } for i in best]
+
+
+@lazy
+def get_skills_index() -> SkillsIndex:
+    return SkillsIndex(SKILLS_INDEX_FILE, SKILLS_DIR, embedder=get_text_embedder(), model=EMBEDDER_MODEL)
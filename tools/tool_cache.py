@@ -0,0 +1,207 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+from haystack import Pipeline, tracing
+from haystack.core.errors import SerializationError
+from haystack.core.serialization import component_to_dict
+from haystack.dataclasses import ChatMessage, Document
+from haystack.tools import PipelineTool
+from haystack.utils.base_serialization import _deserialize_value_with_schema, _serialize_value_with_schema
+from models.embedding_cache import normalize_text
+from models.ollama_client import count_chat_calls
+from registry import lazy
+from constants import TOOL_CACHE_FILE, TOOL_CACHE_MEMORY_ENTRIES, TOOL_CACHE_MAX_ENTRIES
+
+logger = logging.getLogger(__name__)
+
+
+def pipeline_version(pipeline: Pipeline) -> str:
+    """
+    Hash of the serialized components of `pipeline` (models, prompts, generation kwargs...),
+    the components that can't be serialized (caches) contribute their type.
+    """
+    components = {}
+    for name, instance in pipeline.walk():
+        try:
+            components[name] = component_to_dict(instance, name)
+        except SerializationError:
+            components[name] = {"type": f"{type(instance).__module__}.{type(instance).__name__}"}
+    connections = sorted(f"{sender}.{key}.{receiver}" for sender, receiver, key in pipeline.graph.edges(keys=True))
+    data = {"components": components, "connections": connections}
+    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+
+
+def _fingerprint(value: Any) -> Any:
+    # Arguments and State inputs as JSON: documents by id, messages by text, strings normalized
+    if isinstance(value, Document):
+        return value.id
+    if isinstance(value, ChatMessage):
+        return [value.role.value, normalize_text(value.text or "")]
+    if isinstance(value, str):
+        return normalize_text(value)
+    if isinstance(value, dict):
+        return {str(key): _fingerprint(item) for key, item in sorted(value.items())}
+    if isinstance(value, (list, tuple)):
+        return [_fingerprint(item) for item in value]
+    return value
+
+
+class ToolResultCache:
+    """
+    Results of tool calls keyed by tool, arguments and version: the most recent ones in memory (LRU)
+    and all of them in SQLite, so identical calls are also reused across runs.
+
+    Every entry keeps the LLM calls its result cost, counted as avoided on every hit.
+    """
+
+    def __init__(self, path: str, memory_entries: int, max_entries: int):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.memory_entries = memory_entries
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.llm_calls_avoided = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY,
+                tool TEXT NOT NULL,
+                result TEXT NOT NULL,
+                llm_calls INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self._connection.commit()
+
+    @staticmethod
+    def key(tool_name: str, version: str, arguments: dict, versions: Optional[dict] = None) -> str:
+        data = json.dumps([tool_name, version, _fingerprint(arguments), versions or {}], sort_keys=True, default=str)
+        return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+    def get(self, key: str, ttl: float, valid: Optional[Callable[[Any], bool]] = None) -> Optional[tuple]:
+        """
+        Returns:
+        - The result and the LLM calls it cost, None when missing, older than `ttl` seconds
+          or rejected by `valid` (e.g. the file it wrote no longer exists)
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                row = self._connection.execute(
+                    "SELECT result, llm_calls, created_at FROM results WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    entry = (_deserialize_value_with_schema(json.loads(row[0])), row[1], row[2])
+            if entry is None or now - entry[2] > ttl:
+                self.misses += 1
+                return None
+            if valid is not None and not valid(entry[0]):
+                self._memory.pop(key, None)
+                self._connection.execute("DELETE FROM results WHERE key = ?", (key,))
+                self._connection.commit()
+                self.misses += 1
+                return None
+
+            self._memory[key] = entry
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+            self._connection.execute("UPDATE results SET last_used = ? WHERE key = ?", (now, key))
+            self._connection.commit()
+            self.hits += 1
+            self.llm_calls_avoided += entry[1]
+            return entry[0], entry[1]
+
+    def put(self, key: str, tool_name: str, result: Any, llm_calls: int):
+        now = time.time()
+        serialized = json.dumps(_serialize_value_with_schema(result))
+        with self._lock:
+            self._memory[key] = (result, llm_calls, now)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+            self._connection.execute(
+                "INSERT OR REPLACE INTO results (key, tool, result, llm_calls, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, tool_name, serialized, llm_calls, now, now)
+            )
+            self._connection.execute("""
+                DELETE FROM results WHERE key NOT IN (
+                    SELECT key FROM results ORDER BY last_used DESC LIMIT ?
+                )
+            """, (self.max_entries,))
+            self._connection.commit()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "llm_calls_avoided": self.llm_calls_avoided
+        }
+
+
+@lazy
+def get_tool_cache() -> ToolResultCache:
+    return ToolResultCache(TOOL_CACHE_FILE, memory_entries=TOOL_CACHE_MEMORY_ENTRIES,
+                           max_entries=TOOL_CACHE_MAX_ENTRIES)
+
+
+def memoize_tool(
+    tool: PipelineTool,
+    ttl: float,
+    cache: Optional[ToolResultCache] = None,
+    versions: Optional[Callable[[], dict]] = None,
+    valid: Optional[Callable[[Any], bool]] = None
+) -> PipelineTool:
+    """
+    Reuses the result of `tool` for calls with the same (normalized) arguments and State inputs
+    for `ttl` seconds, as long as its pipeline (models, prompts) doesn't change.
+    The hits are tagged on the tool span with the LLM calls they avoided.
+
+    Tools with side effects or reading files need:
+    - versions: the versions of what the result depends on (e.g. the SKILLs on disk), part of the key.
+      A result is stored under the versions after the call, the state its side effects left.
+    - valid: checks a hit is still true (e.g. the TODO it wrote still exists), else the tool runs again
+    """
+    if getattr(tool, "_memoized", False):
+        return tool
+    invoke = tool.invoke
+    version = pipeline_version(tool._pipeline)
+
+    def memoized_invoke(**kwargs):
+        tool_cache = cache or get_tool_cache()
+        key = tool_cache.key(tool.name, version, kwargs, versions() if versions else None)
+        cached = tool_cache.get(key, ttl, valid)
+        span = tracing.tracer.current_span()
+        if cached is not None:
+            result, llm_calls = cached
+            logger.info("%s: cached result, %d LLM calls avoided (%s)", tool.name, llm_calls, tool_cache.stats())
+            if span is not None:
+                span.set_tag("angular.tool_cache", "hit")
+                span.set_tag("angular.llm_calls_avoided", llm_calls)
+            return result
+
+        with count_chat_calls() as llm_calls:
+            result = invoke(**kwargs)
+        if versions:
+            key = tool_cache.key(tool.name, version, kwargs, versions())
+        tool_cache.put(key, tool.name, result, llm_calls[0])
+        if span is not None:
+            span.set_tag("angular.tool_cache", "miss")
+        return result
+
+    tool.invoke = memoized_invoke
+    tool._memoized = True
+    return tool
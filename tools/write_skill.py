@@ -1,6 +1,10 @@
 import os
+import logging
 from haystack.tools import tool
-from constants import SKILLS_DIR
+from tools.output_store import get_skill_store
+from tools.skills_index import get_skills_index
+
+logger = logging.getLogger(__name__)
 
 
 @tool
@@ -15,16 +19,17 @@ def write_skill(dir_name: str, file_content: str) -> str:
     Returns:
     - The file path if succesfully written, otherwise empty.
     """
+    if not file_content:
+        return ""
     try:
-        # Creates the directoy
-        dir_path = os.path.join(SKILLS_DIR, dir_name)
-        os.makedirs(dir_path, exist_ok=False)
-
-        # Writes the file
-        file_path = os.path.join(dir_path, "SKILL.md")
-        with open(file_path, "w") as f:
-            content_written = f.write(file_content)
-
-        return file_path if content_written > 0 else ""
+        # Written atomically under a lock per SKILL, the same content written twice returns the existing file
+        file_path = get_skill_store().write(os.path.join(dir_name, "SKILL.md"), file_content)
     except Exception as e:
         return ""
+
+    try:
+        # search_skills finds it right away
+        get_skills_index().update(file_path)
+    except Exception as e:
+        logger.warning("SKILL %s written but not indexed: %s", file_path, e)
+    return file_path